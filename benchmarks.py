@@ -0,0 +1,263 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from deck_management import DeckManager, SeededShuffle
+from equity_calculator import EquityCalculator
+from hand_evaluator import HandEvaluator, EvaluationCache
+from poker_hand import PokerHand
+from range_equity import RangeEquityEngine
+from state_encoder import StateEncoder
+from vector_game import VectorHeadsUpGame, cross_check_actions
+
+
+def random_hands(num_hands, num_cards=7, seed=0):
+    rng = random.Random(seed)
+    return [rng.sample(range(52), num_cards) for _ in range(num_hands)]
+
+
+def card_strings(hand):
+    return [(DeckManager.RANK_STRINGS[card >> 2], DeckManager.SUIT_STRINGS[card & 3]) for card in hand]
+
+
+def report(name, num_hands, elapsed):
+    print(f"{name:<40} {num_hands:>10} hands {elapsed:>8.3f}s {num_hands / elapsed:>14,.0f} hands/s")
+
+
+def bench_hand_evaluator(num_hands=100000):
+    hands = random_hands(num_hands)
+    string_hands = [card_strings(hand) for hand in hands]
+
+    # Build the lookup tables up front so they are not counted against the first run
+    start = time.perf_counter()
+    HandEvaluator.build_tables()
+    print(f"Lookup tables built in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    for hand in string_hands:
+        PokerHand.legacy_evaluate_hand(hand[:2], hand[2:])
+    report("PokerHand.legacy_evaluate_hand (before)", num_hands, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for hand in string_hands:
+        PokerHand.evaluate_hand(hand[:2], hand[2:])
+    report("PokerHand.evaluate_hand (after)", num_hands, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for hand in string_hands:
+        PokerHand.evaluate_hand(hand[:2], hand[2:], with_cards=False)
+    report("PokerHand.evaluate_hand strength only", num_hands, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for hand in hands:
+        HandEvaluator.evaluate(hand)
+    report("HandEvaluator.evaluate (int cards)", num_hands, time.perf_counter() - start)
+
+
+def bench_batch_evaluator(num_hands=2000000):
+    rng = np.random.default_rng(0)
+    cards = np.argsort(rng.random((num_hands, 52)), axis=1)[:, :7].astype(np.uint8)
+    HandEvaluator.build_batch_tables()
+
+    start = time.perf_counter()
+    PokerHand.evaluate_batch(cards)
+    report("PokerHand.evaluate_batch", num_hands, time.perf_counter() - start)
+
+    loop_hands = cards[:100000].tolist()
+    start = time.perf_counter()
+    for hand in loop_hands:
+        HandEvaluator.evaluate(hand)
+    report("HandEvaluator.evaluate in a Python loop", len(loop_hands), time.perf_counter() - start)
+
+
+def bench_equity(num_trials=400000):
+    hero_cards = [('A', 'Spades'), ('K', 'Spades')]
+    board_cards = [('Q', 'Spades'), ('7', 'Hearts'), ('2', 'Clubs')]
+
+    for processes in sorted({1, os.cpu_count() or 1}):
+        calculator = EquityCalculator(processes=processes)
+        # Warm the worker processes (and their lookup tables) before timing
+        calculator.calculate(hero_cards, board_cards, 2, max_trials=processes * calculator.batch_size)
+        start = time.perf_counter()
+        result = calculator.calculate(hero_cards, board_cards, 2, target_std_error=0, max_trials=num_trials)
+        report(f"EquityCalculator processes={processes}", result['trials'], time.perf_counter() - start)
+        calculator.close()
+
+
+def bench_evaluation_cache(num_hands=200000, max_size=50000):
+    # Boards repeat across hands in simulation, so draw hands from a limited pool of 5-card boards
+    rng = random.Random(0)
+    boards = [rng.sample(range(52), 5) for _ in range(2000)]
+    hands = []
+    for _ in range(num_hands):
+        board = rng.choice(boards)
+        hole_cards = rng.sample([card for card in range(52) if card not in board], 2)
+        hands.append(hole_cards + board)
+
+    HandEvaluator.build_tables()
+    start = time.perf_counter()
+    for hand in hands:
+        HandEvaluator.evaluate(hand)
+    report("HandEvaluator.evaluate (no cache)", num_hands, time.perf_counter() - start)
+
+    cache = EvaluationCache(max_size)
+    start = time.perf_counter()
+    for hand in hands:
+        cache.evaluate(hand)
+    report(f"EvaluationCache.evaluate max_size={max_size}", num_hands, time.perf_counter() - start)
+    print(cache.get_stats())
+
+
+def bench_deck(num_hands=50000, num_players=9):
+    # Shuffle and deal a full 9-handed hand: two cards each one at a time, then flop, turn and river
+    for name, shuffle_policy in (('secure', None), ('seeded', SeededShuffle(0))):
+        deck = DeckManager.create_deck()
+        start = time.perf_counter()
+        for hand_number in range(num_hands):
+            deck = DeckManager.shuffle_deck(deck, shuffle_policy, hand_number)
+            for _ in range(2 * num_players):
+                card, deck = DeckManager.draw_card(deck)
+            for num_cards in (3, 1, 1):
+                cards, deck = DeckManager.deal_cards(deck, num_cards)
+        report(f"DeckManager {name} shuffle and deal {num_players}-handed", num_hands, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    SeededShuffle(0).shuffle_batch(0, 20 * num_hands)
+    report("SeededShuffle.shuffle_batch", 20 * num_hands, time.perf_counter() - start)
+
+
+def bench_headless(num_hands=5000):
+    # Imported here because game_management pulls in player_model, which needs torch
+    from game_management import StateMachine
+    from individual_player import Player
+
+    table = StateMachine('low', 9, 'max_buy_in', SeededShuffle(0), agents=Player.make_decision_test, headless=True)
+    result = table.run_hands(num_hands)
+    report("StateMachine.run_hands 9-max headless", result['hands'], result['elapsed'])
+
+
+def bench_events(num_hands=3000):
+    # 9-max headless hands with nobody listening, a subscriber taking every event, and a batch subscriber
+    from game_management import StateMachine
+    from individual_player import Player
+
+    for name in ('no subscribers', 'subscribe', 'subscribe_batch'):
+        table = StateMachine('low', 9, 'max_buy_in', SeededShuffle(0), agents=Player.make_decision_test, headless=True)
+        events = []
+        if name == 'subscribe':
+            table.events.subscribe(events.append)
+        elif name == 'subscribe_batch':
+            table.events.subscribe_batch(events.extend)
+        result = table.run_hands(num_hands)
+        report(f"EventBus {name} ({len(events)} events)", result['hands'], result['elapsed'])
+
+
+def bench_tournament(num_players=10000, max_seats=9):
+    # A whole multi-table tournament headless with the push/fold agent, from the first hand to the winner
+    from game_management import Tournament
+
+    tournament = Tournament(max_seats, 10000, num_players, seed=0)
+    result = tournament.run()
+    report(f"Tournament {num_players} players ({result['rounds']} rounds, {result['tables_broken']} tables broken, {result['moves']} moves)", result['hands'], result['elapsed'])
+
+
+def bench_lobby(num_players=20000, num_hands=3):
+    # Cash tables opened in bulk from one lobby, then a hand at every table per round with the seats refilled
+    from game_management import push_fold_agent
+    from individual_player import Player
+    from lobby import Lobby
+    from player_model import Model
+
+    if HandEvaluator.RANK_TABLE is None:
+        HandEvaluator.build_tables()  # Once per process, not part of opening the first table
+
+    lobby = Lobby(seed=0)
+    config = lobby.configs['low']
+    max_seats = config['max_seats']
+    players = [Player(f"Player {i+1}", config['max_buy_in'] * config['blinds'][1], Model(f"Model{i+1}")) for i in range(num_players)]
+    for player in players:
+        player.agent = push_fold_agent
+    start = time.perf_counter()
+    for index in range(0, num_players, max_seats):
+        lobby.open_table('low', players[index:index + max_seats])
+    print(f"{'Lobby seating':<40} {num_players:>10} players {time.perf_counter() - start:>6.3f}s on {len(lobby.tables)} tables")
+    result = lobby.run_hands(num_hands)
+    report(f"Lobby {result['tables']} tables", result['hands'], result['elapsed'])
+
+
+def bench_vector_game(num_games=10000, num_hands=50):
+    # Heads-up tables stepped together with the seeded cross-check policy, the lookup tables built beforehand
+    HandEvaluator.build_batch_tables()
+    game = VectorHeadsUpGame(num_games)
+    result = game.run_hands(num_hands, cross_check_actions)
+    report(f"VectorHeadsUpGame {num_games} tables", result['hands'], result['elapsed'])
+
+
+def bench_state_encoder(num_games=10000, num_steps=20, num_hands=200):
+    # Feature rows per second: a whole VectorHeadsUpGame batch at once, then one row per decision at a 9-max table
+    from game_management import StateMachine  # Needs player_model, which needs torch
+    from individual_player import Player
+
+    game = VectorHeadsUpGame(num_games)
+    encoder = StateEncoder(num_games)
+    encoder.encode_vector_game(game)
+    elapsed = 0.0
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        encoder.encode_vector_game(game)
+        elapsed += time.perf_counter() - start
+        game.step(*cross_check_actions(game))
+    print(f"{'StateEncoder.encode_vector_game':<40} {num_games * num_steps:>10} rows {elapsed:>8.3f}s {num_games * num_steps / elapsed:>14,.0f} rows/s")
+
+    table = StateMachine('low', 9, 'max_buy_in', SeededShuffle(0), headless=True)
+    timings = []
+
+    def agent(player, big_blind, bet_to_match, last_raise):
+        start = time.perf_counter()
+        encoder.encode(0, table, player)
+        timings.append(time.perf_counter() - start)
+        return player.make_decision_test(big_blind, bet_to_match, last_raise)
+
+    table.set_agents(agent)
+    table.run_hands(num_hands)
+    print(f"{'StateEncoder.encode 9-max':<40} {len(timings):>10} rows {sum(timings):>8.3f}s {len(timings) / sum(timings):>14,.0f} rows/s")
+
+
+def bench_range_equity(num_boards=1000, num_ranges=9):
+    # Full 9-max preflop: every range against every other on shared boards
+    ranges = [np.ones((13, 13))] * num_ranges
+    for processes in sorted({1, os.cpu_count() or 1}):
+        engine = RangeEquityEngine(processes=processes)
+        engine.calculate(ranges, num_boards=processes * engine.boards_per_batch)
+        start = time.perf_counter()
+        result = engine.calculate(ranges, num_boards=num_boards)
+        elapsed = time.perf_counter() - start
+        print(f"RangeEquityEngine processes={processes:<3} {num_ranges} ranges {result['boards']:>6} boards {elapsed:>8.3f}s {result['boards'] / elapsed:>10,.0f} boards/s")
+        engine.close()
+
+
+BENCHMARKS = {
+    'hand_evaluator': bench_hand_evaluator,
+    'batch_evaluator': bench_batch_evaluator,
+    'equity': bench_equity,
+    'evaluation_cache': bench_evaluation_cache,
+    'range_equity': bench_range_equity,
+    'deck': bench_deck,
+    'headless': bench_headless,
+    'events': bench_events,
+    'tournament': bench_tournament,
+    'lobby': bench_lobby,
+    'vector_game': bench_vector_game,
+    'state_encoder': bench_state_encoder,
+}
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks.py [benchmark names...], runs everything when no name is given
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name]()
@@ -0,0 +1,175 @@
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from hand_evaluator import EvaluationCache
+
+
+# Rank bits of the ten five-card straights, the wheel (A-2-3-4-5) first
+STRAIGHT_MASKS = [0b1000000001111] + [0b11111 << low for low in range(9)]
+# Rank bits of every distinct pair of hole-card ranks, pocket pairs included
+RANK_PAIR_MASKS = np.array([(1 << rank1) | (1 << rank2) for rank2 in range(13) for rank1 in range(rank2 + 1)])
+# Most ranks any single straight covers, for every 13-bit rank mask
+RANK_MASKS = np.arange(1 << 13)
+STRAIGHT_COVERAGE = np.max([sum((RANK_MASKS >> rank) & 1 for rank in range(13) if (straight >> rank) & 1) for straight in STRAIGHT_MASKS], axis=0)
+
+
+class BoardTextureIndex:
+    # Boards are lists of integer cards (rank * 4 + suit). A board's id is its colex rank among boards of the
+    # same size, so the 22,100 flops take ids 0..22099 and index straight into the precomputed table.
+    FEATURES = (
+        'high_rank',
+        'low_rank',
+        'distinct_ranks',
+        'paired',
+        'trips',
+        'max_suit_count',
+        'monotone',
+        'two_tone',
+        'rainbow',
+        'connectedness',
+        'rank_spread',
+        'straight_rank_pairs',
+        'straight_draw_rank_pairs',
+        'flush_combos',
+        'flush_draw_combos',
+    )
+    FEATURE_INDEX = {name: index for index, name in enumerate(FEATURES)}
+    FLOP_FILE = 'flop_textures.npy'
+    NUM_FLOPS = math.comb(52, 3)
+
+    def __init__(self, directory='board_textures', cache_size=100000):
+        self.directory = directory
+        self.flop_table = None
+        # Turn and river features are computed on first use and kept here
+        self.later_streets = EvaluationCache(cache_size)
+
+
+    @staticmethod
+    def board_id(cards):
+        return sum(math.comb(card, position + 1) for position, card in enumerate(sorted(cards)))
+
+
+    @staticmethod
+    def get_straight_features(rank_mask):
+        # Rank pairs that complete a straight, and rank pairs that leave four to one without completing it
+        coverage = STRAIGHT_COVERAGE[rank_mask | RANK_PAIR_MASKS]
+        return int((coverage == 5).sum()), int((coverage == 4).sum())
+
+
+    @staticmethod
+    def compute_features(cards):
+        # Feature row for a board of three to five cards, in FEATURES order
+        rank_counts = [0] * 13
+        suit_counts = [0, 0, 0, 0]
+        for card in cards:
+            rank_counts[card >> 2] += 1
+            suit_counts[card & 3] += 1
+        ranks = [rank for rank in range(13) if rank_counts[rank]]
+        rank_mask = sum(1 << rank for rank in ranks)
+        num_suits = sum(1 for count in suit_counts if count)
+
+        # Spread between the distinct ranks, letting the ace play low when that is tighter
+        rank_spread = ranks[-1] - ranks[0]
+        if ranks[-1] == 12 and len(ranks) > 1:
+            rank_spread = min(rank_spread, ranks[-2] + 1)
+
+        # Hole-card combos that complete a flush or leave four to one, counted from the unseen cards
+        unseen = 52 - len(cards)
+        flush_combos = flush_draws = 0
+        for count in suit_counts:
+            suit_left = 13 - count
+            with_suited = {2: math.comb(suit_left, 2), 1: suit_left * (unseen - suit_left), 0: math.comb(unseen - suit_left, 2)}
+            for num_suited, combos in with_suited.items():
+                if count + num_suited >= 5:
+                    flush_combos += combos
+                elif count + num_suited == 4 and len(cards) < 5:
+                    flush_draws += combos
+
+        straights, straight_draws = BoardTextureIndex.get_straight_features(rank_mask)
+        if len(cards) == 5:
+            straight_draws = 0
+
+        return (
+            ranks[-1],
+            ranks[0],
+            len(ranks),
+            int(max(rank_counts) >= 2),
+            int(max(rank_counts) >= 3),
+            max(suit_counts),
+            int(num_suits == 1),
+            int(num_suits == 2),
+            int(max(suit_counts) == 1),
+            int(STRAIGHT_COVERAGE[rank_mask]),
+            rank_spread,
+            straights,
+            straight_draws,
+            flush_combos,
+            flush_draws,
+        )
+
+
+    @staticmethod
+    def generate():
+        # One row per flop, in board id order
+        table = np.zeros((BoardTextureIndex.NUM_FLOPS, len(BoardTextureIndex.FEATURES)), dtype=np.uint16)
+        for card3 in range(2, 52):
+            for card2 in range(1, card3):
+                for card1 in range(card2):
+                    table[BoardTextureIndex.board_id((card1, card2, card3))] = BoardTextureIndex.compute_features((card1, card2, card3))
+        return table
+
+
+    def save(self, table):
+        # Written to a file of this process's own and renamed into place, so worker processes generating the table
+        # at the same time never load a half-written file
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, BoardTextureIndex.FLOP_FILE)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as file:
+            np.save(file, table)
+        os.replace(temp_path, path)
+
+
+    def get_flop_table(self):
+        # Memory-mapped on first use, and generated once when the file is missing
+        if self.flop_table is None:
+            path = os.path.join(self.directory, BoardTextureIndex.FLOP_FILE)
+            if not os.path.exists(path):
+                self.save(BoardTextureIndex.generate())
+            # Plain ndarray view of the mapping, row lookups on a memmap object are several times slower
+            self.flop_table = np.asarray(np.load(path, mmap_mode='r'))
+        return self.flop_table
+
+
+    def get_feature_row(self, cards):
+        if len(cards) == 3:
+            return self.get_flop_table()[BoardTextureIndex.board_id(cards)]
+        if len(cards) not in (4, 5):
+            raise ValueError("Board textures need three to five board cards")
+
+        key = (len(cards), BoardTextureIndex.board_id(cards))
+        features = self.later_streets.lookup(key)
+        if features is None:
+            features = np.array(BoardTextureIndex.compute_features(cards), dtype=np.uint16)
+            self.later_streets.store(key, features)
+        return features
+
+
+    def get_features(self, cards):
+        return dict(zip(BoardTextureIndex.FEATURES, self.get_feature_row(cards).tolist()))
+
+
+    def get_feature(self, cards, name):
+        return int(self.get_feature_row(cards)[BoardTextureIndex.FEATURE_INDEX[name]])
+
+
+if __name__ == "__main__":
+    # Usage: python board_texture.py [output directory]
+    index = BoardTextureIndex(sys.argv[1] if len(sys.argv) > 1 else 'board_textures')
+    start = time.perf_counter()
+    index.save(BoardTextureIndex.generate())
+    print(f"Wrote {BoardTextureIndex.NUM_FLOPS} flop textures to {index.directory} in {time.perf_counter() - start:.1f}s")
@@ -1,5 +1,127 @@
-import itertools
+import numbers
 import secrets
+from array import array
+
+import numpy as np
+
+
+class SecureShuffle:
+    # Live play: every swap index comes from the OS CSPRNG, nothing can be replayed
+    def shuffle(self, cards, hand_number=None):
+        for i in range(len(cards) - 1, 0, -1):  # Fisher-Yates from the last card
+            j = secrets.randbelow(i + 1)  # Secure random index
+            cards[i], cards[j] = cards[j], cards[i]
+
+
+class SeededShuffle:
+    # Simulation and self-play: hand h is ordered by 52 splitmix64 keys hashed from (seed, h, position), so any
+    # hand can be rebuilt from the seed and its hand number alone, and a batch of hands is one vectorized argsort.
+    # Not for real-money tables, the order follows from the seed.
+    GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+    MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+    MIX2 = np.uint64(0x94D049BB133111EB)
+    POSITIONS = np.arange(52, dtype=np.uint64)
+
+    def __init__(self, seed=0, block_size=1024):
+        self.seed = seed
+        self.key = SeededShuffle.mix(np.array([seed & 0xFFFFFFFFFFFFFFFF], dtype=np.uint64))[0]
+        self.next_hand = 0
+        # Single-hand shuffles are served from a block of decks generated in one batch
+        self.block_size = block_size
+        self.block_start = None
+        self.block = None
+
+    @staticmethod
+    def mix(values):
+        # splitmix64 finaliser, uint64 arithmetic wraps
+        values = (values ^ (values >> np.uint64(30))) * SeededShuffle.MIX1
+        values = (values ^ (values >> np.uint64(27))) * SeededShuffle.MIX2
+        return values ^ (values >> np.uint64(31))
+
+    @staticmethod
+    def seed_keys(seeds):
+        # The shuffle keys of SeededShuffle(seed) for an array of seeds
+        return SeededShuffle.mix(np.asarray(seeds).astype(np.uint64))
+
+    @staticmethod
+    def shuffle_hands(keys, hand_numbers, num_cards=52):
+        # (N, num_cards) uint8 decks, row i is hand hand_numbers[i] of the shuffle with key keys[i], so hands from
+        # many seeded tables come out of one batch. Asking for only the top cards skips sorting the rest.
+        counters = np.asarray(hand_numbers, dtype=np.uint64)[:, None] * np.uint64(52) + SeededShuffle.POSITIONS
+        keys = SeededShuffle.mix(np.asarray(keys, dtype=np.uint64)[:, None] + (counters + np.uint64(1)) * SeededShuffle.GOLDEN_GAMMA)
+        if num_cards >= 52:
+            return np.argsort(keys, axis=1, kind='stable').astype(np.uint8)
+        # The keys of one hand are distinct, so the smallest num_cards in key order are the top of the full deck
+        top_cards = np.argpartition(keys, num_cards - 1, axis=1)[:, :num_cards]
+        order = np.take_along_axis(keys, top_cards, axis=1).argsort(axis=1)
+        return np.take_along_axis(top_cards, order, axis=1).astype(np.uint8)
+
+    def shuffle_batch(self, first_hand, num_hands):
+        # (num_hands, 52) uint8 decks for hands first_hand .. first_hand + num_hands - 1
+        hand_numbers = np.arange(first_hand, first_hand + num_hands, dtype=np.uint64)
+        return SeededShuffle.shuffle_hands(np.full(num_hands, self.key, dtype=np.uint64), hand_numbers)
+
+    def shuffle(self, cards, hand_number=None):
+        # Without a hand number the hands are numbered in the order they are shuffled
+        if hand_number is None:
+            hand_number = self.next_hand
+        self.next_hand = hand_number + 1
+        block_start = hand_number - hand_number % self.block_size
+        if block_start != self.block_start:
+            self.block = self.shuffle_batch(block_start, self.block_size)
+            self.block_start = block_start
+        cards[:] = array('B', self.block[hand_number - block_start].tobytes())
+
+
+class Deck:
+    # The 52 cards as integers (rank * 4 + suit) in one preallocated array. Dealing moves a cursor forward and
+    # marks the card in a 52-bit mask, so it never shifts or copies the remaining cards.
+    __slots__ = ('cards', 'position', 'used_mask')
+
+    def __init__(self):
+        self.cards = array('B', range(52))
+        self.position = 0
+        self.used_mask = 0
+
+    def __len__(self):
+        return 52 - self.position
+
+    def shuffle(self, shuffle_policy, hand_number=None):
+        shuffle_policy.shuffle(self.cards, hand_number)
+        self.position = 0
+        self.used_mask = 0
+
+    def set_order(self, cards):
+        # Start a hand from a deck order shuffled elsewhere, e.g. one row of SeededShuffle.shuffle_batch
+        self.cards[:] = array('B', bytes(cards))
+        self.position = 0
+        self.used_mask = 0
+
+    def deal(self):
+        position = self.position
+        if position == 52:
+            raise ValueError("No cards left in the deck")
+        card = self.cards[position]
+        self.position = position + 1
+        self.used_mask |= 1 << card
+        return card
+
+    def deal_many(self, n):
+        position = self.position
+        if position + n > 52:
+            raise ValueError("Not enough cards left in the deck")
+        cards = self.cards[position:position + n].tolist()
+        self.position = position + n
+        for card in cards:
+            self.used_mask |= 1 << card
+        return cards
+
+    def is_dealt(self, card):
+        return (self.used_mask >> card) & 1 == 1
+
+    def remaining_cards(self):
+        return self.cards[self.position:].tolist()
+
 
 class DeckManager:
     def __init__(self, active_players, shuffled_deck):
@@ -9,48 +131,58 @@ class DeckManager:
     
     RANK_STRINGS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
     SUIT_STRINGS = ['Spades', 'Clubs', 'Hearts', 'Diamonds']
+    RANK_INDEX = {rank: index for index, rank in enumerate(RANK_STRINGS)}
+    SUIT_INDEX = {suit: index for index, suit in enumerate(SUIT_STRINGS)}
+    SECURE_SHUFFLE = SecureShuffle()
     
     @staticmethod
     def get_rank_index(rank_string):
         return DeckManager.RANK_STRINGS.index(rank_string)
 
+    @staticmethod
+    def encode_card(card):
+        # Integer form used everywhere in the game: rank * 4 + suit. String tuples are only for display. NumPy
+        # integers from the batch paths come back as plain ints.
+        if isinstance(card, numbers.Integral):
+            return int(card)
+        rank, suit = card
+        return DeckManager.RANK_INDEX[rank] * 4 + DeckManager.SUIT_INDEX[suit]
+
     @staticmethod
     def create_deck():
-        deck = [(rank, suit) for rank, suit in itertools.product(range(13), range(4))]
-        return deck
+        return Deck()
 
     @staticmethod
-    def shuffle_deck(deck):
-        for i in range(len(deck) - 1, -1, -1):  # Start from the last card
-            j = secrets.randbelow(i + 1)  # Generate a secure random index
-            deck[i], deck[j] = deck[j], deck[i]  # Swap the current card with the card at the random index
+    def shuffle_deck(deck, shuffle_policy=None, hand_number=None):
+        # Secure by default; simulations pass a SeededShuffle and the hand number to make the hand replayable
+        deck.shuffle(shuffle_policy or DeckManager.SECURE_SHUFFLE, hand_number)
         return deck
 
 
     @staticmethod
     def draw_card(deck):
-        card = deck.pop(0)
-        return card, deck
+        return deck.deal(), deck
 
     @staticmethod
     def deal_cards(deck, n):
-        cards = deck[:n]
-        deck = deck[n:]
-        return cards, deck
+        return deck.deal_many(n), deck
 
-    def get_card_string(self, card):
-        rank, suit = card
-        return self.RANK_STRINGS[rank], self.SUIT_STRINGS[suit]
+    @staticmethod
+    def get_card_string(card):
+        return DeckManager.RANK_STRINGS[card >> 2], DeckManager.SUIT_STRINGS[card & 3]
+
+    @staticmethod
+    def card_strings(cards):
+        # Display form of a list of cards, e.g. [('10', 'Spades'), ('A', 'Hearts')]
+        return [DeckManager.get_card_string(card) for card in cards]
 
 
     def deal_hole_cards(self):
-        # Use the DeckManager to draw cards and convert them to strings
-        cards, self.shuffled_deck = self.deal_cards(self.shuffled_deck, 1)
-        hole_cards = [self.get_card_string(card) for card in cards]
-
-        return hole_cards
+        cards, self.shuffled_deck = self.deal_cards(self.shuffled_deck, 2)
+        return cards
     
 
-    def deal_community_cards(self, num_cards):
+    def deal_community_cards(self, community_cards, num_cards):
         cards, self.shuffled_deck = self.deal_cards(self.shuffled_deck, num_cards)
-        self.community_cards.extend([self.deck_manager.get_card_string(card) for card in cards])
\ No newline at end of file
+        community_cards.extend(cards)
+        return cards
\ No newline at end of file
@@ -0,0 +1,219 @@
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deck_management import DeckManager
+from poker_hand import PokerHand
+from hand_evaluator import EvaluationCache
+
+
+def simulate_runouts(hero_cards, board_cards, num_opponents, num_trials, seed):
+    # Deal num_trials random runouts and opponent hands around the known cards and score them in one batch.
+    # Runs inside the worker processes, so it only takes and returns plain values.
+    rng = np.random.default_rng(seed)
+    dead_cards = set(hero_cards) | set(board_cards)
+    live_cards = np.array([card for card in range(52) if card not in dead_cards], dtype=np.uint8)
+
+    num_board_cards = 5 - len(board_cards)
+    num_drawn = num_board_cards + 2 * num_opponents
+    # Keeping the first num_drawn columns of a random permutation per row deals without replacement
+    drawn = live_cards[np.argsort(rng.random((num_trials, len(live_cards))), axis=1)[:, :num_drawn]]
+
+    board = np.empty((num_trials, 5), dtype=np.uint8)
+    board[:, :len(board_cards)] = board_cards
+    board[:, len(board_cards):] = drawn[:, :num_board_cards]
+
+    hand = np.empty((num_trials, 7), dtype=np.uint8)
+    hand[:, 2:] = board
+    hand[:, :2] = hero_cards
+    hero_strength = PokerHand.evaluate_batch(hand)
+
+    best_opponent = np.zeros(num_trials, dtype=np.int32)
+    num_tied = np.zeros(num_trials, dtype=np.int32)
+    for opponent in range(num_opponents):
+        first = num_board_cards + 2 * opponent
+        hand[:, :2] = drawn[:, first:first + 2]
+        opponent_strength = PokerHand.evaluate_batch(hand)
+        num_tied = np.where(opponent_strength > best_opponent, 0, num_tied)
+        best_opponent = np.maximum(best_opponent, opponent_strength)
+        num_tied += opponent_strength == hero_strength
+
+    wins = hero_strength > best_opponent
+    ties = hero_strength == best_opponent
+    # A tie with k opponents is worth 1 / (k + 1) of the pot
+    equity = np.where(wins, 1.0, np.where(ties, 1.0 / (num_tied + 1), 0.0))
+
+    return {
+        'trials': num_trials,
+        'wins': int(wins.sum()),
+        'ties': int(ties.sum()),
+        'equity_sum': float(equity.sum()),
+        'equity_sq_sum': float((equity * equity).sum()),
+    }
+
+
+class EquityCalculator:
+    # Row i maps every card through the i-th relabelling of the four suits
+    SUIT_PERMUTATIONS = list(itertools.permutations(range(4)))
+    PERMUTED_CARDS = np.array([[card & ~3 | permutation[card & 3] for card in range(52)] for permutation in SUIT_PERMUTATIONS], dtype=np.int64)
+
+    def __init__(self, processes=None, batch_size=20000, exact_cache_size=10000):
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.executor = None
+        self.exact_results = EvaluationCache(exact_cache_size)
+
+
+    def get_executor(self):
+        if self.executor is None and self.processes > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self.executor
+
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+    @staticmethod
+    def to_card_ints(cards):
+        # Accept both integer cards and the (rank, suit) string tuples the game deals
+        return [card if isinstance(card, int) else DeckManager.encode_card(card) for card in cards]
+
+
+    def calculate(self, hero_cards, board_cards, num_opponents, target_std_error=0.002, time_budget=None, max_trials=10000000, seed=0):
+        # Samples runouts in batches until the standard error of the equity estimate reaches target_std_error,
+        # time_budget seconds pass or max_trials are played. Batch i is always seeded from (seed, i) and batches
+        # are merged in order, so a run is reproducible for a given seed and number of batches.
+        hero_cards = self.to_card_ints(hero_cards)
+        board_cards = self.to_card_ints(board_cards)
+        if len(hero_cards) != 2 or len(board_cards) > 5 or num_opponents < 1:
+            raise ValueError("Need two hole cards, at most five board cards and at least one opponent")
+        if len(set(hero_cards) | set(board_cards)) != len(hero_cards) + len(board_cards):
+            raise ValueError("Hole cards and board cards must be distinct")
+        if max_trials < 1 or (time_budget is not None and time_budget <= 0):
+            raise ValueError("max_trials and time_budget must be positive")
+
+        seed_sequence = np.random.SeedSequence(seed)
+        executor = self.get_executor()
+        totals = {'trials': 0, 'wins': 0, 'ties': 0, 'equity_sum': 0.0, 'equity_sq_sum': 0.0}
+        std_error = math.inf
+        batch_index = 0
+        start = time.monotonic()
+
+        while totals['trials'] < max_trials and std_error > target_std_error:
+            # The first wave always runs, so there is an estimate however short the budget
+            if time_budget is not None and totals['trials'] and time.monotonic() - start >= time_budget:
+                break
+
+            # One wave gives every worker a batch; the stopping rules are checked between waves
+            wave = []
+            for _ in range(self.processes):
+                batch_trials = min(self.batch_size, max_trials - totals['trials'] - sum(trials for trials, _ in wave))
+                if batch_trials <= 0:
+                    break
+                batch_seed = np.random.SeedSequence(seed_sequence.entropy, spawn_key=(batch_index,))
+                wave.append((batch_trials, batch_seed))
+                batch_index += 1
+
+            if executor is None:
+                results = [simulate_runouts(hero_cards, board_cards, num_opponents, trials, batch_seed) for trials, batch_seed in wave]
+            else:
+                futures = [executor.submit(simulate_runouts, hero_cards, board_cards, num_opponents, trials, batch_seed) for trials, batch_seed in wave]
+                results = [future.result() for future in futures]
+
+            for result in results:
+                for key in totals:
+                    totals[key] += result[key]
+
+            mean = totals['equity_sum'] / totals['trials']
+            variance = max(totals['equity_sq_sum'] / totals['trials'] - mean * mean, 0.0)
+            std_error = math.sqrt(variance / totals['trials'])
+
+        trials = totals['trials']
+        return {
+            'equity': totals['equity_sum'] / trials,
+            'win': totals['wins'] / trials,
+            'tie': totals['ties'] / trials,
+            'std_error': std_error,
+            'trials': trials,
+            'elapsed': time.monotonic() - start,
+        }
+
+
+    def exact_equity(self, hands, board_cards):
+        # Enumerates every runout for two or more known hands. Runouts that are the same up to a relabelling of
+        # suits the known cards leave unchanged are scored once and weighted by the size of their class, and
+        # whole situations are memoised under their suit-canonical form.
+        hands = [self.to_card_ints(hand) for hand in hands]
+        board_cards = self.to_card_ints(board_cards)
+        known_cards = [card for hand in hands for card in hand] + board_cards
+        if len(hands) < 2 or any(len(hand) != 2 for hand in hands) or len(board_cards) > 5:
+            raise ValueError("Need at least two hands of two hole cards and at most five board cards")
+        if len(set(known_cards)) != len(known_cards):
+            raise ValueError("Hole cards and board cards must be distinct")
+
+        groups = [frozenset(hand) for hand in hands] + [frozenset(board_cards)]
+        canonical_key = min(
+            tuple(tuple(sorted(permuted_cards[card] for card in group)) for group in groups)
+            for permuted_cards in EquityCalculator.PERMUTED_CARDS.tolist()
+        )
+        result = self.exact_results.lookup(canonical_key)
+        if result is not None:
+            return EquityCalculator.copy_result(result)
+
+        # Suit relabellings that map every hand and the board onto themselves
+        stabilizer = [
+            permuted_cards for permuted_cards in EquityCalculator.PERMUTED_CARDS
+            if all(frozenset(permuted_cards[list(group)].tolist()) == group for group in groups)
+        ]
+
+        num_runout_cards = 5 - len(board_cards)
+        live_cards = [card for card in range(52) if card not in set(known_cards)]
+        runouts = np.fromiter(itertools.chain.from_iterable(itertools.combinations(live_cards, num_runout_cards)), dtype=np.int64)
+        runouts = runouts.reshape(math.comb(len(live_cards), num_runout_cards), num_runout_cards)  # One empty runout on a full board
+        total_runouts = len(runouts)
+
+        weights = np.ones(total_runouts, dtype=np.int64)
+        if len(stabilizer) > 1 and num_runout_cards:
+            # Represent each runout by the smallest card mask any symmetry maps it to
+            canonical_masks = None
+            for permuted_cards in stabilizer:
+                masks = (np.int64(1) << permuted_cards[runouts]).sum(axis=1)
+                canonical_masks = masks if canonical_masks is None else np.minimum(canonical_masks, masks)
+            _, first_index, weights = np.unique(canonical_masks, return_index=True, return_counts=True)
+            runouts = runouts[first_index]
+
+        hand_cards = np.empty((len(runouts), 7), dtype=np.uint8)
+        hand_cards[:, 2:2 + len(board_cards)] = board_cards
+        hand_cards[:, 2 + len(board_cards):] = runouts
+        strengths = np.empty((len(hands), len(runouts)), dtype=np.int32)
+        for i, hand in enumerate(hands):
+            hand_cards[:, :2] = hand
+            strengths[i] = PokerHand.evaluate_batch(hand_cards)
+
+        best = strengths.max(axis=0)
+        is_best = strengths == best
+        num_best = is_best.sum(axis=0)
+        total_weight = weights.sum()
+
+        result = {
+            'equity': [float((weights * is_best[i] / num_best).sum() / total_weight) for i in range(len(hands))],
+            'win': [float((weights * (is_best[i] & (num_best == 1))).sum() / total_weight) for i in range(len(hands))],
+            'tie': [float((weights * (is_best[i] & (num_best > 1))).sum() / total_weight) for i in range(len(hands))],
+            'runouts': total_runouts,
+            'evaluated': len(runouts),
+        }
+        self.exact_results.store(canonical_key, result)
+        return EquityCalculator.copy_result(result)
+
+
+    @staticmethod
+    def copy_result(result):
+        # The memoised dict stays in the cache, callers get their own copy of it and of its lists
+        return {key: list(value) if isinstance(value, list) else value for key, value in result.items()}
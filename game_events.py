@@ -0,0 +1,195 @@
+# Event types in the order a hand publishes them
+EVENT_TYPES = ['HAND_START', 'BLINDS', 'DEAL', 'STREET', 'ACTION', 'SHOWDOWN', 'PAYOUT']
+HAND_START, BLINDS, DEAL, STREET, ACTION, SHOWDOWN, PAYOUT = range(len(EVENT_TYPES))
+
+
+class GameEvent:
+    # Base of the typed events. Every field is a plain value copied when the event is built, so an event held in a
+    # batch still says what happened after the players have moved on. The bus fills in table_name and hand_number.
+    __slots__ = ('table_name', 'hand_number')
+    type = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ()))
+        return f'{type(self).__name__}({fields})'
+
+
+class HandStartEvent(GameEvent):
+    # seats is a tuple of (seat, name, stack) before antes and blinds
+    __slots__ = ('dealer', 'seats')
+    type = HAND_START
+
+    def __init__(self, dealer, seats):
+        self.dealer = dealer
+        self.seats = seats
+
+
+class BlindsEvent(GameEvent):
+    # posts is a tuple of (name, ante, blind) for every player who put chips in, pot is the total collected
+    __slots__ = ('posts', 'pot')
+    type = BLINDS
+
+    def __init__(self, posts, pot):
+        self.posts = posts
+        self.pot = pot
+
+
+class DealEvent(GameEvent):
+    # Hole cards carry the player's name, board cards have player None; street is 'hole', a street name or 'runout'
+    __slots__ = ('street', 'cards', 'player')
+    type = DEAL
+
+    def __init__(self, street, cards, player=None):
+        self.street = street
+        self.cards = cards
+        self.player = player
+
+
+class StreetEvent(GameEvent):
+    # A betting street starts: the board so far, the pot and the players still in the hand
+    __slots__ = ('street', 'board', 'pot', 'players')
+    type = STREET
+
+    def __init__(self, street, board, pot, players):
+        self.street = street
+        self.board = board
+        self.pot = pot
+        self.players = players
+
+
+class ActionEvent(GameEvent):
+    # amount is the chips the action put in, stack, bet_to_match and pot are their values after it
+    __slots__ = ('street', 'player', 'action_type', 'amount', 'stack', 'bet_to_match', 'pot')
+    type = ACTION
+
+    def __init__(self, street, player, action_type, amount, stack, bet_to_match, pot):
+        self.street = street
+        self.player = player
+        self.action_type = action_type
+        self.amount = amount
+        self.stack = stack
+        self.bet_to_match = bet_to_match
+        self.pot = pot
+
+
+class ShowdownEvent(GameEvent):
+    # hands is a tuple of (name, hole cards, strength) for the players shown down, winners the names splitting the best hand
+    __slots__ = ('board', 'hands', 'winners')
+    type = SHOWDOWN
+
+    def __init__(self, board, hands, winners):
+        self.board = board
+        self.hands = hands
+        self.winners = winners
+
+
+class PayoutEvent(GameEvent):
+    # result is a StateMachine.get_hand_result dict of the hand built for the event alone
+    __slots__ = ('result',)
+    type = PAYOUT
+
+    def __init__(self, result):
+        self.result = result
+
+
+class EventBus:
+    # One bus per table. handlers[event_type] lists the callbacks of that type, and the engine only builds an event
+    # after checking `if events.handlers[TYPE]:`, so a type nobody listens to costs one list lookup per hook.
+    # Subscribers either get every event as it happens or, with subscribe_batch, lists of events once batch_size
+    # have built up and on flush(). pause() stops publishing (a search walking hypothetical actions), resume()
+    # brings the subscribers back; pauses nest, so a rollout inside a paused traversal keeps the bus paused.
+    NO_HANDLERS = tuple(() for _ in EVENT_TYPES)
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.hand_number = 0
+        self.subscriptions = {}
+        self.batches = []
+        self.next_token = 0
+        self.paused = 0
+        self.handlers = EventBus.NO_HANDLERS
+
+
+    def subscribe(self, callback, event_types=None):
+        # callback(event) for every event of event_types (all types when None), returns the token unsubscribe takes
+        return self.add_subscription(callback, event_types)
+
+
+    def subscribe_batch(self, callback, batch_size=1024, event_types=None):
+        # callback(events) with lists of up to batch_size events in publishing order
+        batch = EventBatch(callback, batch_size)
+        self.batches.append(batch)
+        return self.add_subscription(batch.append, event_types, batch)
+
+
+    def add_subscription(self, handler, event_types, batch=None):
+        token = self.next_token
+        self.next_token += 1
+        event_types = range(len(EVENT_TYPES)) if event_types is None else event_types
+        self.subscriptions[token] = (handler, frozenset(event_types), batch)
+        self.rebuild_handlers()
+        return token
+
+
+    def unsubscribe(self, token):
+        # Hands a batch subscriber what it still holds before it goes
+        handler, event_types, batch = self.subscriptions.pop(token)
+        if batch is not None:
+            batch.flush()
+            self.batches.remove(batch)
+        self.rebuild_handlers()
+
+
+    def rebuild_handlers(self):
+        if self.paused or not self.subscriptions:
+            self.handlers = EventBus.NO_HANDLERS
+            return
+        self.handlers = tuple(
+            tuple(handler for handler, event_types, _ in self.subscriptions.values() if event_type in event_types)
+            for event_type in range(len(EVENT_TYPES))
+        )
+
+
+    def pause(self):
+        self.paused += 1
+        if self.paused == 1:
+            self.rebuild_handlers()
+
+
+    def resume(self):
+        if self.paused:
+            self.paused -= 1
+            if not self.paused:
+                self.rebuild_handlers()
+
+
+    def publish(self, event):
+        event.table_name = self.table_name
+        event.hand_number = self.hand_number
+        for handler in self.handlers[event.type]:
+            handler(event)
+
+
+    def flush(self):
+        # Delivers whatever the batch subscribers hold
+        for batch in self.batches:
+            batch.flush()
+
+
+class EventBatch:
+    __slots__ = ('callback', 'batch_size', 'events')
+
+    def __init__(self, callback, batch_size):
+        self.callback = callback
+        self.batch_size = batch_size
+        self.events = []
+
+    def append(self, event):
+        self.events.append(event)
+        if len(self.events) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.events:
+            events, self.events = self.events, []
+            self.callback(events)
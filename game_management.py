@@ -1,16 +1,30 @@
+import time
+
 from poker_game import PokerGame
-from deck_management import DeckManager
-from individual_player import Player
+from deck_management import DeckManager, SeededShuffle
+from individual_player import Player, Action
 from player_model import Model, PlayerModel, PlayerModelManager
 from table_management import TableManagement
-from pot_management import PotManagement, BlindStructure
+from pot_management import PotManagement, BlindStructure, LevelScheduler
 from table_config import TableConfig
 from poker_hand import PokerHand
+from hand_evaluator import HandState
+from equity_calculator import EquityCalculator
+from board_texture import BoardTextureIndex
+from game_state import GameSnapshot
+from game_events import BLINDS, DEAL, HAND_START, PAYOUT, SHOWDOWN, STREET, BlindsEvent, DealEvent, EventBus, HandStartEvent, PayoutEvent, ShowdownEvent, StreetEvent
 
 
 class StateMachine:
-    def __init__(self, table_name, num_players, buy_in):
+    def __init__(self, table_name, num_players, buy_in, shuffle_policy=None, agents=None, headless=False, table_config=None, players=None):
         self.num_players = num_players
+        # None keeps the secure shuffle for live play; a SeededShuffle makes every hand replayable by its number
+        self.shuffle_policy = shuffle_policy
+        self.hand_number = 0
+        # Headless tables print nothing; run_hands collects a result per hand into hand_results instead
+        self.verbose = not headless
+        self.hand_results = None
+        self.starting_stacks = []
         self.winning_players = None
 
         self.all_players = []
@@ -18,20 +32,26 @@ class StateMachine:
         self.eligible_players = []
         self.ranked_players = []
         self.community_cards = []
+        self.board_state = HandState()
+        self.current_board_texture = None
         self.shuffled_deck = []
+        self.undo_stack = []  # One entry per apply_action, a snapshot where the action closed a betting round
+        # Debugging aid: check the seat masks against every player's flags before each hand and after each street
+        self.check_masks = False
 
         self.table_name = table_name
         self.table_manager = TableManagement(self.table_name)
-        self.table_config = TableConfig().cash_configs[self.table_name]
+        # Cash tables look their config up by name, tournament tables bring their own
+        self.table_config = table_config if table_config is not None else TableConfig().cash_configs[self.table_name]
 
         self.table_manager.add_table(self.table_name, self.table_config)
         self.table = self.table_manager.tables[self.table_name]
         self.starting_stack = self.table_config[buy_in] * self.table_config['blinds'][1]
 
         # Add players to the table
-        for i in range(self.num_players):
-            model = Model(f"Model{i+1}")  # Create a new model for each player
-            player = Player(f"Player {i+1}", self.starting_stack, model)
+        if players is None:
+            players = [Player(f"Player {i+1}", self.starting_stack, Model(f"Model{i+1}")) for i in range(self.num_players)]  # A new model for each player
+        for player in players:
             self.table_manager.add_player(player, self.table)
    
         self.community_pot = self.table['community_pot']
@@ -41,27 +61,37 @@ class StateMachine:
         self.eligible_players = self.table['community_pot']['eligible_players']
         self.blinds = self.table_config['blinds']
         self.small_blind, self.big_blind, self.ante = self.blinds
+        # A LevelScheduler shared with the other tables of the event sets the blinds when there is one
+        self.level_scheduler = None
+        self.level = None
 
         self.deck_manager = DeckManager(self.active_players, self.shuffled_deck)  # Initialize an instance of DeckManager
+        self.deck = self.deck_manager.create_deck()
         self.pot_manager = PotManagement(self.table_manager, self.community_pot, self.side_pots, self.ranked_players, self.eligible_players, self.active_players, self.ante, self.small_blind, self.big_blind)  # Initialize PotManagement
         self.poker_hand = PokerHand()
+        self.equity_calculator = EquityCalculator(processes=1)
+        self.board_textures = BoardTextureIndex()
         
         self.streets = {
             'preflop': {
                 'name': 'preflop',
                 'num_cards': 0,
+                'next_state': 'flop',
             },
             'flop': {
                 'name': 'flop',
                 'num_cards': 3,
+                'next_state': 'turn',
             },
             'turn': {
                 'name': 'turn',
                 'num_cards': 1,
+                'next_state': 'river',
             },
             'river': {
                 'name': 'river',
                 'num_cards': 1,
+                'next_state': 'showdown',
             }
         }
         
@@ -82,26 +112,94 @@ class StateMachine:
 
         # Initialize the game
         self.game = PokerGame(self.table_manager, self.table, self.poker_hand, self.blinds, self.community_cards, self.community_pot, self.side_pots)
+        # Lifecycle events of this table, see EventBus: table.events.subscribe(callback, [ACTION, PAYOUT])
+        self.events = self.game.events = EventBus(self.table_name)
         
         # Setting the initial state
         self.state = 'setup'
 
+        self.game.verbose = self.pot_manager.verbose = self.table_manager.verbose = self.verbose
+        for player in self.all_players:
+            if player is not None:
+                player.verbose = self.verbose
+        if agents is not None:
+            self.set_agents(agents)
+
+
+    @staticmethod
+    def for_players(table_name, table_config, players, seed=None, table_id=0, headless=True):
+        # A table of an event (tournament, lobby) seated with players who keep their stacks, the buy_in the
+        # constructor asks for is never paid. With a seed every table of the event gets its own shuffle stream.
+        shuffle_policy = SeededShuffle((seed << 20) + table_id, block_size=64) if seed is not None else None
+        return StateMachine(table_name, 0, 'max_buy_in', shuffle_policy, headless=headless, table_config=table_config, players=players)
+
+
+    def set_agents(self, agents):
+        # One agent for every player, or a list with one agent per seat (None keeps the console prompt)
+        for seat, player in enumerate(self.all_players):
+            if player is not None:
+                player.agent = agents[seat] if isinstance(agents, (list, tuple)) else agents
+
+
+    def seat_player(self, player):
+        # Between hands only: takes the first empty seat, returns the seat or None when the table is full
+        if self.table_manager.open_seats() == 0:
+            return None
+        player.verbose = self.verbose
+        return self.table_manager.add_player(player, self.table)
+
+
+    def unseat_player(self, player):
+        # Between hands only
+        self.table_manager.remove_player(player, self.table_name)
+
+
+    def set_blinds(self, blinds):
+        # (small blind, big blind, ante) from the next hand on
+        self.blinds = blinds
+        self.small_blind, self.big_blind, self.ante = blinds
+        self.pot_manager.small_blind, self.pot_manager.big_blind, self.pot_manager.ante = blinds
+        self.game.small_blind, self.game.big_blind, self.game.ante = blinds
+
+
+    def apply_level(self):
+        # At a hand boundary: takes the scheduler's blinds when its level has moved on, True when they changed
+        level_scheduler = self.level_scheduler
+        if level_scheduler is None or level_scheduler.level == self.level:
+            return False
+        self.level = level_scheduler.level
+        self.set_blinds(level_scheduler.blinds)
+        return True
+
 
     def street_rotation(self, street_name):
+        self.deal_street(street_name)
+        self.active_players, self.eligible_players = self.game.betting_round(self.streets[street_name],self.community_cards, self.active_players, self.eligible_players)
+        self.finish_street()
+
 
+    def deal_street(self, street_name):
         new_cards, self.shuffled_deck = self.deck_manager.deal_cards(self.shuffled_deck, self.streets[street_name]['num_cards'])
-        self.community_cards.extend([self.deck_manager.get_card_string(card) for card in new_cards])
+        self.community_cards.extend(new_cards)
 
-        for player in self.active_players:    
-            player.current_hand_rank = self.poker_hand.evaluate_hand(player.hole_cards, self.community_cards)
+        self.update_hand_strengths(new_cards)
+        self.current_board_texture = None  # Looked up again on first use this street
 
-        self.active_players, self.eligible_players = self.game.betting_round(self.streets[street_name],self.community_cards, self.active_players, self.eligible_players)
+        if new_cards and self.events.handlers[DEAL]:
+            self.events.publish(DealEvent(street_name, tuple(new_cards)))
+        if self.events.handlers[STREET]:
+            self.events.publish(StreetEvent(street_name, tuple(self.community_cards), self.community_pot['pot_value'], tuple(player.name for player in self.active_players)))
 
-        while any(player.is_all_in and player.is_eligible_for_pot for player in self.active_players) and len(self.active_players) >= 3:
-            self.side_pots = self.pot_manager.create_side_pot()
+
+    def finish_street(self):
+        # Side pots and end-of-hand checks once the street's betting is over
+        if self.check_masks:
+            self.table_manager.check_seat_masks()
+        if any(player.is_all_in and player.is_eligible_for_pot for player in self.active_players):
+            self.side_pots = self.pot_manager.create_side_pot(self.all_players)
         
         # Calculate the number of players who are not all in
-        not_all_in_count = len([player for player in self.active_players if not player.is_all_in])
+        not_all_in_count = self.table_manager.count_can_act()
 
         # Check if only one active player remains, if so, they are the winner
         if len(self.active_players) == 1:                        
@@ -109,7 +207,7 @@ class StateMachine:
             return 
 
         # Check if all players are all in or if there is only one player who is not all in
-        elif not_all_in_count == 1 or all(player.is_all_in for player in self.active_players):
+        elif not_all_in_count <= 1:
             self.state = 'early_finish'
             return
 
@@ -121,30 +219,161 @@ class StateMachine:
             player.has_acted = False        
 
 
+    def snapshot(self):
+        # Cheap copy of the hand in progress for search, restore() puts the table back to it
+        return GameSnapshot(self)
+
+
+    def restore(self, snapshot):
+        snapshot.restore(self)
+
+
+    def decision_steps(self):
+        # The rest of the current hand as one generator: yields every player to act, is sent their Action and
+        # finishes once the hand is paid out. A table restored at a decision carries on from that same decision.
+        player = self.advance_to_decision()
+        while player is not None:
+            if self.verbose:
+                self.game.player_info_print(player, self.state, self.game.bet_to_match, self.community_cards, self.community_pot, self.side_pots)
+            action = yield player
+            self.game.apply_action(player, action)
+            player = self.advance_to_decision()
+
+
+    def advance_to_decision(self):
+        # Runs the hand on to the next player who has to act and returns them, or None once the hand is paid out
+        while self.state != 'reset':
+            state = self.state
+            if state not in self.streets:
+                self.state_actions[state]()
+                continue
+
+            if self.game.round_start is None:
+                self.deal_street(state)
+                self.game.start_round(self.streets[state], self.active_players, self.eligible_players)
+            player = self.game.next_to_act()
+            if player is not None:
+                return player
+
+            self.active_players, self.eligible_players = self.game.end_round()
+            self.finish_street()
+            if self.state == state:
+                self.state = self.streets[state]['next_state']
+        return None
+
+
+    def apply_action(self, action):
+        # Tree traversal in place: plays the pending player's action, runs on to the next decision and returns that
+        # player (None once the hand is over). Most actions only push their PokerGame record; the one that closes a
+        # betting round also pushes a snapshot, since dealing, side pots and showdowns are undone from that.
+        # The actions are hypothetical, so the table's events are paused from the first one until undo_action
+        # empties the stack again.
+        if not self.undo_stack:
+            self.events.pause()
+        try:
+            player = self.game.next_to_act()
+            self.game.apply_action(player, action)
+            player = self.game.next_to_act()
+            if player is not None:
+                self.undo_stack.append(None)
+                return player
+            self.undo_stack.append(GameSnapshot(self))
+            return self.advance_to_decision()
+        except BaseException:
+            if not self.undo_stack:
+                self.events.resume()
+            raise
+
+
+    def undo_action(self):
+        # Takes back the last apply_action and returns the player whose decision is pending again
+        snapshot = self.undo_stack.pop()
+        if snapshot is not None:
+            snapshot.restore(self)
+        player = self.game.undo_action()
+        if not self.undo_stack:
+            self.events.resume()
+        return player
+
+
+    def play_out(self, first_action=None):
+        # Plays the rest of the hand with the players' own agents, first_action answering the pending decision
+        # when given, and returns the chips each player won or lost over the whole hand. The usual rollout:
+        # snapshot = table.snapshot(); table.play_out(action); table.restore(snapshot)
+        # The rollout publishes no events, the table's subscribers only hear about hands really played.
+        steps = self.decision_steps()
+        self.events.pause()
+        try:
+            player = next(steps)
+            if first_action is not None:
+                player = steps.send(first_action)
+            while True:
+                player = steps.send(player.decide(self.big_blind, self.game.bet_to_match, self.game.last_raise))
+        except StopIteration:
+            pass
+        finally:
+            self.events.resume()
+        return {player.name: player.stack_size - stack_size for player, stack_size in self.starting_stacks}
+
+
+    @property
+    def board_texture(self):
+        # Texture features of the current board from the flop on, see BoardTextureIndex.FEATURES
+        if self.current_board_texture is None and len(self.community_cards) >= 3:
+            self.current_board_texture = self.board_textures.get_features(self.community_cards)
+        return self.current_board_texture
+
+
+    def update_hand_strengths(self, new_cards):
+        # The board state absorbs the new cards once per street, then each player only adds their hole-card state
+        self.board_state.add_cards(new_cards)
+        board = tuple(self.community_cards)
+
+        for player in self.active_players:
+            player.set_hand_strength(self.board_state.combined_strength(player.hand_state), board)
+
+
     def setup(self):
+        self.apply_level()
+        self.game.action_stack.clear()
+        if self.undo_stack:
+            self.events.resume()  # A traversal left open ends with its hand
+        self.undo_stack.clear()
+        if self.check_masks:
+            self.table_manager.check_seat_masks()
         self.active_players = self.table_manager.get_active_players()
         self.eligible_players = self.table_manager.update_player_eligibility()
+        self.starting_stacks = [(player, player.stack_size) for player in self.active_players]
 
         # set blinds and button
         self.table_manager.advance_button(self.table_manager, self.table_name)
+        self.events.hand_number = self.hand_number
+        if self.events.handlers[HAND_START]:
+            dealer = self.all_players[self.table_manager.dealer_position].name
+            self.events.publish(HandStartEvent(dealer, tuple((self.all_players.index(player), player.name, player.stack_size) for player in self.active_players)))
         
         # Collect blinds and antes at the start of the game
         self.pot_manager.collect_antes()
+        antes = [player.total_bet for player in self.active_players] if self.events.handlers[BLINDS] else None
         self.pot_manager.collect_blinds()
+        if antes is not None:
+            posts = tuple((player.name, ante, player.total_bet - ante) for player, ante in zip(self.active_players, antes) if player.total_bet)
+            self.events.publish(BlindsEvent(posts, self.community_pot['pot_value']))
 
         self.state = 'deal_hole_cards'
         
 
     def deal_hole_cards(self):
-        # Create deck
-        self.deck = self.deck_manager.create_deck()
-        self.shuffled_deck = self.deck_manager.shuffle_deck(self.deck)
+        # The deck is allocated once per table, shuffling resets it for the new hand
+        self.shuffled_deck = self.deck_manager.shuffle_deck(self.deck, self.shuffle_policy, self.hand_number)
 
         for player in self.active_players:
             while len(player.hole_cards) < 2:
-                # Use the DeckManager to draw one card and convert it to a string
-                card, self.shuffled_deck = self.deck_manager.deal_cards(self.shuffled_deck, 1)
-                player.hole_cards.append(self.deck_manager.get_card_string(card[0]))  # Append the dealt card to the player's hole cards
+                card, self.shuffled_deck = self.deck_manager.draw_card(self.shuffled_deck)
+                player.hole_cards.append(card)  # Integer card, converted to a string only when displayed
+            player.hand_state = HandState(player.hole_cards)
+            if self.events.handlers[DEAL]:
+                self.events.publish(DealEvent('hole', tuple(player.hole_cards), player.name))
 
         self.state = 'preflop'
         
@@ -176,22 +405,42 @@ class StateMachine:
 
     
     def early_finish(self):
-        print("All players ready to end")
-
+        if self.verbose:
+            print("All players ready to end")
+
+        # Heads-up all-ins from the flop on are cheap to solve exactly
+        if len(self.active_players) == 2 and len(self.community_cards) >= 3:
+            equities = self.equity_calculator.exact_equity([player.hole_cards for player in self.active_players], self.community_cards)
+            for player, equity in zip(self.active_players, equities['equity']):
+                player.equity = equity
+                if self.verbose:
+                    print(f"{player.name} has {equity:.1%} equity")
+
+        new_cards = []
         while len(self.community_cards) < 5:
             card, self.shuffled_deck = self.deck_manager.draw_card(self.shuffled_deck)
-            self.community_cards.append(self.deck_manager.get_card_string(card))
+            self.community_cards.append(card)
+            new_cards.append(card)
+
+        # Re-evaluate on the full board so the showdown does not use the hands from the street the all-in happened on
+        self.update_hand_strengths(new_cards)
+        if new_cards and self.events.handlers[DEAL]:
+            self.events.publish(DealEvent('runout', tuple(new_cards)))
 
         self.state = 'showdown'
 
 
     def showdown(self):
         self.ranked_players = self.game.evaluate_showdown(self.active_players)
+        if self.events.handlers[SHOWDOWN]:
+            hands = tuple((player.name, tuple(player.hole_cards), player.hand_strength) for player in self.active_players)
+            self.events.publish(ShowdownEvent(tuple(self.community_cards), hands, tuple(player.name for player in self.ranked_players[0])))
         self.state = 'payout'
     
 
     def hidden_end(self):
-        print(f"All players have folded, {self.active_players[0].name} is the winner")
+        if self.verbose:
+            print(f"All players have folded, {self.active_players[0].name} is the winner")
 
         self.ranked_players = self.active_players
         self.state = 'payout'
@@ -199,7 +448,24 @@ class StateMachine:
 
     def payout(self):
         self.pot_manager.distribute_pots(self.ranked_players)
+        if self.hand_results is not None:
+            self.hand_results.append(self.get_hand_result())
+        if self.events.handlers[PAYOUT]:
+            # A result of its own, so changing hand_results never changes an event already published
+            self.events.publish(PayoutEvent(self.get_hand_result()))
         self.state = 'reset'
+
+
+    def get_hand_result(self):
+        chip_changes = {player.name: player.stack_size - stack_size for player, stack_size in self.starting_stacks}
+        return {
+            'hand_number': self.hand_number,
+            'community_cards': list(self.community_cards),
+            'showdown': len(self.active_players) > 1,
+            'hole_cards': {player.name: list(player.hole_cards) for player in self.active_players},
+            'winners': [name for name, change in chip_changes.items() if change > 0],
+            'chip_changes': chip_changes,
+        }
     
     
     def reset(self):
@@ -209,8 +475,12 @@ class StateMachine:
             if player.stack_size == 0:
                 self.table_manager.remove_player(player, self.table_name)
             player.reset_for_new_hand()
+        self.table_manager.new_hand()
         self.ranked_players = []
         self.community_cards = []
+        self.board_state = HandState()
+        self.current_board_texture = None
+        self.hand_number += 1
        
         self.state = 'setup'  # back to deal state for the next hand
 
@@ -220,6 +490,27 @@ class StateMachine:
         self.state = 'setup'
     
 
+    def run_hands(self, num_hands):
+        # Plays num_hands hands, or until fewer than two players are left, and returns the per-hand results.
+        # Meant for headless tables with agents set, an agent-less player still waits on the console.
+        self.hand_results = []
+        start = time.perf_counter()
+        while len(self.hand_results) < num_hands or self.state != 'setup':
+            if self.state == 'setup' and self.table_manager.count_active() < 2:
+                break
+            self.state_actions[self.state]()
+        elapsed = time.perf_counter() - start
+        self.events.flush()
+
+        results, self.hand_results = self.hand_results, None
+        return {
+            'hands': len(results),
+            'elapsed': elapsed,
+            'hands_per_second': len(results) / elapsed if elapsed > 0 else 0.0,
+            'results': results,
+        }
+
+
     def run_game(self):
         while True:
             try:
@@ -240,15 +531,198 @@ class StateMachine:
 
 
 
-class SpinAndGo():
-    def __init__(self, blind_structure, initial_stack):
-        pass
-
+def push_fold_agent(player, big_blind, bet_to_match, last_raise):
+    # Headless tournament default: all in with a pair, two cards ten or higher or under ten big blinds, otherwise
+    # check when free and fold to a bet
+    low_rank, high_rank = sorted(card >> 2 for card in player.hole_cards)
+    if low_rank == high_rank or low_rank >= 8 or player.stack_size <= 10 * big_blind:
+        return Action('ALL_IN')
+    if player.round_bet >= bet_to_match:
+        return Action('CHECK', bet_to_match)
+    return Action('FOLD')
 
-class HeadsUp():
-    def __init__(self, blind_structure):
-        pass
 
 class Tournament():
-    def __init__(self, max_seats, initial_stack, starting_players, level_durations=None):
-        pass
\ No newline at end of file
+    # Runs a multi-table tournament headless in rounds: every table plays one hand, the busted players are placed,
+    # then tables are broken and balanced before the next round. table_players indexes who sits at each table,
+    # player_table where each player sits, and tables_by_count buckets the table ids by how many players they seat,
+    # so the fullest and the emptiest table are found in max_seats steps however many tables are running.
+    # Blinds come from blind_structure through one LevelScheduler shared by every table, moving up a level after
+    # level_durations rounds, or level_durations minutes when a clock is given (see LevelScheduler).
+    def __init__(self, max_seats, initial_stack, starting_players, level_durations=None, blind_structure=None, agents=None, seed=None, headless=True, clock=None):
+        self.max_seats = max_seats
+        self.initial_stack = initial_stack
+        self.blind_structure = blind_structure if blind_structure is not None else BlindStructure()
+        if level_durations is None and clock is None:
+            level_durations = 10
+        self.level_scheduler = LevelScheduler(self.blind_structure, level_durations, clock)
+        self.headless = headless
+        self.seed = seed
+
+        # starting_players is a player count or a list of Players
+        if isinstance(starting_players, int):
+            starting_players = [Player(f"Player {i+1}", initial_stack, Model(f"Model{i+1}")) for i in range(starting_players)]
+        self.players = starting_players
+        for player in self.players:
+            player.stack_size = initial_stack
+            player.agent = agents if agents is not None else push_fold_agent
+
+        self.rounds = 0
+        self.hands = 0
+        self.moves = 0
+        self.tables_broken = 0
+        self.places = []  # Busted players, first out first
+        self.players_left = len(self.players)
+
+        self.table_config = dict(TableConfig().tourney_configs['small'], max_seats=max_seats, blinds=self.level_scheduler.blinds)
+        self.tables = {}
+        self.table_players = {}
+        self.player_table = {}
+        self.tables_by_count = [set() for _ in range(max_seats + 1)]
+
+        # Players are dealt round robin, so no two tables start more than one player apart
+        num_tables = -(-len(self.players) // max_seats)
+        for table_id in range(num_tables):
+            self.open_table(table_id, self.players[table_id::num_tables])
+
+
+    def open_table(self, table_id, players):
+        self.tables[table_id] = StateMachine.for_players(f'table {table_id}', self.table_config, players, self.seed, table_id, self.headless)
+        self.tables[table_id].level_scheduler = self.level_scheduler
+        self.table_players[table_id] = list(players)
+        for player in players:
+            self.player_table[player] = table_id
+        self.tables_by_count[len(players)].add(table_id)
+
+
+    def table_count(self, table_id):
+        return len(self.table_players[table_id])
+
+
+    def fullest_table(self):
+        for count in range(self.max_seats, -1, -1):
+            if self.tables_by_count[count]:
+                return next(iter(self.tables_by_count[count]))
+
+
+    def emptiest_table(self, exclude=None):
+        for count in range(self.max_seats + 1):
+            for table_id in self.tables_by_count[count]:
+                if table_id != exclude:
+                    return table_id
+
+
+    def remove_from_table(self, player, table_id):
+        players = self.table_players[table_id]
+        self.tables_by_count[len(players)].discard(table_id)
+        players.remove(player)
+        self.tables_by_count[len(players)].add(table_id)
+        del self.player_table[player]
+
+
+    def add_to_table(self, player, table_id):
+        players = self.table_players[table_id]
+        self.tables_by_count[len(players)].discard(table_id)
+        players.append(player)
+        self.tables_by_count[len(players)].add(table_id)
+        self.player_table[player] = table_id
+
+
+    def move_player(self, player, from_table, to_table):
+        self.tables[from_table].unseat_player(player)
+        self.remove_from_table(player, from_table)
+        self.tables[to_table].seat_player(player)
+        self.add_to_table(player, to_table)
+        self.moves += 1
+
+
+    def player_to_move(self, table_id):
+        # The player due the big blind next, so a move never makes anyone pay the blinds twice in a row
+        table = self.tables[table_id]
+        seats = table.all_players
+        seat = getattr(table.table_manager, 'big_blind_position', -1)
+        for step in range(1, len(seats) + 1):
+            player = seats[(seat + step) % len(seats)]
+            if player is not None:
+                return player
+
+
+    def break_table(self, table_id):
+        # Seats every player of the table at the emptiest of the others
+        self.tables_broken += 1
+        for player in list(self.table_players[table_id]):
+            self.move_player(player, table_id, self.emptiest_table(exclude=table_id))
+        self.tables_by_count[0].discard(table_id)
+        del self.tables[table_id]
+        del self.table_players[table_id]
+
+
+    def balance_tables(self):
+        # Break tables while the others have the seats for everyone, then move players from the fullest table to
+        # the emptiest until no two tables are more than one player apart
+        while len(self.tables) > 1 and self.players_left <= (len(self.tables) - 1) * self.max_seats:
+            self.break_table(self.emptiest_table())
+        while True:
+            fullest, emptiest = self.fullest_table(), self.emptiest_table()
+            if self.table_count(fullest) - self.table_count(emptiest) <= 1:
+                break
+            self.move_player(self.player_to_move(fullest), fullest, emptiest)
+
+
+    def play_round(self):
+        # One hand at every table, busted players are placed by their stack at the start of the hand (the smaller
+        # stack finishes lower) and leave the index before the tables are balanced
+        busted = []
+        for table_id, table in self.tables.items():
+            if self.table_count(table_id) < 2:
+                continue
+            self.hands += table.run_hands(1)['hands']
+            for player, stack_size in table.starting_stacks:
+                if player.stack_size == 0:
+                    busted.append((stack_size, player))
+                    self.remove_from_table(player, table_id)
+        busted.sort(key=lambda bust: bust[0])
+        self.places.extend(player for _, player in busted)
+        self.players_left -= len(busted)
+        self.rounds += 1
+
+        # The tables pick up a new level themselves when their next hand starts
+        self.level_scheduler.hands_played(self.rounds)
+        self.level_scheduler.check_clock()
+        if self.players_left > 1:
+            self.balance_tables()
+
+
+    def run(self, max_rounds=None):
+        # Plays until one player has every chip, or for max_rounds rounds, and returns the finishing order winner first
+        start = time.perf_counter()
+        while self.players_left > 1 and (max_rounds is None or self.rounds < max_rounds):
+            self.play_round()
+        elapsed = time.perf_counter() - start
+
+        standing = sorted((player for player in self.player_table), key=lambda player: player.stack_size, reverse=True)
+        return {
+            'players': len(self.players),
+            'rounds': self.rounds,
+            'hands': self.hands,
+            'level': self.level_scheduler.level,
+            'tables_broken': self.tables_broken,
+            'moves': self.moves,
+            'elapsed': elapsed,
+            'hands_per_second': self.hands / elapsed if elapsed > 0 else 0.0,
+            'places': [player.name for player in standing + self.places[::-1]],
+        }
+
+
+class SpinAndGo(Tournament):
+    # Three players at one table, down to a winner
+    def __init__(self, blind_structure, initial_stack, level_durations=None, agents=None, seed=None, headless=True, clock=None):
+        super().__init__(3, initial_stack, 3, level_durations, blind_structure, agents, seed, headless, clock)
+
+
+class HeadsUp(Tournament):
+    # Two players, fifty big blinds of the first level each unless initial_stack says otherwise
+    def __init__(self, blind_structure, initial_stack=None, level_durations=None, agents=None, seed=None, headless=True, clock=None):
+        blind_structure = blind_structure if blind_structure is not None else BlindStructure()
+        initial_stack = initial_stack if initial_stack is not None else 50 * blind_structure.get_blinds(0)[1]
+        super().__init__(2, initial_stack, 2, level_durations, blind_structure, agents, seed, headless, clock)
@@ -0,0 +1,83 @@
+class GameSnapshot:
+    # Everything a StateMachine needs to resume its hand: the table's own fields, the PokerGame betting state, the
+    # pots, the button, the deck position and a copy of every seated player's fields. Taking one copies O(players)
+    # flat values and never walks the rest of the object graph (evaluators, caches, models, agents).
+    #
+    # A snapshot is never changed after it is taken, so it can be restored any number of times. Lists that other
+    # objects hold on to (the seats, the side pots, the community cards) are saved with their identity and refilled
+    # in place, which keeps a betting_steps generator suspended around a search valid. The active and eligible
+    # players are TableManagement's shared tuples, never changed in place, so they are saved as they are.
+    __slots__ = ('state', 'hand_number', 'lists', 'player_lists', 'board_state', 'current_board_texture', 'ranked_players',
+                 'starting_stacks', 'winning_players', 'num_hand_results', 'game', 'buttons', 'pot_value',
+                 'side_pots', 'deck', 'players', 'round_lists', 'seat_masks')
+
+    def __init__(self, table):
+        self.state = table.state
+        self.hand_number = table.hand_number
+        community_pot = table.community_pot
+        # (list, contents) for every list shared between the table, its managers and a suspended betting round
+        self.lists = tuple((shared, tuple(shared)) for shared in (
+            table.community_cards,
+            table.table['seats'],
+            table.table['player_activity']['active_players'],
+        ))
+        self.player_lists = (table.active_players, table.eligible_players, community_pot['eligible_players'])
+        self.board_state = table.board_state.copy()
+        self.current_board_texture = table.current_board_texture
+        self.ranked_players = table.ranked_players
+        self.starting_stacks = table.starting_stacks
+        self.winning_players = table.winning_players
+        self.num_hand_results = None if table.hand_results is None else len(table.hand_results)
+
+        game = table.game
+        self.game = (game.bet_to_match, game.last_raise, game.bet_counter, getattr(game, 'raise_counter', 0),
+                     game.all_players, game.street_name, game.round_start, game.acting_index, tuple(game.action_stack))
+        # The open round's own lists, kept apart from the table's until the round ends
+        self.round_lists = (game.active_players, game.eligible_players)
+        table_manager = table.table_manager
+        self.buttons = (table_manager.dealer_position, getattr(table_manager, 'small_blind_position', None), getattr(table_manager, 'big_blind_position', None))
+        self.seat_masks = table_manager.seat_masks()
+        self.pot_value = community_pot['pot_value']
+        self.side_pots = tuple((pot['pot_value'], tuple(pot['eligible_players'])) for pot in table.side_pots)
+
+        deck = table.deck
+        self.deck = (bytes(deck.cards), deck.position, deck.used_mask, table.shuffled_deck is deck)
+
+        # The hole card list is the one player field changed in place, dealing appends to it
+        self.players = tuple((player, tuple(player.hole_cards), player.__dict__.copy()) for player in table.table['seats'] if player is not None)
+
+
+    def restore(self, table):
+        table.state = self.state
+        table.hand_number = table.events.hand_number = self.hand_number
+        for shared, contents in self.lists:
+            shared[:] = contents
+        table.community_cards = self.lists[0][0]
+        table.active_players, table.eligible_players, table.community_pot['eligible_players'] = self.player_lists
+        table.board_state = self.board_state.copy()
+        table.current_board_texture = self.current_board_texture
+        table.ranked_players = self.ranked_players
+        table.starting_stacks = self.starting_stacks
+        table.winning_players = self.winning_players
+        if self.num_hand_results is not None and table.hand_results is not None:
+            del table.hand_results[self.num_hand_results:]  # Drop the results of hands played out after the snapshot
+
+        game = table.game
+        game.bet_to_match, game.last_raise, game.bet_counter, game.raise_counter, game.all_players, game.street_name, game.round_start, game.acting_index, action_stack = self.game
+        game.action_stack[:] = action_stack
+        game.active_players, game.eligible_players = self.round_lists
+        table_manager = table.table_manager
+        table_manager.dealer_position, table_manager.small_blind_position, table_manager.big_blind_position = self.buttons
+        table_manager.set_seat_masks(self.seat_masks)
+        table.community_pot['pot_value'] = self.pot_value
+        table.side_pots[:] = [{'pot_value': pot_value, 'eligible_players': list(pot_players)} for pot_value, pot_players in self.side_pots]
+
+        cards, position, used_mask, dealing = self.deck
+        table.deck.set_order(cards)
+        table.deck.position = position
+        table.deck.used_mask = used_mask
+        table.shuffled_deck = table.deck if dealing else []
+
+        for player, hole_cards, fields in self.players:
+            player.__dict__.update(fields)
+            player.hole_cards = list(hole_cards)
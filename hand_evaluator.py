@@ -0,0 +1,372 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class HandEvaluator:
+    # Cards are integers 0-51 encoded as rank * 4 + suit, the same order DeckManager.create_deck builds them in.
+    # A hand strength is one integer: the category in the top bits followed by the ranks of the five
+    # cards that make the hand (4 bits each), so comparing two strengths compares the two hands.
+    HAND_RANKS = {
+        'ROYAL_FLUSH': 9,
+        'STRAIGHT_FLUSH': 8,
+        'FOUR_OF_A_KIND': 7,
+        'FULL_HOUSE': 6,
+        'FLUSH': 5,
+        'STRAIGHT': 4,
+        'THREE_OF_A_KIND': 3,
+        'TWO_PAIR': 2,
+        'ONE_PAIR': 1,
+        'HIGH_CARD': 0
+    }
+
+    CATEGORY_SHIFT = 20
+    MAX_CARDS = 7
+
+    # Every card adds 5 ** rank to the low 32 bits (at most four of a rank, so the base-5 digits never carry)
+    # and 1 to the 4-bit counter of its suit starting at bit 32
+    SUIT_SHIFT = 32
+    RANK_KEY_MASK = (1 << SUIT_SHIFT) - 1
+    CARD_KEYS = [5 ** (card >> 2) + (1 << (32 + 4 * (card & 3))) for card in range(52)]
+
+    # Non-flush strengths keyed by the rank part of the card key, flush strengths indexed by a 13-bit rank mask
+    RANK_TABLE = None
+    FLUSH_TABLE = None
+
+    # NumPy copies of the tables for evaluate_batch: the rank table becomes a sorted key array searched with searchsorted
+    BATCH_CARD_KEYS = np.array(CARD_KEYS, dtype=np.int64)
+    BATCH_RANK_KEYS = None
+    BATCH_RANK_STRENGTHS = None
+    BATCH_FLUSH_TABLE = None
+
+    # Exactly seven cards get a direct-indexed table instead: these rank weights give every 7-card rank multiset
+    # a distinct sum below 7.9 million (they are not unique for fewer cards)
+    SEVEN_CARD_RANK_WEIGHTS = [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181]
+    BATCH_SEVEN_CARD_KEYS = np.repeat(np.array(SEVEN_CARD_RANK_WEIGHTS, dtype=np.int64), 4) + np.tile(1 << (SUIT_SHIFT + 4 * np.arange(4, dtype=np.int64)), 13)
+    BATCH_SEVEN_CARD_TABLE = None
+    BATCH_CHUNK_SIZE = 1 << 16
+
+
+    @staticmethod
+    def evaluate(cards):
+        if HandEvaluator.RANK_TABLE is None:
+            HandEvaluator.build_tables()
+
+        key = 0
+        for card in cards:
+            key += HandEvaluator.CARD_KEYS[card]
+
+        # Adding 3 to every suit counter sets its high bit only when the suit has five or more cards
+        flush_bits = ((key >> HandEvaluator.SUIT_SHIFT) + 0x3333) & 0x8888
+        if flush_bits:
+            # With seven cards a flush always beats quads and full houses, so only the flush suit matters
+            flush_suit = (flush_bits.bit_length() - 4) >> 2
+            rank_mask = 0
+            for card in cards:
+                if card & 3 == flush_suit:
+                    rank_mask |= 1 << (card >> 2)
+            return HandEvaluator.FLUSH_TABLE[rank_mask]
+
+        return HandEvaluator.RANK_TABLE[key & HandEvaluator.RANK_KEY_MASK]
+
+
+    @staticmethod
+    def evaluate_batch(cards, out=None, chunk_size=None):
+        # cards is an (N, 7) integer array (any number of columns up to 7 works), returns an (N,) int32 strength array.
+        # Rows are processed chunk_size at a time so the temporaries stay bounded however large N is.
+        if HandEvaluator.BATCH_RANK_KEYS is None:
+            HandEvaluator.build_batch_tables()
+
+        cards = np.asarray(cards)
+        if cards.ndim != 2 or cards.shape[1] > HandEvaluator.MAX_CARDS:
+            raise ValueError(f"Expected an (N, k) card array with k <= {HandEvaluator.MAX_CARDS}, got shape {cards.shape}")
+
+        num_hands = cards.shape[0]
+        if out is None:
+            out = np.empty(num_hands, dtype=np.int32)
+        chunk_size = chunk_size or HandEvaluator.BATCH_CHUNK_SIZE
+
+        for start in range(0, num_hands, chunk_size):
+            stop = min(start + chunk_size, num_hands)
+            HandEvaluator.evaluate_chunk(cards[start:stop], out[start:stop])
+
+        return out
+
+
+    @staticmethod
+    def evaluate_chunk(cards, out):
+        cards = cards.astype(np.intp, copy=False)
+        if cards.shape[1] == HandEvaluator.MAX_CARDS:
+            keys = HandEvaluator.BATCH_SEVEN_CARD_KEYS[cards].sum(axis=1)
+            out[:] = HandEvaluator.BATCH_SEVEN_CARD_TABLE[keys & HandEvaluator.RANK_KEY_MASK]
+        else:
+            keys = HandEvaluator.BATCH_CARD_KEYS[cards].sum(axis=1)
+            rank_keys = keys & HandEvaluator.RANK_KEY_MASK
+            out[:] = HandEvaluator.BATCH_RANK_STRENGTHS[np.searchsorted(HandEvaluator.BATCH_RANK_KEYS, rank_keys)]
+
+        flush_bits = ((keys >> HandEvaluator.SUIT_SHIFT) + 0x3333) & 0x8888
+        flush_rows = np.flatnonzero(flush_bits)
+        if len(flush_rows):
+            flush_bits = flush_bits[flush_rows]
+            # Only one suit can hold five of seven cards, so its counter bit is the only one set
+            flush_suit = (flush_bits > 0x8).astype(np.int64) + (flush_bits > 0x80) + (flush_bits > 0x800)
+            flush_cards = cards[flush_rows]
+            rank_bits = np.where((flush_cards & 3) == flush_suit[:, None], 1 << (flush_cards >> 2), 0)
+            rank_masks = np.bitwise_or.reduce(rank_bits, axis=1)
+            out[flush_rows] = HandEvaluator.BATCH_FLUSH_TABLE[rank_masks]
+
+
+    @staticmethod
+    def get_category(strength):
+        return strength >> HandEvaluator.CATEGORY_SHIFT
+
+
+    @staticmethod
+    def describe(strength, cards, card_ints):
+        # Rebuild the (hand rank, best five cards) result from a strength, picking the matching cards from `cards`
+        category = strength >> HandEvaluator.CATEGORY_SHIFT
+        num_cards = min(5, len(cards))
+        hand_ranks = [(strength >> (16 - 4 * i)) & 0xF for i in range(num_cards)]
+
+        pool = sorted(zip(card_ints, cards), key=lambda pair: pair[0], reverse=True)
+        if category in (HandEvaluator.HAND_RANKS['FLUSH'], HandEvaluator.HAND_RANKS['STRAIGHT_FLUSH'], HandEvaluator.HAND_RANKS['ROYAL_FLUSH']):
+            suit_counts = [0] * 4
+            for card, _ in pool:
+                suit_counts[card & 3] += 1
+            flush_suit = suit_counts.index(max(suit_counts))
+            pool = [pair for pair in pool if pair[0] & 3 == flush_suit]
+
+        best_cards = []
+        for rank in hand_ranks:
+            for i, (card, original_card) in enumerate(pool):
+                if card >> 2 == rank:
+                    best_cards.append(original_card)
+                    pool.pop(i)
+                    break
+
+        return (category, best_cards)
+
+
+    @staticmethod
+    def encode_strength(category, hand_ranks):
+        strength = category << HandEvaluator.CATEGORY_SHIFT
+        for i, rank in enumerate(hand_ranks):
+            strength |= rank << (16 - 4 * i)
+        return strength
+
+
+    @staticmethod
+    def straight_ranks(rank_mask):
+        # Returns the ranks of the highest straight in the mask (ace playing low in the wheel), or None
+        for high in range(12, 3, -1):
+            if (rank_mask >> (high - 4)) & 0x1F == 0x1F:
+                return [high, high - 1, high - 2, high - 3, high - 4]
+        if rank_mask & 0x100F == 0x100F:
+            return [3, 2, 1, 0, 12]
+        return None
+
+
+    @staticmethod
+    def strength_from_counts(rank_counts):
+        hand_ranks = HandEvaluator.HAND_RANKS
+        ranks = [rank for rank in range(12, -1, -1) if rank_counts[rank]]
+        quads = [rank for rank in ranks if rank_counts[rank] == 4]
+        trips = [rank for rank in ranks if rank_counts[rank] == 3]
+        pairs = [rank for rank in ranks if rank_counts[rank] == 2]
+
+        if quads:
+            kickers = [rank for rank in ranks if rank != quads[0]][:1]
+            return HandEvaluator.encode_strength(hand_ranks['FOUR_OF_A_KIND'], [quads[0]] * 4 + kickers)
+
+        if trips and (len(trips) > 1 or pairs):
+            # A second set of trips can fill the pair
+            pair = max(trips[1:2] + pairs[:1])
+            return HandEvaluator.encode_strength(hand_ranks['FULL_HOUSE'], [trips[0]] * 3 + [pair] * 2)
+
+        rank_mask = 0
+        for rank in ranks:
+            rank_mask |= 1 << rank
+        straight = HandEvaluator.straight_ranks(rank_mask)
+        if straight:
+            return HandEvaluator.encode_strength(hand_ranks['STRAIGHT'], straight)
+
+        if trips:
+            kickers = [rank for rank in ranks if rank != trips[0]][:2]
+            return HandEvaluator.encode_strength(hand_ranks['THREE_OF_A_KIND'], [trips[0]] * 3 + kickers)
+
+        if len(pairs) >= 2:
+            # A third pair can still play as the kicker
+            kickers = [rank for rank in ranks if rank not in pairs[:2]][:1]
+            return HandEvaluator.encode_strength(hand_ranks['TWO_PAIR'], [pairs[0]] * 2 + [pairs[1]] * 2 + kickers)
+
+        if pairs:
+            kickers = [rank for rank in ranks if rank != pairs[0]][:3]
+            return HandEvaluator.encode_strength(hand_ranks['ONE_PAIR'], [pairs[0]] * 2 + kickers)
+
+        return HandEvaluator.encode_strength(hand_ranks['HIGH_CARD'], ranks[:5])
+
+
+    @staticmethod
+    def strength_from_flush_mask(rank_mask):
+        hand_ranks = HandEvaluator.HAND_RANKS
+        straight = HandEvaluator.straight_ranks(rank_mask)
+        if straight:
+            category = hand_ranks['ROYAL_FLUSH'] if straight[0] == 12 else hand_ranks['STRAIGHT_FLUSH']
+            return HandEvaluator.encode_strength(category, straight)
+
+        ranks = [rank for rank in range(12, -1, -1) if rank_mask >> rank & 1]
+        return HandEvaluator.encode_strength(hand_ranks['FLUSH'], ranks[:5])
+
+
+    @staticmethod
+    def build_tables():
+        # Walk every rank multiset of up to seven cards (at most four of each rank) once
+        rank_table = {}
+        rank_counts = [0] * 13
+
+        def visit(rank, num_cards, key):
+            if rank == 13:
+                if num_cards:
+                    rank_table[key] = HandEvaluator.strength_from_counts(rank_counts)
+                return
+            for count in range(min(4, HandEvaluator.MAX_CARDS - num_cards) + 1):
+                rank_counts[rank] = count
+                visit(rank + 1, num_cards + count, key + count * 5 ** rank)
+            rank_counts[rank] = 0
+
+        visit(0, 0, 0)
+
+        flush_table = [0] * (1 << 13)
+        for rank_mask in range(1 << 13):
+            if bin(rank_mask).count('1') >= 5:
+                flush_table[rank_mask] = HandEvaluator.strength_from_flush_mask(rank_mask)
+
+        HandEvaluator.RANK_TABLE = rank_table
+        HandEvaluator.FLUSH_TABLE = flush_table
+
+
+    @staticmethod
+    def build_batch_tables():
+        if HandEvaluator.RANK_TABLE is None:
+            HandEvaluator.build_tables()
+
+        rank_keys = np.fromiter(HandEvaluator.RANK_TABLE.keys(), dtype=np.int64, count=len(HandEvaluator.RANK_TABLE))
+        rank_strengths = np.fromiter(HandEvaluator.RANK_TABLE.values(), dtype=np.int32, count=len(HandEvaluator.RANK_TABLE))
+        order = np.argsort(rank_keys)
+
+        HandEvaluator.BATCH_RANK_KEYS = rank_keys[order]
+        HandEvaluator.BATCH_RANK_STRENGTHS = rank_strengths[order]
+
+        # Re-key the 7-card entries: unpack the base-5 digits into rank counts and weight them
+        rank_counts = (rank_keys[:, None] // 5 ** np.arange(13, dtype=np.int64)) % 5
+        seven_cards = rank_counts.sum(axis=1) == HandEvaluator.MAX_CARDS
+        seven_card_keys = rank_counts[seven_cards] @ np.array(HandEvaluator.SEVEN_CARD_RANK_WEIGHTS, dtype=np.int64)
+        seven_card_table = np.zeros(seven_card_keys.max() + 1, dtype=np.int32)
+        seven_card_table[seven_card_keys] = rank_strengths[seven_cards]
+        HandEvaluator.BATCH_SEVEN_CARD_TABLE = seven_card_table
+        HandEvaluator.BATCH_FLUSH_TABLE = np.array(HandEvaluator.FLUSH_TABLE, dtype=np.int32)
+
+
+class HandState:
+    # Running card key and per-suit rank masks for a growing set of cards, so adding a card and reading the
+    # best hand are both constant time. A board state and a hole-card state are combined without re-adding cards.
+    __slots__ = ('key', 'suit_masks', 'num_cards')
+
+    def __init__(self, cards=()):
+        if HandEvaluator.RANK_TABLE is None:
+            HandEvaluator.build_tables()
+
+        self.key = 0
+        self.suit_masks = [0, 0, 0, 0]
+        self.num_cards = 0
+        for card in cards:
+            self.add_card(card)
+
+    def add_card(self, card):
+        self.key += HandEvaluator.CARD_KEYS[card]
+        self.suit_masks[card & 3] |= 1 << (card >> 2)
+        self.num_cards += 1
+
+    def add_cards(self, cards):
+        for card in cards:
+            self.add_card(card)
+
+    def copy(self):
+        state = HandState.__new__(HandState)
+        state.key = self.key
+        state.suit_masks = list(self.suit_masks)
+        state.num_cards = self.num_cards
+        return state
+
+    def strength(self):
+        flush_bits = ((self.key >> HandEvaluator.SUIT_SHIFT) + 0x3333) & 0x8888
+        if flush_bits:
+            return HandEvaluator.FLUSH_TABLE[self.suit_masks[(flush_bits.bit_length() - 4) >> 2]]
+        return HandEvaluator.RANK_TABLE[self.key & HandEvaluator.RANK_KEY_MASK]
+
+    def combined_strength(self, other):
+        key = self.key + other.key
+        flush_bits = ((key >> HandEvaluator.SUIT_SHIFT) + 0x3333) & 0x8888
+        if flush_bits:
+            flush_suit = (flush_bits.bit_length() - 4) >> 2
+            return HandEvaluator.FLUSH_TABLE[self.suit_masks[flush_suit] | other.suit_masks[flush_suit]]
+        return HandEvaluator.RANK_TABLE[key & HandEvaluator.RANK_KEY_MASK]
+
+
+class EvaluationCache:
+    # Bounded LRU memo with hit/miss/eviction counters. evaluate() keys hand strengths on the suit-canonical
+    # card set (the sorted per-suit rank masks), so hands that only differ by a relabelling of suits share an entry.
+    def __init__(self, max_size=1 << 20):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def canonical_key(cards):
+        suit_masks = [0, 0, 0, 0]
+        for card in cards:
+            suit_masks[card & 3] |= 1 << (card >> 2)
+        suit_masks.sort()
+        return (suit_masks[0] << 39) | (suit_masks[1] << 26) | (suit_masks[2] << 13) | suit_masks[3]
+
+    def lookup(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def evaluate(self, cards):
+        key = EvaluationCache.canonical_key(cards)
+        strength = self.lookup(key)
+        if strength is None:
+            strength = HandEvaluator.evaluate(cards)
+            self.store(key, strength)
+        return strength
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
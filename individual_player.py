@@ -1,11 +1,22 @@
+from hand_evaluator import HandEvaluator
+
+
 class Player:
     def __init__(self, name, stack_size, model):
         self.name = name
         self.stack_size = stack_size
         self.model = model
+        # A non-interactive agent, agent(player, big_blind, bet_to_match, last_raise) -> Action, replaces the prompt
+        self.agent = None
+        self.verbose = True
+        self.time_bank = 0  # Seconds of extra thinking time left, only used by clocked tables
 
         self.hole_cards = []
+        self.hand_state = None
+        self.hand_strength = None
+        self.hand_board = ()
         self.current_hand_rank = None
+        self.equity = None
         
         self.is_waiting = False
         self.is_sitting_out = False
@@ -24,9 +35,27 @@ class Player:
         self.round_bet = 0
         self.total_bet = 0
      
+    @property
+    def current_hand_rank(self):
+        # The (hand rank, best five cards) form is only built when something asks for it
+        if self._current_hand_rank is None and self.hand_strength is not None:
+            hand_cards = self.hole_cards + list(self.hand_board)
+            self._current_hand_rank = HandEvaluator.describe(self.hand_strength, hand_cards, hand_cards)
+        return self._current_hand_rank
+
+    @current_hand_rank.setter
+    def current_hand_rank(self, hand_rank):
+        self._current_hand_rank = hand_rank
+
+    def set_hand_strength(self, hand_strength, board):
+        self.hand_strength = hand_strength
+        self.hand_board = board
+        self._current_hand_rank = None
+
     def pay_ante(self, ante_amount):
         if ante_amount >= self.stack_size:
-            print(f"{self.name} does not have enough chips. Going all-in.")
+            if self.verbose:
+                print(f"{self.name} does not have enough chips. Going all-in.")
             self.is_all_in = True
             all_in_value = self.stack_size
             self.stack_size = 0
@@ -37,14 +66,15 @@ class Player:
             self.total_bet += ante_amount
             return ante_amount
 
-    def fold(self, eligible_players):
+    def fold(self, eligible_players=None):
+        # A PokerGame reads the eligible players back from the seat masks, only a list passed in is changed
         self.hole_cards = []  # discard hand
         self.is_folded = True
         self.is_eligible_for_pot = False
         self.last_bet = 0
         
         # if player's name is in the community pot eligible players list
-        if self in eligible_players:
+        if eligible_players is not None and self in eligible_players:
             eligible_players.remove(self)
 
     def check(self, bet_to_match):
@@ -55,7 +85,8 @@ class Player:
 
     def bet(self, bet_amount):
         if bet_amount >= self.stack_size:
-            print(f"{self.name} does not have enough chips. Going all-in.")
+            if self.verbose:
+                print(f"{self.name} does not have enough chips. Going all-in.")
             return self.all_in()  # All_in will return the amount to be added to the pot
         else:
             self.stack_size -= bet_amount
@@ -75,7 +106,8 @@ class Player:
 
     def call(self, bet_to_match):
         if bet_to_match >= self.stack_size:
-            print(f"Call put {self.name} all in")
+            if self.verbose:
+                print(f"Call put {self.name} all in")
             return self.all_in()
         call_amount = bet_to_match - self.round_bet
         self.stack_size -= call_amount
@@ -103,7 +135,11 @@ class Player:
 
     def reset_for_new_hand(self):
         self.hole_cards = []
+        self.hand_state = None
+        self.hand_strength = None
+        self.hand_board = ()
         self.current_hand_rank = None
+        self.equity = None
         self.is_eligible_for_pot = True
         self.has_acted = False
         self.is_folded = False
@@ -113,6 +149,12 @@ class Player:
         self.total_bet = 0
 
 
+    def decide(self, big_blind, bet_to_match, last_raise):
+        if self.agent is not None:
+            return self.agent(self, big_blind, bet_to_match, last_raise)
+        return self.make_decision(big_blind, bet_to_match, last_raise)
+
+
     def make_decision_test(self, big_blind, bet_to_match, last_raise):
         
         bet_amount = bet_to_match
@@ -0,0 +1,188 @@
+import time
+from collections import deque
+
+from game_management import StateMachine
+from table_config import TableConfig
+
+
+class Lobby:
+    # The cash tables of every config, indexed so that seating a player never scans them. tables_by_open[config][n]
+    # holds the ids of the config's tables with n open seats, so the fullest table with a free seat is found in
+    # max_seats steps however many tables are open, and config_names_by_stakes finds the configs playing a
+    # (small blind, big blind, ante). Every table has a FIFO waiting list and every config one for the first seat
+    # at any of its tables. Waiting players are seated between hands by hand_finished, the table's own list first.
+    # Like StateMachine.seat_player, everything here happens between hands.
+    def __init__(self, headless=True, seed=None, configs=None):
+        self.headless = headless
+        self.seed = seed
+        self.configs = configs if configs is not None else TableConfig().cash_configs
+        self.config_names_by_stakes = {}
+        for config_name, config in self.configs.items():
+            self.config_names_by_stakes.setdefault(tuple(config['blinds']), []).append(config_name)
+
+        self.tables = {}
+        self.table_configs = {}  # table_id -> config name
+        self.open_seats = {}  # table_id -> open seats
+        self.tables_by_open = {config_name: [set() for _ in range(config['max_seats'] + 1)] for config_name, config in self.configs.items()}
+        self.player_table = {}
+
+        # Leaving the line only drops the player from waiting_for, queue entries whose ticket no longer matches
+        # are skipped when they come up
+        self.table_waiting = {}  # table_id -> deque of (ticket, player)
+        self.config_waiting = {config_name: deque() for config_name in self.configs}
+        self.waiting_for = {}  # player -> (table_id or config name, ticket)
+        self.next_ticket = 0
+        self.next_table_id = 0
+
+
+    def config_names(self, blinds):
+        return self.config_names_by_stakes.get(tuple(blinds), [])
+
+
+    def open_table(self, config_name, players=()):
+        # Seats players and then the head of the config's waiting list at a new table in one go, returns its id
+        config = self.configs[config_name]
+        players = list(players)
+        for player in players[config['max_seats']:]:
+            self.add_waiting(player, config_name, self.config_waiting[config_name])
+        players = players[:config['max_seats']]
+        while len(players) < config['max_seats']:
+            player = self.pop_waiting(config_name, self.config_waiting[config_name])
+            if player is None:
+                break
+            players.append(player)
+
+        table_id = self.next_table_id
+        self.next_table_id += 1
+        for player in players:
+            self.leave(player)
+        table = StateMachine.for_players(f'{config_name} {table_id}', config, players, self.seed, table_id, self.headless)
+
+        self.tables[table_id] = table
+        self.table_configs[table_id] = config_name
+        self.table_waiting[table_id] = deque()
+        for player in players:
+            self.player_table[player] = table_id
+        self.open_seats[table_id] = table.table_manager.open_seats()
+        self.tables_by_open[config_name][self.open_seats[table_id]].add(table_id)
+        return table_id
+
+
+    def find_table(self, config_name):
+        # The fullest table of the config with a free seat, None when they are all full
+        buckets = self.tables_by_open[config_name]
+        for open_seats in range(1, len(buckets)):
+            if buckets[open_seats]:
+                return next(iter(buckets[open_seats]))
+        return None
+
+
+    def join(self, player, config_name=None, table_id=None, blinds=None):
+        # Seats a player at table_id, or at the fullest table of config_name (or of the first config playing
+        # blinds) with a free seat. Returns the table id, or None when the player joined the waiting list instead.
+        if table_id is not None:
+            self.add_waiting(player, table_id, self.table_waiting[table_id])
+            self.fill_seats(table_id)
+            return self.player_table.get(player) if player not in self.waiting_for else None
+
+        if config_name is None:
+            if blinds is None:
+                raise ValueError("join needs a table_id, a config_name or blinds")
+            config_names = self.config_names(blinds)
+            if not config_names:
+                raise ValueError(f"No table config plays blinds {tuple(blinds)}")
+            config_name = config_names[0]
+        table_id = self.find_table(config_name)
+        if table_id is None or self.config_waiting[config_name]:
+            self.add_waiting(player, config_name, self.config_waiting[config_name])
+            if table_id is not None:
+                self.fill_seats(table_id)
+            return self.player_table.get(player) if player not in self.waiting_for else None
+        self.seat(player, table_id)
+        return table_id
+
+
+    def leave(self, player):
+        # Takes a player off their table, whose seat goes to the next in line, and out of the line
+        self.waiting_for.pop(player, None)
+        table_id = self.player_table.pop(player, None)
+        if table_id is not None:
+            self.tables[table_id].unseat_player(player)
+            self.fill_seats(table_id)
+
+
+    def seat(self, player, table_id):
+        # A player waiting for this table while playing at another one moves over, the seat they leave is filled
+        # after that table's next hand
+        moving_from = self.player_table.get(player)
+        if moving_from is not None:
+            self.tables[moving_from].unseat_player(player)
+            self.set_open_seats(moving_from)
+        self.tables[table_id].seat_player(player)
+        self.player_table[player] = table_id
+        self.set_open_seats(table_id)
+
+
+    def set_open_seats(self, table_id):
+        buckets = self.tables_by_open[self.table_configs[table_id]]
+        buckets[self.open_seats[table_id]].discard(table_id)
+        self.open_seats[table_id] = self.tables[table_id].table_manager.open_seats()
+        buckets[self.open_seats[table_id]].add(table_id)
+
+
+    def add_waiting(self, player, key, queue):
+        self.next_ticket += 1
+        self.waiting_for[player] = (key, self.next_ticket)
+        queue.append((self.next_ticket, player))
+
+
+    def pop_waiting(self, key, queue):
+        while queue:
+            ticket, player = queue.popleft()
+            if self.waiting_for.get(player) == (key, ticket):
+                del self.waiting_for[player]
+                return player
+        return None
+
+
+    def fill_seats(self, table_id):
+        # Seats waiting players while the table has room, the table's own list before the config's
+        config_name = self.table_configs[table_id]
+        table_manager = self.tables[table_id].table_manager
+        for key, queue in ((table_id, self.table_waiting[table_id]), (config_name, self.config_waiting[config_name])):
+            while queue and table_manager.open_seats():
+                player = self.pop_waiting(key, queue)
+                if player is None:
+                    break
+                self.seat(player, table_id)
+        self.set_open_seats(table_id)
+
+
+    def hand_finished(self, table_id):
+        # After a hand's reset: the busted players have left their seats and waiting players take them
+        table = self.tables[table_id]
+        for player, _ in table.starting_stacks:
+            if player.stack_size == 0 and self.player_table.get(player) == table_id:
+                del self.player_table[player]
+        self.fill_seats(table_id)
+
+
+    def run_hands(self, num_hands):
+        # Plays num_hands rounds of a hand at every table with two players or more, headless players need agents
+        start = time.perf_counter()
+        hands = 0
+        for _ in range(num_hands):
+            for table_id, table in self.tables.items():
+                if table.table_manager.count_active() >= 2:
+                    hands += table.run_hands(1)['hands']
+                    self.hand_finished(table_id)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'tables': len(self.tables),
+            'hands': hands,
+            'seated': len(self.player_table),
+            'waiting': len(self.waiting_for),
+            'elapsed': elapsed,
+            'hands_per_second': hands / elapsed if elapsed > 0 else 0.0,
+        }
@@ -9,21 +9,26 @@ from table_management import TableManagement
 GAME_TYPE = "cash_test"  # change this to control the game type
 STARTING_STACK = 10000
 NUM_PLAYERS = 9
-LEVEL_DURATION = 12 # set to hands for training, minutes for actual use
+TOURNAMENT_PLAYERS = 90
+LEVEL_DURATION = 12  # hands per level, or minutes when LEVEL_CLOCK is set
+LEVEL_CLOCK = None  # time.monotonic runs the blind levels on the clock for live play
 TOURNAMENT_BLINDS = None
 TABLE_NAME = 'low'
 BUY_IN = 'max_buy_in'
 
 
 if GAME_TYPE == "tournament":
-    # Create a tournament with the set number of seats, starting stack, and max players
-    tournament = Tournament(NUM_PLAYERS, STARTING_STACK, TOURNAMENT_BLINDS, LEVEL_DURATION)
+    # Create a tournament with the set number of seats, starting stack, and players, played out headless
+    tournament = Tournament(NUM_PLAYERS, STARTING_STACK, TOURNAMENT_PLAYERS, LEVEL_DURATION, TOURNAMENT_BLINDS, clock=LEVEL_CLOCK)
+    print(tournament.run())
 
 elif GAME_TYPE == "heads_up":
-    heads_up = HeadsUp(STARTING_STACK)
+    heads_up = HeadsUp(BlindStructure(), STARTING_STACK)
+    print(heads_up.run())
 
 elif GAME_TYPE == "spin_and_go":
-    spin_and_go = SpinAndGo(STARTING_STACK)
+    spin_and_go = SpinAndGo(BlindStructure(), STARTING_STACK)
+    print(spin_and_go.run())
 
 elif GAME_TYPE == "cash_test":
     cash_game = StateMachine(TABLE_NAME, NUM_PLAYERS, BUY_IN)
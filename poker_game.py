@@ -1,3 +1,7 @@
+from deck_management import DeckManager
+from game_events import ACTION, ActionEvent, EventBus
+
+
 class PokerGame:
     def __init__(self, table_manager, table, poker_hand, blinds, community_cards, community_pot, side_pots):
         self.table_manager = table_manager
@@ -12,24 +16,42 @@ class PokerGame:
         self.bet_counter = 0
 
         self.small_blind, self.big_blind, self.ante = blinds
+        self.verbose = True
+        self.events = EventBus(table_manager.table_name)  # A StateMachine hands its table's bus in instead
+
+        # The open betting round: its own active and eligible lists, where each pass over the seats starts (None
+        # between rounds) and the pass position of the player being waited on (None between passes)
+        self.all_players = None
+        self.street_name = None
+        self.active_players = None
+        self.eligible_players = None
+        self.round_start = None
+        self.acting_index = None
+        # One entry per action this hand, (undo record, reopened players, street, player, action type, bet to match
+        # before it, bet to match after it): undo_action pops them and state encoders read the betting history
+        # from the fields after the record, so they never depend on the record's layout
+        self.action_stack = []
 
 
     def player_info_print(self, player, street, bet_to_match, community_cards, community_pot, side_pots):
         print("\nIt's your turn, {}.".format(player.name))
-        print("Your hole cards are: ", [str(card) for card in player.hole_cards])
-        print("Your current Hand Rank is: ", player.current_hand_rank )
+        print("Your hole cards are: ", [str(card) for card in DeckManager.card_strings(player.hole_cards)])
+        hand_rank = player.current_hand_rank
+        if hand_rank is not None:
+            hand_rank = (hand_rank[0], DeckManager.card_strings(hand_rank[1]))
+        print("Your current Hand Rank is: ", hand_rank )
         print("Your current stack is: ", player.stack_size)
         print("Current bet to match is: ", bet_to_match)
         print("Your current bet is: ", player.round_bet)
         print("Current street is: ", street)
-        print("Community cards are: ", [str(card) for card in community_cards])
+        print("Community cards are: ", [str(card) for card in DeckManager.card_strings(community_cards)])
         print("Community pot size is: ", community_pot['pot_value'])
         print("Side pots are: ", side_pots)
 
 
     def betting_action(self, player, action, eligible_players):
         if action.type == "FOLD":
-            player.fold(eligible_players)
+            player.fold()  # eligible_players is a shared tuple, apply_action reads the new one after the fold
 
         elif action.type == "CHECK":
             player.check(action.amount)
@@ -56,63 +78,140 @@ class PokerGame:
 
         
     def betting_round(self, street, community_cards, active_players, eligible_players):
+        # Blocking driver: each player's own agent or console prompt answers on the spot
+        steps = self.betting_steps(street, community_cards, active_players, eligible_players)
+        try:
+            player = next(steps)
+            while True:
+                player = steps.send(player.decide(self.big_blind, self.bet_to_match, self.last_raise))
+        except StopIteration as finished:
+            return finished.value
+
+
+    def betting_steps(self, street, community_cards, active_players, eligible_players):
+        # The betting logic as a generator: it yields the player to act and is sent back their Action, so blocking
+        # and asyncio drivers share it. Returns (active_players, eligible_players) when the round is over.
+        self.start_round(street, active_players, eligible_players)
+        player = self.next_to_act()
+        while player is not None:
+            if self.verbose:
+                self.player_info_print(player, street['name'], self.bet_to_match, community_cards, self.community_pot, self.side_pots)
+            action = yield player
+            self.apply_action(player, action)
+            player = self.next_to_act()
+        return self.end_round()
+
+
+    def start_round(self, street, active_players, eligible_players):
         # Find the big blind and dealer position from all seats (not just active players)
-        all_players , starting_player_index, self.bet_to_match = self.table_manager.set_start_index(street['name'], self.table, self.big_blind)
-        
-        while any([player for player in active_players if not player.is_all_in and not player.has_acted]) and len(active_players) > 1:
-            for i in range(starting_player_index, starting_player_index + len(all_players)):
-                
-                player_index = i % len(all_players)
-                player = all_players[player_index]
+        self.all_players, self.round_start, self.bet_to_match = self.table_manager.set_start_index(street['name'], self.table, self.big_blind)
+        self.street_name = street['name']
+        self.active_players = active_players
+        self.eligible_players = eligible_players
+        self.acting_index = None
+
+
+    def next_to_act(self):
+        # Runs the betting passes on to the next player who has to act and returns them, or None once the round is
+        # over. The player stays pending at acting_index, so asking again returns the same player.
+        all_players = self.all_players
+        num_seats = len(all_players)
+        while True:
+            if self.acting_index is None:
+                # Another pass while someone can still act and more than one player is in
+                if not (any(not player.is_all_in and not player.has_acted for player in self.active_players) and len(self.active_players) > 1):
+                    return None
+                self.acting_index = self.round_start
+
+            for i in range(self.acting_index, self.round_start + num_seats):
+                player = all_players[i % num_seats]
 
                 # Skip if the seat is empty, player is sitting out or folded
                 if player is None or player.is_sitting_out or player.is_folded:
                     continue
 
-                if player.is_all_in or (player.has_acted and player.round_bet == self.bet_to_match) :
+                if player.is_all_in or (player.has_acted and player.round_bet == self.bet_to_match):
                     continue
 
-                if len(active_players) == 1:
-                    break
-
-                self.player_info_print(player, street['name'], self.bet_to_match, community_cards, self.community_pot, self.side_pots)
-                
-                action = player.make_decision(self.big_blind, self.bet_to_match, self.last_raise)
-
-                # Calculate betting action
-                self.betting_action(player, action, eligible_players)
-
-                self.community_pot['pot_value'] += player.last_bet  # Update the main pot with the last bet
-
-                for player in active_players:
-                    if not player.is_all_in and player.has_acted and player.round_bet < self.bet_to_match:
-                        player.has_acted = False  # Reset has_acted for all players who can still act
-
-                active_players = self.table_manager.get_active_players()
-                eligible_players = self.table_manager.update_player_eligibility()
-
+                if len(self.active_players) == 1:
+                    self.acting_index = None
+                    return None
+
+                self.acting_index = i
+                return player
+
+            self.acting_index = None
+
+
+    def apply_action(self, player, action):
+        # Plays the pending player's action and pushes the record undo_action restores it from: the player's
+        # chips, bets and flags, the betting state, the pot, the round's lists and the acting position
+        community_pot = self.community_pot
+        folding = action.type == "FOLD"
+        bet_to_match = self.bet_to_match
+        record = (
+            player, player.stack_size, player.last_bet, player.round_bet, player.total_bet, player.hole_cards,
+            player.is_folded, player.is_all_in, player.has_acted, player.is_eligible_for_pot,
+            self.bet_to_match, self.last_raise, self.bet_counter, community_pot['pot_value'], self.acting_index,
+            self.active_players, self.eligible_players, community_pot['eligible_players'],
+        )
+
+        # Calculate betting action
+        self.betting_action(player, action, self.eligible_players)
+        self.table_manager.update_seat(player)
+
+        community_pot['pot_value'] += player.last_bet  # Update the main pot with the last bet
+        if self.events.handlers[ACTION]:
+            self.events.publish(ActionEvent(self.street_name, player.name, action.type, player.last_bet, player.stack_size, self.bet_to_match, community_pot['pot_value']))
+
+        # Reset has_acted for all players who can still act
+        reopened = [other for other in self.active_players if not other.is_all_in and other.has_acted and other.round_bet < self.bet_to_match]
+        for other in reopened:
+            other.has_acted = False
+
+        # Only a fold changes who is active or eligible
+        if folding:
+            self.active_players = self.table_manager.get_active_players()
+            self.eligible_players = self.table_manager.update_player_eligibility()
+
+        self.acting_index += 1
+        self.action_stack.append((record, reopened, self.street_name, player, action.type, bet_to_match, self.bet_to_match))
+
+
+    def undo_action(self):
+        # Takes back the last apply_action, leaving its player pending again
+        record, reopened = self.action_stack.pop()[:2]
+        for other in reopened:
+            other.has_acted = True
+        (player, player.stack_size, player.last_bet, player.round_bet, player.total_bet, player.hole_cards,
+         player.is_folded, player.is_all_in, player.has_acted, player.is_eligible_for_pot,
+         self.bet_to_match, self.last_raise, self.bet_counter, self.community_pot['pot_value'], self.acting_index,
+         self.active_players, self.eligible_players, self.community_pot['eligible_players']) = record
+        self.table_manager.update_seat(player)
+        return player
+
+
+    def end_round(self):
         self.bet_to_match = 0
         self.last_raise = 0
         self.raise_counter = 0
+        self.round_start = None
+        self.acting_index = None
 
-        return active_players, eligible_players
+        return self.active_players, self.eligible_players
 
 
     def evaluate_showdown(self, active_players):
-        # Determine the winners and distribute the pot(s)
-        best_hands = []
-        for player in active_players:
-            best_hands.append((player))
-
-        # Sort the best hands in descending order based on hand rank and relevant card ranks
-        ranked_players = self.poker_hand.sort_players_by_hand_rank(best_hands)
+        # Group the players by hand strength, best first; the groups go straight to PotManagement.distribute_pots
+        ranked_players = self.poker_hand.sort_players_by_hand_rank(list(active_players))
 
         winners = ranked_players[0]  # We only want the player objects in the first group
 
         # Check if there is a tie
-        if len(winners) > 1:
-            print("It's a tie between: " + ', '.join(str(winner.name) for winner in winners))
-        else:
-            print("Congratulations, the winner is: " + winners[0].name)
+        if self.verbose:
+            if len(winners) > 1:
+                print("It's a tie between: " + ', '.join(str(winner.name) for winner in winners))
+            else:
+                print("Congratulations, the winner is: " + winners[0].name)
 
         return ranked_players
@@ -1,22 +1,43 @@
 from collections import Counter
 from deck_management import DeckManager
+from hand_evaluator import HandEvaluator, EvaluationCache
 
 class PokerHand:
-    HAND_RANKS = {
-        'ROYAL_FLUSH': 9,
-        'STRAIGHT_FLUSH': 8,
-        'FOUR_OF_A_KIND': 7,
-        'FULL_HOUSE': 6,
-        'FLUSH': 5,
-        'STRAIGHT': 4,
-        'THREE_OF_A_KIND': 3,
-        'TWO_PAIR': 2,
-        'ONE_PAIR': 1,
-        'HIGH_CARD': 0
-    }
+    HAND_RANKS = HandEvaluator.HAND_RANKS
+
+    # Optional memo for evaluate_hand, off unless enable_cache is called
+    evaluation_cache = None
+
+    @staticmethod
+    def enable_cache(max_size=1 << 20):
+        PokerHand.evaluation_cache = EvaluationCache(max_size)
+        return PokerHand.evaluation_cache
+
+    @staticmethod
+    def disable_cache():
+        PokerHand.evaluation_cache = None
+
+    @staticmethod
+    def evaluate_hand(hole_cards, community_cards, with_cards=True):
+        # Lookup-table evaluation; with_cards=False returns only the comparable strength integer
+        all_cards = hole_cards + community_cards
+        card_ints = [DeckManager.encode_card(card) for card in all_cards]
+        if PokerHand.evaluation_cache is not None:
+            strength = PokerHand.evaluation_cache.evaluate(card_ints)
+        else:
+            strength = HandEvaluator.evaluate(card_ints)
+        if not with_cards:
+            return strength
+        return HandEvaluator.describe(strength, all_cards, card_ints)
+
+    @staticmethod
+    def evaluate_batch(cards, out=None, chunk_size=None):
+        # Vectorized scoring of an (N, 7) integer card array, see HandEvaluator.evaluate_batch
+        return HandEvaluator.evaluate_batch(cards, out, chunk_size)
 
     @staticmethod
-    def evaluate_hand(hole_cards, community_cards):
+    def legacy_evaluate_hand(hole_cards, community_cards):
+        # Original string-based evaluator, kept as the reference for benchmarks.py
         all_cards = hole_cards + community_cards
         all_cards.sort(key=lambda card: (DeckManager.get_rank_index(card[0]), card[1]), reverse=True)
 
@@ -106,36 +127,18 @@ class PokerHand:
 
     @staticmethod
     def sort_players_by_hand_rank(players):
-        # Sort the list in descending order by hand rank and all five cards considering the kicker
-        players.sort(key=lambda player: (
-            player.current_hand_rank[0],  # hand rank
-            [DeckManager.get_rank_index(card[0]) for card in sorted(player.current_hand_rank[1], reverse=True)]  # all five cards
-        ), reverse=True)
+        # Sort the list in descending order by the strength integer stored when the hand was evaluated,
+        # it already covers the hand rank and every kicker
+        players.sort(key=lambda player: player.hand_strength, reverse=True)
 
-        # Initialize the list that will store the sorted players
+        # Players next to each other with the same strength tie, so one pass groups them
         sorted_players = []
-
-        # Loop over the sorted list of players
+        previous_strength = None
         for player in players:
-            hand_rank, hand_cards = player.current_hand_rank
-            hand_card_ranks = [DeckManager.get_rank_index(card[0]) for card in sorted(hand_cards, reverse=True)]
-
-            # If the sorted_players list is empty, or the last group has a different hand rank or all five cards,
-            # add a new group
-            if not sorted_players or \
-                sorted_players[-1][0].current_hand_rank[0] != hand_rank or \
-                [DeckManager.get_rank_index(card[0]) for card in sorted(sorted_players[-1][0].current_hand_rank[1], reverse=True)] != hand_card_ranks:
-                sorted_players.append([player])  # Only append the player object
+            if player.hand_strength != previous_strength:
+                sorted_players.append([player])
+                previous_strength = player.hand_strength
             else:
-                # Otherwise, add the player to the last group
-                sorted_players[-1].append(player)  # Only append the player object
+                sorted_players[-1].append(player)
 
         return sorted_players
-
-
-
-
-
-
-
-
@@ -1,3 +1,6 @@
+import asyncio
+
+
 
 class PotManagement:
     def __init__(self, table_manager, community_pot, side_pots, ranked_players, eligible_players, active_players, ante, small_blind, big_blind):
@@ -12,6 +15,7 @@ class PotManagement:
         self.ante = ante
         self.small_blind = small_blind
         self.big_blind = big_blind
+        self.verbose = True
 
 
     def collect_blinds(self):
@@ -32,6 +36,7 @@ class PotManagement:
 
                 # Add blinds to the main pot
                 self.community_pot['pot_value'] += small_blind_amount
+                self.table_manager.update_seat(player)
 
             if player.is_big_blind:
                 # Collect big blind
@@ -44,6 +49,7 @@ class PotManagement:
 
                 # Add blinds to the main pot
                 self.community_pot['pot_value'] += big_blind_amount
+                self.table_manager.update_seat(player)
         
         return self.community_pot['pot_value']    
 
@@ -51,43 +57,39 @@ class PotManagement:
 
     def collect_antes(self):
         for player in self.active_players:
-            if player.stack_size == 0:
-                continue  # Skip players with no chips
+            if player is None or player.stack_size == 0:
+                continue  # Skip the empty seats and players with no chips
             ante_amount = min(player.stack_size, self.ante)
             player.pay_ante(ante_amount)
             self.community_pot['pot_value'] += ante_amount
+            if player.is_all_in:
+                self.table_manager.update_seat(player)
         return self.community_pot['pot_value']
 
 
-    def create_side_pot(self):
-        all_in_players = sorted([player for player in self.active_players if player.is_all_in and player.is_eligible_for_pot], key=lambda player: player.total_bet)
-
-        while len(all_in_players) > 0:
-            side_pot_players = []  # List to store players with the same all-in amount
-            player = all_in_players.pop(0)  # Get the first player who went all-in
-            side_pot_players.append(player)  # Add the player to the list
-
-            # Find other players with the same all-in amount
-            while len(all_in_players) > 0 and all_in_players[0].total_bet == player.total_bet:
-                side_pot_players.append(all_in_players.pop(0))
-
-            player_pot_value = player.total_bet  
-
-            # Calculate the side pot value and subtract it from each eligible player's total bet
-            side_pot_value = 0
-            for pot_player in self.community_pot['eligible_players']:
-                pot_player.total_bet -= player_pot_value
-                side_pot_value += player_pot_value
-
-            self.community_pot['pot_value'] -= side_pot_value
-
-            side_pot_eligible_players = self.community_pot['eligible_players']
-
+    def create_side_pot(self, players):
+        # Rebuilds the pots from what every player put in this hand: one side pot per all-in amount, capped at it
+        # and open to the players still in who put in at least that much or can still bet, with the community pot
+        # on top for the players who can still bet. players is every seat, so folded players' chips stay in the
+        # pots they reached.
+        contributors = [player for player in players if player is not None and player.total_bet > 0]
+        caps = sorted({player.total_bet for player in contributors if player.is_all_in and not player.is_folded})
+        total_pot = self.community_pot['pot_value'] + sum(pot['pot_value'] for pot in self.side_pots)
+
+        self.side_pots.clear()
+        previous_cap = 0
+        for cap in caps:
+            side_pot_value = sum(min(player.total_bet, cap) - min(player.total_bet, previous_cap) for player in contributors)
+            side_pot_eligible_players = [player for player in contributors if not player.is_folded and (player.total_bet >= cap or not player.is_all_in)]
             self.side_pots.append({'pot_value': side_pot_value, 'eligible_players': side_pot_eligible_players})
+            previous_cap = cap
+        self.community_pot['pot_value'] = total_pot - sum(pot['pot_value'] for pot in self.side_pots)
 
         # The all-in players are no longer eligible for further pots
-        for player in side_pot_players:
-            player.is_eligible_for_pot = False
+        for player in contributors:
+            if player.is_all_in:
+                player.is_eligible_for_pot = False
+                self.table_manager.update_seat(player)
 
         self.eligible_players = self.table_manager.update_player_eligibility()
 
@@ -95,35 +97,48 @@ class PotManagement:
 
 
     def distribute_pots(self, ranked_player_groups):
-        # ranked_player_groups is a list of lists, process each group in the list
-        for group in ranked_player_groups:
-            if not isinstance(group, list):
-                group = [group]
-            # Check if any player in the group is eligible for a side pot
-            for index in reversed(range(len(self.side_pots))):
-                pot = self.side_pots[index]
-                if all(player.name in [player.name for player in pot['eligible_players']] for player in group):
-                    print(f"{', '.join(player.name for player in group)} distributed side pot of {pot['pot_value']}.")
-                    self.distribute_pot(pot, group)  # Distribute the pot amongst the group
-                    self.side_pots.pop(index)
-
-            # Check if any player in the group is eligible for the community pot
-            if self.community_pot['pot_value'] > 0 and all(player.name in [p.name for p in self.community_pot['eligible_players']] for player in group):
-                print(f"{', '.join(player.name for player in group)} distributed community pot of {self.community_pot['pot_value']}.")
-                self.distribute_pot(self.community_pot, group)  # Distribute the pot amongst the group
+        # ranked_player_groups is a list of lists ordered from the best hand down, players in a group tie
+        ranked_player_groups = [group if isinstance(group, list) else [group] for group in ranked_player_groups]
+
+        for index in reversed(range(len(self.side_pots))):
+            pot = self.side_pots[index]
+            winners = self.find_pot_winners(pot, ranked_player_groups)
+            if winners:
+                if self.verbose:
+                    print(f"{', '.join(player.name for player in winners)} distributed side pot of {pot['pot_value']}.")
+                self.distribute_pot(pot, winners)  # Distribute the pot amongst the group
+                self.side_pots.pop(index)
+
+        if self.community_pot['pot_value'] > 0:
+            winners = self.find_pot_winners(self.community_pot, ranked_player_groups)
+            if not winners and ranked_player_groups:
+                # Chips above every all-in with nobody left to claim them (the bettor folded) go to the best hand
+                # rather than staying on the table for the next hand
+                self.community_pot['eligible_players'] = winners = ranked_player_groups[0]
+            if winners:
+                if self.verbose:
+                    print(f"{', '.join(player.name for player in winners)} distributed community pot of {self.community_pot['pot_value']}.")
+                self.distribute_pot(self.community_pot, winners)  # Distribute the pot amongst the group
                 self.community_pot['pot_value'] = 0
                 self.community_pot['eligible_players'] = []
 
-            # If all pots are distributed, break the loop
-            if self.side_pots == [] and self.community_pot['pot_value'] == 0:
-                break
+
+    def find_pot_winners(self, pot, ranked_player_groups):
+        # The pot goes to the eligible players of the best group that has any
+        eligible_players = set(pot['eligible_players'])
+        for group in ranked_player_groups:
+            winners = [player for player in group if player in eligible_players]
+            if winners:
+                return winners
+        return []
 
 
     def distribute_pot(self, pot, player_group):
         pot_size = pot['pot_value']
 
         # Find the eligible winners from the ranked players
-        winners = [player for player in player_group if player.name in [p.name for p in pot['eligible_players']]]
+        eligible_players = set(pot['eligible_players'])
+        winners = [player for player in player_group if player in eligible_players]
 
         if len(winners) == 1:
             winner = winners[0]
@@ -147,8 +162,12 @@ class PotManagement:
 
 
 class BlindStructure:
-    def __init__(self):
+    def __init__(self, level_durations=None, default_duration=20):
         self.blind_levels = self.blinds_list()
+        # Length of each level, in hands or minutes depending on how the LevelScheduler runs; levels past the
+        # list last default_duration
+        self.level_durations = list(level_durations) if level_durations is not None else []
+        self.default_duration = default_duration
 
     def blinds_list(self):
         # Manually define blinds and antes for the first 100 levels
@@ -189,13 +208,98 @@ class BlindStructure:
 
 
     def get_blinds(self, level):
-        return self.blind_levels[level]
+        # The last level holds once the structure runs out
+        return self.blind_levels[min(level, len(self.blind_levels) - 1)]
 
 
     def get_level_duration(self, level):
         # If there's a specific duration for this level, return it
         if level < len(self.level_durations):
             return self.level_durations[level]
-        # Otherwise, return a default duration
+        # Otherwise, return the default duration
+        else:
+            return self.default_duration
+
+
+class LevelScheduler:
+    # One scheduler is shared by every table of an event. It only keeps the current level and its blinds, each
+    # table compares its own level with scheduler.level at the start of a hand (StateMachine.apply_level), so a
+    # level change reaches every table at its next hand boundary without anyone looping over the tables.
+    # Without a clock levels last level_durations hands and the driver reports the hands played with
+    # hands_played. With a clock (time.monotonic in live play) they last level_durations minutes, and one
+    # check_clock call per round, or the run_clock task on an event loop, moves the levels on, so the tables
+    # never read the clock themselves. level_durations is one number for every level or a list with one per
+    # level, None takes the blind structure's own durations.
+    def __init__(self, blind_structure=None, level_durations=None, clock=None):
+        self.blind_structure = blind_structure if blind_structure is not None else BlindStructure()
+        self.level_durations = level_durations
+        self.clock = clock
+        # A level that never ends on time would keep next_level looping forever
+        if level_durations is None:
+            durations = list(self.blind_structure.level_durations) + [self.blind_structure.default_duration]
+        elif isinstance(level_durations, (list, tuple)):
+            durations = level_durations
+        else:
+            durations = [level_durations]
+        if not durations or any(duration <= 0 for duration in durations):
+            raise ValueError(f"Level durations must be positive, got {durations}")
+        self.level = 0
+        self.hands = 0
+        self.blinds = self.blind_structure.get_blinds(self.level)
+        # Hand count or clock time the current level ends at
+        self.level_start = clock() if clock is not None else 0
+        self.level_end = self.level_start + self.get_level_length(self.level)
+
+
+    def get_level_length(self, level):
+        if self.level_durations is None:
+            duration = self.blind_structure.get_level_duration(level)
+        elif isinstance(self.level_durations, (list, tuple)):
+            duration = self.level_durations[min(level, len(self.level_durations) - 1)]
         else:
-            return 20  # minutes, for example
+            duration = self.level_durations
+        return duration * 60 if self.clock is not None else duration
+
+
+    def next_level(self):
+        self.level += 1
+        self.blinds = self.blind_structure.get_blinds(self.level)
+        self.level_start = self.level_end
+        self.level_end += self.get_level_length(self.level)
+
+
+    def hands_played(self, hands):
+        # Hand-driven levels: hands is how many hands the event has played (rounds for a tournament, the hand
+        # number of the table that just finished for tables running on their own). Tables sharing the scheduler
+        # report out of step, so the count only moves forward: levels follow the fastest table, the others pick
+        # the new blinds up at their next hand.
+        if self.clock is None:
+            self.hands = max(self.hands, hands)
+            while self.hands >= self.level_end:
+                self.next_level()
+        return self.level
+
+
+    def check_clock(self):
+        # Clock-driven levels: one clock read however many tables share the scheduler
+        if self.clock is not None:
+            now = self.clock()
+            while now >= self.level_end:
+                self.next_level()
+        return self.level
+
+
+    def time_left(self):
+        # Seconds to the next level with a clock, hands without one
+        if self.clock is not None:
+            return max(0.0, self.level_end - self.clock())
+        return self.level_end - self.hands
+
+
+    async def run_clock(self):
+        # Moves the levels on from an event loop: sleeps until each level ends, cancel the task to stop it
+        if self.clock is None:
+            raise ValueError("run_clock needs a LevelScheduler built with a clock, hand-driven levels move on in hands_played")
+        while True:
+            await asyncio.sleep(max(0.0, self.level_end - self.clock()))
+            self.check_clock()
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deck_management import DeckManager
+from poker_hand import PokerHand
+
+
+# All 1326 two-card combos, indexed so that combo (low, high) sits at high * (high - 1) / 2 + low
+COMBOS = np.array([(low, high) for high in range(52) for low in range(high)], dtype=np.uint8)
+# Row c flags the combos that hold card c
+CARD_COMBOS = (COMBOS[None, :, :] == np.arange(52)[:, None, None]).any(axis=2)
+
+
+def simulate_boards(num_boards, seed):
+    # Score every combo on num_boards random boards and count, for every pair of combos that miss the board,
+    # twice the wins plus the ties of the first combo. Runs inside the worker processes.
+    rng = np.random.default_rng(seed)
+    num_combos = len(COMBOS)
+    if num_boards > np.iinfo(np.int16).max // 2:
+        raise ValueError("Too many boards for one batch, the per-batch counters are 16-bit")
+    wins = np.zeros((num_combos, num_combos), dtype=np.int16)
+    live_rows = np.empty((num_boards, num_combos), dtype=np.float32)
+    hands = np.empty((num_combos, 7), dtype=np.uint8)
+
+    for board_index in range(num_boards):
+        board = rng.choice(52, 5, replace=False)
+        live = ~CARD_COMBOS[board].any(axis=0)
+        live_rows[board_index] = live
+
+        # Combos holding a board card get a stand-in so the batch stays valid, then the lowest possible strength
+        hands[:, :2] = COMBOS
+        hands[~live, :2] = COMBOS[np.argmax(live)]
+        hands[:, 2:] = board
+        strengths = PokerHand.evaluate_batch(hands)
+        strengths[~live] = -1
+
+        # Adding "greater" and "greater or equal" counts a win twice and a tie once
+        np.add(wins, np.greater.outer(strengths, strengths), out=wins)
+        np.add(wins, np.greater_equal.outer(strengths, strengths), out=wins)
+
+    # Pairs involving a dead combo also added 2 when only the second combo was dead and 1 when both were.
+    # Both amounts follow from how often each combo and each pair of combos was live, so take them out here.
+    wins = wins.astype(np.int32)
+    both_live = np.rint(live_rows.T @ live_rows).astype(np.int32)
+    num_live = live_rows.sum(axis=0).astype(np.int32)
+    wins -= 2 * (num_live[:, None] - both_live) + (num_boards - num_live[:, None] - num_live[None, :] + both_live)
+
+    return wins, both_live
+
+
+class PreflopEquityTable:
+    # Hand classes use the 13x13 HandRangeMatrix layout: row and column 0 is the ace, 12 the deuce, pairs sit on
+    # the diagonal, suited hands below it (row > column) and offsuit hands above it.
+    CLASS_FILE = 'preflop_equity_169.npy'
+    COMBO_FILE = 'preflop_equity_1326.npy'
+
+    def __init__(self, class_equity, combo_equity=None):
+        self.class_equity = class_equity
+        self.combo_equity = combo_equity
+
+
+    @staticmethod
+    def combo_index(card1, card2):
+        low, high = min(card1, card2), max(card1, card2)
+        return high * (high - 1) // 2 + low
+
+
+    @staticmethod
+    def class_index(card1, card2):
+        # Matrix rows count down from the ace, deck ranks count up from the deuce
+        row, col = 12 - (card1 >> 2), 12 - (card2 >> 2)
+        high, low = min(row, col), max(row, col)
+        if (card1 & 3) == (card2 & 3):
+            return low * 13 + high
+        return high * 13 + low
+
+
+    @staticmethod
+    def combo_classes():
+        # Hand-class index of every combo, in combo order
+        return np.array([PreflopEquityTable.class_index(int(card1), int(card2)) for card1, card2 in COMBOS])
+
+
+    @staticmethod
+    def generate(num_boards=50000, processes=None, seed=0, batch_boards=1000):
+        # Monte Carlo over shared boards: each board is scored once for all 1326 combos. A uniform board that misses
+        # both hands is uniform over the boards left to them, so every combo pair gets an unbiased estimate.
+        processes = processes or os.cpu_count() or 1
+        seed_sequence = np.random.SeedSequence(seed)
+        batches = [min(batch_boards, num_boards - start) for start in range(0, num_boards, batch_boards)]
+        batch_seeds = seed_sequence.spawn(len(batches))
+
+        num_combos = len(COMBOS)
+        wins = np.zeros((num_combos, num_combos), dtype=np.int64)
+        counts = np.zeros((num_combos, num_combos), dtype=np.int64)
+
+        if processes == 1:
+            results = (simulate_boards(boards, batch_seed) for boards, batch_seed in zip(batches, batch_seeds))
+            for batch_wins, batch_counts in results:
+                wins += batch_wins
+                counts += batch_counts
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                for batch_wins, batch_counts in executor.map(simulate_boards, batches, batch_seeds):
+                    wins += batch_wins
+                    counts += batch_counts
+
+        # Combos that share a card can never meet
+        overlapping = (COMBOS[:, None, :, None] == COMBOS[None, :, None, :]).any(axis=(2, 3))
+        counts[overlapping] = 0
+        wins[overlapping] = 0
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            combo_equity = (wins / (2 * counts)).astype(np.float16)
+
+        class_of_combo = PreflopEquityTable.combo_classes()
+        class_wins = np.zeros((169, 169), dtype=np.int64)
+        class_counts = np.zeros((169, 169), dtype=np.int64)
+        np.add.at(class_wins, (class_of_combo[:, None], class_of_combo[None, :]), wins)
+        np.add.at(class_counts, (class_of_combo[:, None], class_of_combo[None, :]), counts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            class_equity = (class_wins / (2 * class_counts)).astype(np.float32)
+
+        return PreflopEquityTable(class_equity, combo_equity)
+
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, PreflopEquityTable.CLASS_FILE), self.class_equity)
+        if self.combo_equity is not None:
+            np.save(os.path.join(directory, PreflopEquityTable.COMBO_FILE), self.combo_equity)
+
+
+    @staticmethod
+    def load(directory):
+        # Memory-mapped, so only the pages that lookups touch are ever read from disk
+        class_equity = np.load(os.path.join(directory, PreflopEquityTable.CLASS_FILE), mmap_mode='r')
+        combo_path = os.path.join(directory, PreflopEquityTable.COMBO_FILE)
+        combo_equity = np.load(combo_path, mmap_mode='r') if os.path.exists(combo_path) else None
+        return PreflopEquityTable(class_equity, combo_equity)
+
+
+    def get_class_equity(self, hand_class, other_class):
+        # Classes are (row, col) cells of the 13x13 range matrix
+        return float(self.class_equity[hand_class[0] * 13 + hand_class[1], other_class[0] * 13 + other_class[1]])
+
+
+    def get_equity(self, hole_cards, other_hole_cards):
+        # Exact card-removal figure from the combo table when it is available, the class average otherwise
+        cards = [card if isinstance(card, int) else DeckManager.encode_card(card) for card in hole_cards]
+        other_cards = [card if isinstance(card, int) else DeckManager.encode_card(card) for card in other_hole_cards]
+        if self.combo_equity is not None:
+            return float(self.combo_equity[PreflopEquityTable.combo_index(*cards), PreflopEquityTable.combo_index(*other_cards)])
+        return float(self.class_equity[PreflopEquityTable.class_index(*cards), PreflopEquityTable.class_index(*other_cards)])
+
+
+if __name__ == "__main__":
+    # Usage: python preflop_equity.py [output directory] [number of boards]
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'preflop_equity'
+    num_boards = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    start = time.perf_counter()
+    PreflopEquityTable.generate(num_boards).save(directory)
+    print(f"Wrote {num_boards} boards of preflop equity to {directory} in {time.perf_counter() - start:.1f}s")
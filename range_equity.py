@@ -0,0 +1,229 @@
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deck_management import DeckManager
+from poker_hand import PokerHand
+from preflop_equity import COMBOS, CARD_COMBOS, PreflopEquityTable
+
+
+NUM_COMBOS = len(COMBOS)
+COMBO_CLASSES = PreflopEquityTable.combo_classes()
+# Row c lists the 51 combos that hold card c
+CARD_COMBO_INDEX = np.array([np.flatnonzero(card_row) for card_row in CARD_COMBOS])
+FIRST_CARDS = COMBOS[:, 0].astype(np.intp)
+SECOND_CARDS = COMBOS[:, 1].astype(np.intp)
+
+
+def score_boards(boards, weights):
+    # For every combo and every range, add up over the boards the range weight the combo beats (ties count half)
+    # and the range weight it can face at all. A range combo that shares a card with the combo or the board
+    # carries no weight. Runs inside the worker processes.
+    num_ranges = len(weights)
+    wins = np.zeros((num_ranges, NUM_COMBOS))
+    totals = np.zeros((num_ranges, NUM_COMBOS))
+    hands = np.empty((NUM_COMBOS, 7), dtype=np.uint8)
+    positions = np.empty(NUM_COMBOS, dtype=np.intp)
+    cumulative = np.zeros((num_ranges, NUM_COMBOS + 1))
+    card_cumulative = np.zeros((num_ranges, 52, 52))
+    # Row offsets that let one flat searchsorted look up all 52 per-card rows at once
+    row_offsets = np.arange(52)[:, None] * (NUM_COMBOS + 1)
+
+    for board in boards:
+        live = ~CARD_COMBOS[board].any(axis=0)
+        # Combos holding a board card get a stand-in so the batch stays valid, their weight is zero anyway
+        hands[:, :2] = COMBOS
+        hands[~live, :2] = COMBOS[np.argmax(live)]
+        hands[:, 2:] = board
+        strengths = PokerHand.evaluate_batch(hands)
+        live_weights = weights * live
+
+        # Running weight in strength order over the whole range, and over the 51 combos holding each card
+        order = np.argsort(strengths, kind='stable')
+        positions[order] = np.arange(NUM_COMBOS)
+        np.cumsum(live_weights[:, order], axis=1, out=cumulative[:, 1:])
+        card_order = np.argsort(positions[CARD_COMBO_INDEX], axis=1)
+        card_members = np.take_along_axis(CARD_COMBO_INDEX, card_order, axis=1)
+        card_positions = (positions[card_members] + row_offsets).ravel()
+        np.cumsum(live_weights[:, card_members], axis=2, out=card_cumulative[:, :, 1:])
+
+        def compatible_weight(position):
+            # Weight of the combos ranked below position that share no card with each combo. The combo itself
+            # holds both of its cards, so it was taken out twice whenever it ranks below position.
+            weight = cumulative[:, position].copy()
+            for card in (FIRST_CARDS, SECOND_CARDS):
+                count = np.searchsorted(card_positions, card * (NUM_COMBOS + 1) + position) - card * 51
+                weight -= card_cumulative[:, card, count]
+            return weight
+
+        sorted_strengths = strengths[order]
+        weaker = compatible_weight(np.searchsorted(sorted_strengths, strengths, side='left'))
+        equal = compatible_weight(np.searchsorted(sorted_strengths, strengths, side='right')) + live_weights - weaker
+        total = compatible_weight(np.full(NUM_COMBOS, NUM_COMBOS)) + live_weights
+
+        wins += (weaker + 0.5 * equal) * live
+        totals += total * live
+
+    return wins, totals
+
+
+def simulate_multiway(weights, board_cards, num_trials, seed):
+    # Monte Carlo for three or more ranges: draw one combo per range by weight, drop the deals where two hands or
+    # the board collide, run out the board and score every hand. Runs inside the worker processes.
+    rng = np.random.default_rng(seed)
+    num_ranges = len(weights)
+    combos = np.stack([rng.choice(NUM_COMBOS, num_trials, p=range_weights / range_weights.sum()) for range_weights in weights], axis=1)
+
+    hole_cards = COMBOS[combos].reshape(num_trials, 2 * num_ranges)
+    known_cards = np.concatenate([hole_cards, np.broadcast_to(np.array(board_cards, dtype=np.uint8), (num_trials, len(board_cards)))], axis=1)
+    known_cards = np.sort(known_cards, axis=1)
+    valid = (np.diff(known_cards.astype(np.int16), axis=1) != 0).all(axis=1)
+    combos = combos[valid]
+    hole_cards = hole_cards[valid]
+    num_valid = len(combos)
+
+    # Deal the rest of the board from the cards nobody holds
+    keys = rng.random((num_valid, 52))
+    rows = np.arange(num_valid)[:, None]
+    keys[rows, hole_cards] = 2.0
+    keys[:, list(board_cards)] = 2.0
+    board = np.empty((num_valid, 5), dtype=np.uint8)
+    board[:, :len(board_cards)] = board_cards
+    board[:, len(board_cards):] = np.argsort(keys, axis=1)[:, :5 - len(board_cards)]
+
+    hands = np.empty((num_valid, 7), dtype=np.uint8)
+    hands[:, 2:] = board
+    strengths = np.empty((num_ranges, num_valid), dtype=np.int32)
+    for player in range(num_ranges):
+        hands[:, :2] = hole_cards[:, 2 * player:2 * player + 2]
+        strengths[player] = PokerHand.evaluate_batch(hands)
+
+    is_best = strengths == strengths.max(axis=0)
+    shares = is_best / is_best.sum(axis=0)
+
+    share_sums = np.zeros((num_ranges, NUM_COMBOS))
+    deal_counts = np.zeros((num_ranges, NUM_COMBOS))
+    for player in range(num_ranges):
+        share_sums[player] = np.bincount(combos[:, player], weights=shares[player], minlength=NUM_COMBOS)
+        deal_counts[player] = np.bincount(combos[:, player], minlength=NUM_COMBOS)
+
+    return share_sums, deal_counts
+
+
+class RangeEquityEngine:
+    # Ranges are 1326-long combo weight arrays (combo order as in preflop_equity.COMBOS); 13x13 class weights and
+    # the object grids HandRangeMatrix builds are converted on the way in
+    def __init__(self, processes=None, boards_per_batch=100, trials_per_batch=50000):
+        self.processes = processes or os.cpu_count() or 1
+        self.boards_per_batch = boards_per_batch
+        self.trials_per_batch = trials_per_batch
+        self.executor = None
+
+
+    def get_executor(self):
+        if self.executor is None and self.processes > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self.executor
+
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+    def run_batches(self, function, *batch_arguments):
+        executor = self.get_executor()
+        if executor is None:
+            return list(map(function, *batch_arguments))
+        return list(executor.map(function, *batch_arguments))
+
+
+    @staticmethod
+    def to_combo_weights(hand_range):
+        if getattr(hand_range, 'shape', None) == (14, 14):
+            # HandRangeMatrix grid: labels in row and column 0, cells are dicts with a 'probability' entry
+            class_weights = np.zeros(169)
+            for row in range(13):
+                for col in range(13):
+                    cell = hand_range[row + 1, col + 1]
+                    if isinstance(cell, dict) and cell.get('probability'):
+                        class_weights[row * 13 + col] = cell['probability']
+            return class_weights[COMBO_CLASSES]
+
+        hand_range = np.asarray(hand_range, dtype=np.float64)
+        if hand_range.shape == (NUM_COMBOS,):
+            return hand_range
+        if hand_range.shape == (13, 13):
+            return hand_range.reshape(169)[COMBO_CLASSES]
+        raise ValueError(f"Unsupported range shape {hand_range.shape}")
+
+
+    @staticmethod
+    def runout_boards(board_cards, num_boards, rng):
+        # Every runout when there are no more than num_boards of them, a uniform sample otherwise
+        live_cards = np.array([card for card in range(52) if card not in board_cards], dtype=np.uint8)
+        num_missing = 5 - len(board_cards)
+        if math.comb(len(live_cards), num_missing) <= num_boards:
+            runouts = np.array(list(itertools.combinations(live_cards, num_missing)), dtype=np.uint8).reshape(-1, num_missing)
+        else:
+            runouts = live_cards[np.argsort(rng.random((num_boards, len(live_cards))), axis=1)[:, :num_missing]]
+
+        boards = np.empty((len(runouts), 5), dtype=np.uint8)
+        boards[:, :len(board_cards)] = board_cards
+        boards[:, len(board_cards):] = runouts
+        return boards
+
+
+    def calculate(self, ranges, board_cards=(), num_boards=2000, seed=0):
+        # Heads-up equity between every pair of ranges, sharing the board evaluations across all of them.
+        # combo_equity[b, i] is combo i's equity against range b, range_equity[a, b] is range a's against range b.
+        weights = np.stack([RangeEquityEngine.to_combo_weights(hand_range) for hand_range in ranges])
+        board_cards = [card if isinstance(card, int) else DeckManager.encode_card(card) for card in board_cards]
+        boards = RangeEquityEngine.runout_boards(board_cards, num_boards, np.random.default_rng(seed))
+
+        batches = [boards[start:start + self.boards_per_batch] for start in range(0, len(boards), self.boards_per_batch)]
+        wins = np.zeros((len(weights), NUM_COMBOS))
+        totals = np.zeros((len(weights), NUM_COMBOS))
+        for batch_wins, batch_totals in self.run_batches(score_boards, batches, [weights] * len(batches)):
+            wins += batch_wins
+            totals += batch_totals
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            combo_equity = wins / totals
+            range_equity = (weights @ wins.T) / (weights @ totals.T)
+
+        return {
+            'combo_equity': combo_equity,
+            'range_equity': range_equity,
+            'boards': len(boards),
+        }
+
+
+    def calculate_multiway(self, ranges, board_cards=(), num_trials=500000, seed=0):
+        # All ranges in one pot. combo_equity[r, i] is the equity of combo i when range r holds it.
+        weights = np.stack([RangeEquityEngine.to_combo_weights(hand_range) for hand_range in ranges])
+        board_cards = [card if isinstance(card, int) else DeckManager.encode_card(card) for card in board_cards]
+        # Combos that hold a board card can never be dealt
+        weights = weights * ~CARD_COMBOS[board_cards].any(axis=0)
+
+        batch_trials = [min(self.trials_per_batch, num_trials - start) for start in range(0, num_trials, self.trials_per_batch)]
+        batch_seeds = np.random.SeedSequence(seed).spawn(len(batch_trials))
+        share_sums = np.zeros((len(weights), NUM_COMBOS))
+        deal_counts = np.zeros((len(weights), NUM_COMBOS))
+        arguments = ([weights] * len(batch_trials), [board_cards] * len(batch_trials), batch_trials, batch_seeds)
+        for batch_shares, batch_counts in self.run_batches(simulate_multiway, *arguments):
+            share_sums += batch_shares
+            deal_counts += batch_counts
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            combo_equity = share_sums / deal_counts
+
+        return {
+            'combo_equity': combo_equity,
+            'equity': share_sums.sum(axis=1) / deal_counts.sum(axis=1),
+            'trials': int(deal_counts[0].sum()),
+        }
@@ -1,4 +1,6 @@
 import cupy as cp, os
+from preflop_equity import PreflopEquityTable
+from range_equity import RangeEquityEngine
 
 class HandRangeMatrix:
     def __init__(self):
@@ -32,6 +34,7 @@ class HandRangeMatrix:
                 "BB": None,
             },
         }
+        self.preflop_equity = None
 
     def create_range_matrix(self, table_size, seating_position):
         num_ranks = 13
@@ -76,3 +79,41 @@ class HandRangeMatrix:
             else:
                 return range_matrix[rank2, rank1]['probability'] if range_matrix[rank2, rank1]['suited'] == suited else None
         return None
+
+
+    @staticmethod
+    def table_size_for(num_players):
+        # The range set for a hand dealt to num_players, whose positions TableManagement.position_names names
+        if num_players == 2:
+            return "heads-up"
+        if num_players == 3:
+            return "3-max"
+        return "6-max" if num_players <= 6 else "9-max"
+
+    def get_seat_range_probability(self, table_manager, seat, hand):
+        # get_range_probability for the position the player at seat holds this hand
+        positions = table_manager.position_names()
+        return self.get_range_probability(self.table_size_for(len(positions)), positions[seat], hand)
+
+
+    def load_preflop_equity(self, directory):
+        # Tables written by preflop_equity.py, memory-mapped so loading is instant
+        self.preflop_equity = PreflopEquityTable.load(directory)
+
+    def get_preflop_equity(self, hand_cell, other_hand_cell):
+        # Cells are (row, col) positions in the range matrix, row and column 0 being the rank labels
+        return self.preflop_equity.get_class_equity((hand_cell[0] - 1, hand_cell[1] - 1), (other_hand_cell[0] - 1, other_hand_cell[1] - 1))
+
+    def get_preflop_combo_equity(self, hole_cards, other_hole_cards):
+        # Exact card-removal equity for two specific starting hands
+        return self.preflop_equity.get_equity(hole_cards, other_hole_cards)
+
+    def get_combo_weights(self, table_size, seating_position):
+        # Weight of each of the 1326 two-card combos, every combo taking the probability of its hand class
+        return RangeEquityEngine.to_combo_weights(self.range_matrices[table_size][seating_position])
+
+    def get_range_equity(self, table_size, seating_positions, board_cards=(), num_boards=2000, engine=None):
+        # Heads-up equity between every pair of the given positions' ranges, see RangeEquityEngine.calculate
+        engine = engine or RangeEquityEngine()
+        ranges = [self.get_combo_weights(table_size, position) for position in seating_positions]
+        return engine.calculate(ranges, board_cards, num_boards)
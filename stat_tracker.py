@@ -1,72 +1,6 @@
 import copy
 
 
-        self.preflop_stats = PreflopStats()
-        self.flop_stats = FlopStats()
-        self.turn_stats = TurnStats()
-        self.river_stats = RiverStats()
-        self.showdown_stats = ShowdownStats()
-        self.hand_rank = PokerHand()
-
-
-        self.vpip = 0.0
-        self.pfr = 0.0
-        self.three_bet = 0.0
-        self.fold_to_three_bet = 0.0
-        self.fold_to_c_bet = 0.0
-        self.fold_to_steal = 0.0
-        self.steal_attempt = 0.0
-        self.call_open = 0.0
-        self.wtsd = 0.0
-        self.wsd = 0.0
-        self.afq = 0.0
-        self.afq_flop = 0.0
-        self.afq_turn = 0.0
-        self.afq_river = 0.0
-        self.check_raise = 0.0
-        self.donk_bet = 0.0
-        self.squeeze = 0.0
-        self.cbet = 0.0
-        self.fold_to_cbet = 0.0
-        self.check_raise_flop = 0.0
-        self.check_raise_turn = 0.0
-        self.check_raise_river = 0.0
-        self.wtsd_call_pf_raise = 0.0
-        self.double_barrel = 0.0
-        self.triple_barrel = 0.0
-        self.fold_flop_bet = 0.0
-        self.fold_turn_bet = 0.0
-        self.fold_river_bet = 0.0
-        self.four_bet = 0.0
-        self.call_three_bet = 0.0
-        self.cold_call = 0.0
-        self.check_fold_flop = 0.0
-        self.check_fold_turn = 0.0
-        self.check_fold_river = 0.0
-        self.fold_big_blind_to_steal = 0.0
-        self.fold_small_blind_to_steal = 0.0
-        self.fold_probe_bet = 0.0
-        self.fold_turn_river_probe_bet = 0.0
-        self.donk_bet_flop = 0.0
-        self.donk_bet_turn = 0.0
-        self.donk_bet_river = 0.0
-        self.call_two_bet = 0.0
-        self.fold_to_four_bet = 0.0
-        self.five_bet = 0.0
-        self.check_raise_flop_c_bet = 0.0
-        self.check_raise_turn_c_bet = 0.0
-        self.fold_to_flop_c_bet_in_3bet_pot = 0.0
-        self.fold_to_turn_c_bet_in_3bet_pot = 0.0
-        self.fold_to_river_c_bet_in_3bet_pot = 0.0
-        self.fold_to_4bet_in_3bet_pot = 0.0
-        self.fold_to_flop_donk_bet = 0.0
-        self.fold_to_turn_donk_bet = 0.0
-        self.fold_to_river_donk_bet = 0.0
-        self.fold_to_probe_bet_flop_turn_river_in_3bet_pot = 0.0
-        self.fold_to_flop_probe_bet_in_4bet_pot = 0.0
-
-
-
 
 class StatTracker:
     def __init__(self):
@@ -131,6 +65,17 @@ class StatTracker:
     def get_session_stats(self, player_name):
         return self.session_stats[player_name] if player_name in self.session_stats else None
 
+    def get_opportunities(self, player_name, street, stat):
+        player_stats = self.get_player_stats(player_name)
+        return 0 if player_stats is None else getattr(player_stats, street).stats['opportunities'].get(stat, 0)
+
+    def get_frequency(self, player_name, street, stat):
+        # Share of the player's chances at the stat they took, None before the first chance
+        opportunities = self.get_opportunities(player_name, street, stat)
+        if not opportunities:
+            return None
+        return getattr(self.get_player_stats(player_name), street).stats[stat] / opportunities
+
     def save_player_stats(self):
         pass
 
@@ -238,7 +183,9 @@ class PreflopStats:
 
     def is_steal_position(self, position):
         # In general, late positions like the Cut-off (CO) and the Button (BU) are considered steal positions in No Limit Hold'em
-        return position in ['CO', 'BU', 'SB']
+        # TableManagement.position_name calls the button BTN, heads-up it calls it SB since the button posts the
+        # small blind there, so a heads-up button steals as SB
+        return position in ['CO', 'BU', 'BTN', 'SB']
 
     def is_cold_call_opportunity(self):
         # A cold call opportunity arises when there was a raise and there's a chance to call without having put any money in the pot yet
@@ -0,0 +1,364 @@
+import sys
+import time
+
+import numpy as np
+
+from deck_management import DeckManager, SeededShuffle
+from hand_evaluator import HandEvaluator
+from vector_game import HISTORY_COLUMNS, NUM_STREETS, VectorHeadsUpGame, cross_check_actions, cross_check_agent
+
+
+STREETS = ['preflop', 'flop', 'turn', 'river']
+STREET_INDEX = {street: index for index, street in enumerate(STREETS)}
+BOARD_STREETS = {0: 0, 3: 1, 4: 2, 5: 3}  # Street index by number of community cards
+VISIBLE_BOARD = np.array([0, 3, 4, 5])  # Community cards showing on each street
+CATEGORIES = sorted(HandEvaluator.HAND_RANKS, key=HandEvaluator.HAND_RANKS.get)
+
+# Column of each action type in the betting history, an ALL_IN counts as aggressive only when it raises the price
+ACTION_COLUMNS = {'BET': 0, 'RAISE': 0, 'CALL': 1, 'CHECK': 2, 'FOLD': 3}
+
+# Opponent tendencies read from StatTracker as (street, stat), the counters its end_hand leaves as plain counts
+OPPONENT_STATS = [
+    ('preflop', 'VPIP'),
+    ('preflop', 'PFR'),
+    ('preflop', 'steal_attempt'),
+    ('preflop', 'cold_call'),
+    ('preflop', 'four_bet'),
+    ('flop', 'cbet'),
+    ('flop', 'fold_to_cbet'),
+    ('flop', 'check_raise'),
+]
+SAMPLE_STAT = ('preflop', 'VPIP')
+SAMPLE_SIZE = 100  # Chances at SAMPLE_STAT after which an opponent's stats count as fully sampled
+
+MAX_SEATS = 10
+CHIP_SCALE = 100  # Chip amounts are given in units of 100 big blinds
+STRENGTH_SCALE = float(10 << HandEvaluator.CATEGORY_SHIFT)
+MAX_STACK_TO_POT = 20
+HISTORY_SCALE = 4
+
+FEATURES = tuple(
+    [f'hole_{rank}' for rank in DeckManager.RANK_STRINGS]
+    + ['hole_pair', 'hole_suited', 'hole_gap']
+    + [f'board_{rank}' for rank in DeckManager.RANK_STRINGS]
+    + ['board_suit_max', 'hand_suit_max']
+    + [f'street_{street}' for street in STREETS]
+    + [f'category_{category.lower()}' for category in CATEGORIES]
+    + ['hand_strength']
+    + ['pot', 'stack', 'to_call', 'round_bet', 'total_bet', 'bet_to_match', 'last_raise', 'pot_odds', 'stack_to_pot', 'effective_stack']
+    + ['seats', 'live_opponents', 'opponents_to_act', 'opponents_all_in', 'position', 'is_dealer', 'is_small_blind', 'is_big_blind']
+    + [f'{street}_{column.lower()}' for street in STREETS for column in HISTORY_COLUMNS]
+    + ['own_aggressive_actions', 'last_aggressor_self', 'last_aggressor_opponent']
+    + [f'opponent_{stat.lower()}_{kind}' for kind in ('mean', 'max') for _, stat in OPPONENT_STATS]
+    + ['opponent_sample']
+)
+FEATURE_INDEX = {name: index for index, name in enumerate(FEATURES)}
+NUM_FEATURES = len(FEATURES)  # 100, the input width of DRLPolicyNetwork
+
+HOLE = FEATURE_INDEX['hole_2']
+BOARD = FEATURE_INDEX['board_2']
+STREET = FEATURE_INDEX['street_preflop']
+CATEGORY = FEATURE_INDEX['category_high_card']
+HISTORY = FEATURE_INDEX['preflop_aggressive']
+OPPONENT_MEAN = FEATURE_INDEX[f'opponent_{OPPONENT_STATS[0][1].lower()}_mean']
+OPPONENT_MAX = FEATURE_INDEX[f'opponent_{OPPONENT_STATS[0][1].lower()}_max']
+(HOLE_PAIR, HOLE_SUITED, HOLE_GAP, BOARD_SUIT_MAX, HAND_SUIT_MAX, HAND_STRENGTH, POT, STACK, TO_CALL, ROUND_BET,
+ TOTAL_BET, BET_TO_MATCH, LAST_RAISE, POT_ODDS, STACK_TO_POT, EFFECTIVE_STACK, SEATS, LIVE_OPPONENTS, OPPONENTS_TO_ACT,
+ OPPONENTS_ALL_IN, POSITION, IS_DEALER, IS_SMALL_BLIND, IS_BIG_BLIND, OWN_AGGRESSIVE_ACTIONS, LAST_AGGRESSOR_SELF,
+ LAST_AGGRESSOR_OPPONENT, OPPONENT_SAMPLE) = (FEATURE_INDEX[name] for name in (
+    'hole_pair', 'hole_suited', 'hole_gap', 'board_suit_max', 'hand_suit_max', 'hand_strength', 'pot', 'stack',
+    'to_call', 'round_bet', 'total_bet', 'bet_to_match', 'last_raise', 'pot_odds', 'stack_to_pot', 'effective_stack',
+    'seats', 'live_opponents', 'opponents_to_act', 'opponents_all_in', 'position', 'is_dealer', 'is_small_blind',
+    'is_big_blind', 'own_aggressive_actions', 'last_aggressor_self', 'last_aggressor_opponent', 'opponent_sample'))
+
+
+class StateEncoder:
+    # Turns decisions into fixed-width float32 rows in FEATURES order, written into one buffer allocated up front so
+    # a whole batch goes to the networks in a single array. encode() reads a StateMachine table, encode_vector_game()
+    # fills a row per table of a VectorHeadsUpGame with array operations, and both give the same row for the same
+    # decision (cross_check() below keeps it that way). Opponent stats come from a StatTracker when one is given and
+    # are cached per player until refresh_stats(), since they only change when a hand ends.
+    def __init__(self, batch_size, stat_tracker=None, pin_memory=False):
+        self.batch_size = batch_size
+        self.stat_tracker = stat_tracker
+        self.stat_rows = {}
+
+        if pin_memory:
+            # Page-locked memory lets the copy to the GPU run asynchronously, the NumPy view writes straight into it
+            import torch  # Only needed for pinned buffers and tensor()
+            self.tensor_buffer = torch.zeros((batch_size, NUM_FEATURES), dtype=torch.float32).pin_memory()
+            self.features = self.tensor_buffer.numpy()
+        else:
+            self.tensor_buffer = None
+            self.features = np.zeros((batch_size, NUM_FEATURES), dtype=np.float32)
+
+
+    def tensor(self, num_rows=None, device=None):
+        # The first num_rows rows as a torch tensor sharing the buffer's memory, copied to device when one is given
+        import torch
+
+        features = self.tensor_buffer[:num_rows] if self.tensor_buffer is not None else torch.from_numpy(self.features[:num_rows])
+        return features if device is None else features.to(device, non_blocking=self.tensor_buffer is not None)
+
+
+    def refresh_stats(self):
+        # Call after StatTracker.end_hand, the cached opponent rows are read again on next use
+        self.stat_rows.clear()
+
+
+    def opponent_stats(self, player_name):
+        # OPPONENT_STATS frequencies followed by how well sampled they are, all zero for an unseen player
+        stats = self.stat_rows.get(player_name)
+        if stats is None:
+            tracker = self.stat_tracker
+            stats = [min(max(tracker.get_frequency(player_name, street, stat) or 0.0, 0.0), 1.0) for street, stat in OPPONENT_STATS]
+            stats.append(min(tracker.get_opportunities(player_name, *SAMPLE_STAT) / SAMPLE_SIZE, 1.0))
+            self.stat_rows[player_name] = stats
+        return stats
+
+
+    def encode_batch(self, decisions):
+        # decisions is a list of (table, player) with the player to act at each StateMachine table, returns their rows
+        if len(decisions) > self.batch_size:
+            raise ValueError(f"Expected at most {self.batch_size} decisions, got {len(decisions)}")
+        for row, (table, player) in enumerate(decisions):
+            self.encode(row, table, player)
+        return self.features[:len(decisions)]
+
+
+    def encode(self, row, table, player):
+        # Writes the features of the player's pending decision at a StateMachine table into the buffer row
+        game = table.game
+        values = [0.0] * NUM_FEATURES
+
+        # Cards, counted by rank so the row does not depend on the order they were dealt in
+        hole_cards = player.hole_cards
+        board = table.community_cards
+        suit_counts = [0, 0, 0, 0]
+        for card in board:
+            values[BOARD + (card >> 2)] += 1
+            suit_counts[card & 3] += 1
+        values[BOARD_SUIT_MAX] = max(suit_counts) / 5
+        ranks = []
+        for card in hole_cards:
+            values[HOLE + (card >> 2)] += 1
+            suit_counts[card & 3] += 1
+            ranks.append(card >> 2)
+        values[HAND_SUIT_MAX] = max(suit_counts) / 7
+        values[HOLE_PAIR] = float(ranks[0] == ranks[1])
+        values[HOLE_SUITED] = float(hole_cards[0] & 3 == hole_cards[1] & 3)
+        values[HOLE_GAP] = abs(ranks[0] - ranks[1]) / 12
+        values[STREET + BOARD_STREETS[len(board)]] = 1.0
+        values[CATEGORY + HandEvaluator.get_category(player.hand_strength)] = 1.0
+        values[HAND_STRENGTH] = player.hand_strength / STRENGTH_SCALE
+
+        # Chips in units of CHIP_SCALE big blinds
+        chip_scale = CHIP_SCALE * table.big_blind
+        seated = [seat for seat in table.all_players if seat is not None]
+        opponents = [other for other in seated if other is not player and not other.is_folded and not other.is_sitting_out]
+        pot = table.community_pot['pot_value'] + sum(side_pot['pot_value'] for side_pot in table.side_pots)
+        stack = player.stack_size
+        bet_to_match = game.bet_to_match
+        to_call = min(max(bet_to_match - player.round_bet, 0), stack)
+        values[POT] = pot / chip_scale
+        values[STACK] = stack / chip_scale
+        values[TO_CALL] = to_call / chip_scale
+        values[ROUND_BET] = player.round_bet / chip_scale
+        values[TOTAL_BET] = player.total_bet / chip_scale
+        values[BET_TO_MATCH] = bet_to_match / chip_scale
+        values[LAST_RAISE] = game.last_raise / chip_scale
+        values[POT_ODDS] = to_call / (pot + to_call) if to_call else 0.0
+        values[STACK_TO_POT] = min(stack / pot, MAX_STACK_TO_POT) / MAX_STACK_TO_POT if pot else 1.0
+        values[EFFECTIVE_STACK] = min(stack, max((other.stack_size for other in opponents), default=0)) / chip_scale
+
+        # Table and position, the position counted in seats after the dealer
+        table_manager = table.table_manager
+        seat_order = table_manager.seat_order(table_manager.dealer_position)
+        values[SEATS] = len(seated) / MAX_SEATS
+        values[LIVE_OPPONENTS] = len(opponents) / (MAX_SEATS - 1)
+        values[OPPONENTS_TO_ACT] = sum(1 for other in opponents if not other.is_all_in and (not other.has_acted or other.round_bet < bet_to_match)) / (MAX_SEATS - 1)
+        values[OPPONENTS_ALL_IN] = sum(1 for other in opponents if other.is_all_in) / (MAX_SEATS - 1)
+        values[POSITION] = seat_order.index(table_manager.seat_numbers[player]) / len(seated)
+        values[IS_DEALER] = float(player.is_dealer)
+        values[IS_SMALL_BLIND] = float(player.is_small_blind)
+        values[IS_BIG_BLIND] = float(player.is_big_blind)
+
+        # Betting history from the hand's action stack
+        last_aggressor = None
+        own_aggressive_actions = 0
+        for _, _, street_name, actor, action_type, bet_to_match_before, bet_to_match_after in game.action_stack:
+            column = ACTION_COLUMNS.get(action_type)
+            if column is None:
+                column = 0 if bet_to_match_after > bet_to_match_before else 1  # An ALL_IN that raised or just called
+            values[HISTORY + STREET_INDEX[street_name] * len(HISTORY_COLUMNS) + column] += 1 / HISTORY_SCALE
+            if column == 0:
+                last_aggressor = actor
+                own_aggressive_actions += actor is player
+        values[OWN_AGGRESSIVE_ACTIONS] = own_aggressive_actions / HISTORY_SCALE
+        values[LAST_AGGRESSOR_SELF] = float(last_aggressor is player)
+        values[LAST_AGGRESSOR_OPPONENT] = float(last_aggressor is not None and last_aggressor is not player)
+
+        # Opponent tendencies, averaged and maxed over the players still in the hand
+        if self.stat_tracker is not None and opponents:
+            columns = list(zip(*[self.opponent_stats(other.name) for other in opponents]))
+            for index, column in enumerate(columns[:-1]):
+                values[OPPONENT_MEAN + index] = sum(column) / len(opponents)
+                values[OPPONENT_MAX + index] = max(column)
+            values[OPPONENT_SAMPLE] = sum(columns[-1]) / len(opponents)
+
+        self.features[row] = values
+
+
+    def encode_vector_game(self, game):
+        # Writes the pending decision of every table of a VectorHeadsUpGame into row i for table i and returns those
+        # rows; rows of stopped tables are zero. No opponent stats, the vector tables have no StatTracker.
+        if game.num_games > self.batch_size:
+            raise ValueError(f"Expected at most {self.batch_size} tables, got {game.num_games}")
+        features = self.features[:game.num_games]
+        features[:] = 0
+        games = game.rows[game.to_act >= 0]
+        seats = game.to_act[games]
+        others = 1 - seats
+        rows = np.arange(len(games))
+        # Written in place when every table is playing, gathered into the buffer at the end otherwise
+        block = features if len(games) == game.num_games else np.zeros((len(games), NUM_FEATURES), dtype=np.float32)
+
+        # Cards
+        hole_cards = game.hole_cards[games, seats].astype(np.intp)
+        ranks = hole_cards >> 2
+        block[rows, HOLE + ranks[:, 0]] += 1
+        block[rows, HOLE + ranks[:, 1]] += 1
+        block[:, HOLE_PAIR] = ranks[:, 0] == ranks[:, 1]
+        block[:, HOLE_SUITED] = (hole_cards[:, 0] & 3) == (hole_cards[:, 1] & 3)
+        block[:, HOLE_GAP] = np.abs(ranks[:, 0] - ranks[:, 1]) / 12
+
+        streets = game.street[games]
+        board = game.board[games].astype(np.intp)
+        num_board = VISIBLE_BOARD[streets]
+        suit_counts = np.zeros((len(games), 4), dtype=np.int64)
+        for position in range(5):
+            # One card per row at a time, so repeated ranks and suits add up
+            showing = np.flatnonzero(num_board > position)
+            cards = board[showing, position]
+            block[showing, BOARD + (cards >> 2)] += 1
+            suit_counts[showing, cards & 3] += 1
+        block[:, BOARD_SUIT_MAX] = suit_counts.max(axis=1) / 5
+        suit_counts[rows, hole_cards[:, 0] & 3] += 1
+        suit_counts[rows, hole_cards[:, 1] & 3] += 1
+        block[:, HAND_SUIT_MAX] = suit_counts.max(axis=1) / 7
+        block[rows, STREET + streets] = 1
+
+        # Hole cards with the visible board, one evaluate_batch per street
+        strengths = np.zeros(len(games), dtype=np.int64)
+        for street in range(NUM_STREETS):
+            on_street = np.flatnonzero(streets == street)
+            if len(on_street):
+                strengths[on_street] = HandEvaluator.evaluate_batch(np.concatenate([hole_cards[on_street], board[on_street, :VISIBLE_BOARD[street]]], axis=1))
+        block[rows, CATEGORY + (strengths >> HandEvaluator.CATEGORY_SHIFT)] = 1
+        block[:, HAND_STRENGTH] = strengths / STRENGTH_SCALE
+
+        # Chips
+        chip_scale = CHIP_SCALE * game.big_blind
+        pot = game.pot[games]
+        stack = game.stacks[games, seats]
+        round_bet = game.round_bets[games, seats]
+        bet_to_match = game.bet_to_match[games]
+        to_call = np.minimum(np.maximum(bet_to_match - round_bet, 0), stack)
+        live = ~game.folded[games, others]
+        block[:, POT] = pot / chip_scale
+        block[:, STACK] = stack / chip_scale
+        block[:, TO_CALL] = to_call / chip_scale
+        block[:, ROUND_BET] = round_bet / chip_scale
+        block[:, TOTAL_BET] = game.total_bets[games, seats] / chip_scale
+        block[:, BET_TO_MATCH] = bet_to_match / chip_scale
+        block[:, LAST_RAISE] = game.last_raise[games] / chip_scale
+        block[:, POT_ODDS] = np.where(to_call > 0, to_call / np.maximum(pot + to_call, 1), 0.0)
+        block[:, STACK_TO_POT] = np.where(pot > 0, np.minimum(stack / np.maximum(pot, 1), MAX_STACK_TO_POT) / MAX_STACK_TO_POT, 1.0)
+        block[:, EFFECTIVE_STACK] = np.minimum(stack, np.where(live, game.stacks[games, others], 0)) / chip_scale
+
+        # Table and position: heads-up the dealer posts the small blind
+        dealer = game.dealer[games]
+        other_all_in = game.all_in[games, others]
+        other_to_act = live & ~other_all_in & (~game.has_acted[games, others] | (game.round_bets[games, others] < bet_to_match))
+        block[:, SEATS] = 2 / MAX_SEATS
+        block[:, LIVE_OPPONENTS] = live / (MAX_SEATS - 1)
+        block[:, OPPONENTS_TO_ACT] = other_to_act / (MAX_SEATS - 1)
+        block[:, OPPONENTS_ALL_IN] = (live & other_all_in) / (MAX_SEATS - 1)
+        block[:, POSITION] = (seats - dealer) % 2 / 2
+        block[:, IS_DEALER] = seats == dealer
+        block[:, IS_SMALL_BLIND] = seats == dealer
+        block[:, IS_BIG_BLIND] = seats != dealer
+
+        # Betting history
+        block[:, HISTORY:HISTORY + NUM_STREETS * len(HISTORY_COLUMNS)] = game.street_actions[games].reshape(len(games), -1) / HISTORY_SCALE
+        last_aggressor = game.last_aggressor[games]
+        block[:, OWN_AGGRESSIVE_ACTIONS] = game.aggressive_actions[games, seats] / HISTORY_SCALE
+        block[:, LAST_AGGRESSOR_SELF] = last_aggressor == seats
+        block[:, LAST_AGGRESSOR_OPPONENT] = last_aggressor == others
+
+        if block is not features:
+            features[games] = block
+        return features
+
+
+def cross_check(num_games=20, num_hands=50, seed=0):
+    # Plays the vector_game cross-check tables through both engines and encodes every decision from each, returns
+    # the decisions whose rows differ. Table t's k-th decision is the k-th step it takes part in on the vector side.
+    from game_management import StateMachine  # Needs player_model, which needs torch
+
+    encoder = StateEncoder(num_games)
+    game = VectorHeadsUpGame(num_games, seed=seed, rebuy=False)
+    vector_rows = [[] for _ in range(num_games)]
+    while True:
+        playing = np.flatnonzero((game.to_act >= 0) & (game.hands_played < num_hands))
+        if not len(playing):
+            break
+        features = encoder.encode_vector_game(game)
+        for game_index in playing:
+            vector_rows[game_index].append(features[game_index].copy())
+        game.step(*cross_check_actions(game))
+
+    mismatches = []
+    decisions = 0
+    for game_index in range(num_games):
+        seed_value = int(game.seeds[game_index])
+        table = StateMachine('heads_up', 2, 'max_buy_in', SeededShuffle(seed_value), headless=True)
+        policy = cross_check_agent(table, seed_value)
+        object_rows = []
+
+        def agent(player, big_blind, bet_to_match, last_raise, table=table, policy=policy, object_rows=object_rows):
+            encoder.encode(0, table, player)
+            object_rows.append(encoder.features[0].copy())
+            return policy(player, big_blind, bet_to_match, last_raise)
+
+        table.set_agents(agent)
+        table.run_hands(num_hands)
+        decisions += len(object_rows)
+        if len(object_rows) != len(vector_rows[game_index]):
+            mismatches.append({'game': game_index, 'decisions': (len(object_rows), len(vector_rows[game_index]))})
+        for decision, (object_row, vector_row) in enumerate(zip(object_rows, vector_rows[game_index])):
+            if not np.array_equal(object_row, vector_row):
+                differing = [FEATURES[index] for index in np.flatnonzero(object_row != vector_row)]
+                mismatches.append({'game': game_index, 'decision': decision, 'features': differing})
+
+    return {'games': num_games, 'decisions': decisions, 'mismatches': mismatches}
+
+
+if __name__ == "__main__":
+    # Usage: python state_encoder.py [tables] [hands per table], cross-checks both encoders then times a batch
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    num_hands = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    result = cross_check(num_games, num_hands)
+    print(f"Cross-check: {result['decisions']} decisions on {result['games']} tables, {len(result['mismatches'])} mismatches")
+    for mismatch in result['mismatches'][:10]:
+        print(mismatch)
+
+    game = VectorHeadsUpGame(10000)
+    encoder = StateEncoder(game.num_games)
+    encoder.encode_vector_game(game)  # Builds the batch lookup tables
+    start = time.perf_counter()
+    for _ in range(20):
+        encoder.encode_vector_game(game)
+        game.step(*cross_check_actions(game))
+    elapsed = time.perf_counter() - start
+    print(f"20 steps of 10000 tables encoded and played in {elapsed:.2f}s")
@@ -3,9 +3,9 @@ class TableConfig:
         'low': {
             'min_buy_in': 20,  # how many times the big blind
             'max_buy_in': 100, 
-            'time_to_act': None,
-            'max_time_bank': None,
-            'time_bank_added_per_level': None,
+            'time_to_act': 15,  # seconds, None for no action clock
+            'max_time_bank': 60,
+            'time_bank_added_per_level': 5,
             'max_seats': 9,
             'blinds': (1, 2, 1),
             'players': [None] * 9,
@@ -17,6 +17,9 @@ class TableConfig:
         'heads_up': {
             'min_buy_in': 20,  # how many times the big blind
             'max_buy_in': 100, 
+            'time_to_act': 15,
+            'max_time_bank': 60,
+            'time_bank_added_per_level': 5,
             'max_seats': 2,
             'blinds': (10, 20, 1),
             'players': [None] * 2,
@@ -1,26 +1,124 @@
 class TableManagement:
+    # The seats of the table named table_name as bitmasks (bit i is seat i), kept up to date as players sit down,
+    # leave and change state: add_player and remove_player, update_seat after a player's flags change, new_hand
+    # once every player is reset. The active and eligible queries combine masks instead of scanning the players,
+    # and the button and blind seats with next_seat give every street's first player and the named positions.
+    # The player lists they return are cached tuples, shared and never changed in place.
+    MASK_SEATS = {}  # mask -> tuple of its seats, built once per mask and shared by every table
+    # The positions before the button in action order, by the number of players dealt in
+    EARLY_POSITIONS = {
+        3: (),
+        4: ('CO',),
+        5: ('MP', 'CO'),
+        6: ('UTG', 'MP', 'CO'),
+        7: ('UTG', 'LJ', 'HJ', 'CO'),
+        8: ('UTG', 'MP', 'LJ', 'HJ', 'CO'),
+        9: ('UTG', 'UTG+1', 'MP', 'LJ', 'HJ', 'CO'),
+    }
+
     def __init__(self, table_name):
         self.tables = {}
         self.table_name = table_name
         self.dealer_position = 0
+        self.small_blind_position = 0
+        self.big_blind_position = 0
+        self.verbose = True
+        self.seat_numbers = {}  # player -> seat
+        self.mask_players = {}  # mask -> its players, cleared whenever someone sits down or leaves
+        self.seated_mask = 0
+        self.folded_mask = 0
+        self.all_in_mask = 0
+        self.ineligible_mask = 0
+        self.sitting_out_mask = 0
+
+
+    @staticmethod
+    def seats_of(mask):
+        seats = TableManagement.MASK_SEATS.get(mask)
+        if seats is None:
+            seats = TableManagement.MASK_SEATS[mask] = tuple(seat for seat in range(mask.bit_length()) if mask >> seat & 1)
+        return seats
+
+
+    def active_mask(self):
+        # Seated players who have not folded or sat out
+        return self.seated_mask & ~(self.folded_mask | self.sitting_out_mask)
+
+
+    def eligible_mask(self):
+        return self.seated_mask & ~(self.folded_mask | self.ineligible_mask | self.sitting_out_mask)
+
+
+    def count_active(self):
+        mask = self.seated_mask & ~(self.folded_mask | self.sitting_out_mask)
+        return len(TableManagement.MASK_SEATS.get(mask) or self.seats_of(mask))
+
+
+    def open_seats(self):
+        return len(self.seats) - len(self.seats_of(self.seated_mask))
+
+
+    def count_can_act(self):
+        # Active players who are not all in
+        return len(self.seats_of(self.active_mask() & ~self.all_in_mask))
+
+
+    def players_of(self, mask):
+        # The seated players of a mask in seat order, one tuple shared by every caller until the seating changes
+        players = self.mask_players.get(mask)
+        if players is None:
+            players = self.mask_players[mask] = tuple(self.seats[seat] for seat in self.seats_of(mask))
+        return players
 
 
     def get_active_players(self):
-        players_list = self.tables[self.table_name]['player_activity']['active_players']
         # Filter the players who have not folded
-        active_players = [player for player in players_list if not player.is_folded and not player.is_sitting_out]
-        
-        return active_players
+        return self.players_of(self.seated_mask & ~(self.folded_mask | self.sitting_out_mask))
 
 
     def update_player_eligibility(self):
-        
-        eligible_players = [player for player in self.tables[self.table_name]['player_activity']['active_players'] if player.is_eligible_for_pot and not player.is_folded and not player.is_sitting_out]
-        self.tables[self.table_name]['community_pot']['eligible_players'] = eligible_players
+        eligible_players = self.players_of(self.seated_mask & ~(self.folded_mask | self.ineligible_mask | self.sitting_out_mask))
+        self.community_pot['eligible_players'] = eligible_players
         
         return eligible_players
 
 
+    def update_seat(self, player):
+        # Reads one player's flags back into the masks after they changed
+        bit = 1 << self.seat_numbers[player]
+        self.folded_mask = self.folded_mask | bit if player.is_folded else self.folded_mask & ~bit
+        self.all_in_mask = self.all_in_mask | bit if player.is_all_in else self.all_in_mask & ~bit
+        self.ineligible_mask = self.ineligible_mask & ~bit if player.is_eligible_for_pot else self.ineligible_mask | bit
+        self.sitting_out_mask = self.sitting_out_mask | bit if player.is_sitting_out else self.sitting_out_mask & ~bit
+
+
+    def check_seat_masks(self):
+        # The masks are only right while every flag change goes through update_seat (or new_hand), raises naming
+        # the first player whose flags and masks disagree. A player sitting out keeps last hand's other flags.
+        # A cross-check that reads every player, StateMachine only runs it with check_masks set.
+        for player, seat in self.seat_numbers.items():
+            bit = 1 << seat
+            if bool(self.sitting_out_mask & bit) != player.is_sitting_out:
+                raise ValueError(f"Seat masks out of date for {player.name}, call update_seat after changing is_sitting_out")
+            if player.is_sitting_out:
+                continue
+            if (bool(self.folded_mask & bit), bool(self.all_in_mask & bit), not self.ineligible_mask & bit) != (player.is_folded, player.is_all_in, player.is_eligible_for_pot):
+                raise ValueError(f"Seat masks out of date for {player.name}, call update_seat after changing their flags")
+
+
+    def new_hand(self):
+        # Every seated player was just reset_for_new_hand: nobody is folded, all in or out of the pot
+        self.folded_mask = self.all_in_mask = self.ineligible_mask = 0
+
+
+    def seat_masks(self):
+        return (self.seated_mask, self.folded_mask, self.all_in_mask, self.ineligible_mask, self.sitting_out_mask)
+
+
+    def set_seat_masks(self, masks):
+        self.seated_mask, self.folded_mask, self.all_in_mask, self.ineligible_mask, self.sitting_out_mask = masks
+
+
     def add_table(self, table_name, table_config):
         self.tables[table_name] = {
             'max_seats': table_config['max_seats'],
@@ -29,12 +127,16 @@ class TableManagement:
             'blinds': table_config['blinds'],
             'player_activity': {
                 'active_players': [None]*table_config['max_seats'],
-                'waiting_player': [None]*table_config['max_seats'] * 2,
             },
-            'community_pot': table_config['community_pot'].copy(),
-            'side_pots': table_config['side_pots'].copy(),
+            # The pots are filled in place during play, so every table copies them down to the player lists
+            'community_pot': dict(table_config['community_pot'], eligible_players=list(table_config['community_pot']['eligible_players'])),
+            'side_pots': [dict(pot, eligible_players=list(pot['eligible_players'])) for pot in table_config['side_pots']],
             'seats': [None]*table_config['max_seats'],  
         }
+        if table_name == self.table_name:
+            self.seats = self.tables[table_name]['seats']
+            self.community_pot = self.tables[table_name]['community_pot']
+            self.rebuild_seat_order()
         return table_name
 
 
@@ -48,17 +150,30 @@ class TableManagement:
 
 
     def add_player(self, player, table):
-    
-        # Check if there is an open seat
-        if None in table['seats']:
-            # Find the first empty seat
-            position = table['seats'].index(None)
+        # Returns the seat taken, None when the table is full
+        own_table = table is self.tables.get(self.table_name)
+        if own_table:
+            # The first empty seat is the lowest clear bit of the seated mask
+            empty_seats = ~self.seated_mask & ((1 << len(table['seats'])) - 1)
+            position = (empty_seats & -empty_seats).bit_length() - 1 if empty_seats else None
+        else:
+            position = table['seats'].index(None) if None in table['seats'] else None
 
+        # Check if there is an open seat
+        if position is not None:
             # Place the player in the seat
             table['seats'][position] = player
             table['player_activity']['active_players'][position] = player  # Add player to 'players' list at the same position
+            if own_table:
+                self.seat_numbers[player] = position
+                self.seated_mask |= 1 << position
+                self.mask_players.clear()
+                self.rebuild_seat_order()
+                player.is_dealer = player.is_small_blind = player.is_big_blind = False
+                self.update_seat(player)
         else:
             print("Table is full. Cannot add more players.")
+        return position
 
 
 
@@ -66,10 +181,22 @@ class TableManagement:
         table = self.tables[table_name]
 
         if player in table['seats']:
-            print(f"{player.name} has been removed from the table.")
+            if self.verbose:
+                print(f"{player.name} has been removed from the table.")
             index = table['seats'].index(player)
             table['seats'][index] = None
-            table['player_activity']['active_players'].remove(player)
+            table['player_activity']['active_players'][index] = None  # Empty seats stay None so both lists keep the seat order
+            if table_name == self.table_name:
+                del self.seat_numbers[player]
+                self.mask_players.clear()
+                self.rebuild_seat_order()
+                player.is_dealer = player.is_small_blind = player.is_big_blind = False
+                bit = 1 << index
+                self.seated_mask &= ~bit
+                self.folded_mask &= ~bit
+                self.all_in_mask &= ~bit
+                self.ineligible_mask &= ~bit
+                self.sitting_out_mask &= ~bit
             
 
     def manage_table(self, table_name):
@@ -106,65 +233,71 @@ class TableManagement:
 
     def set_start_index(self, street, table, big_blind):
         all_players = table['seats']
-        
-        big_blind_index = None
-        dealer_index = None
-        for i, player in enumerate(all_players):
-            if player is not None:
-                if player.is_big_blind:
-                    big_blind_index = i
-                if player.is_dealer:
-                    dealer_index = i
-
 
         if street == 'preflop':
             # The player to the left of the big blind starts on preflop
-            starting_player_index = (big_blind_index + 1) % len(all_players)
-            bet_to_match = big_blind
-        else:
-            # The player to the left of the dealer starts on all other streets
-            starting_player_index = (dealer_index + 1) % len(all_players)
-            bet_to_match = 0
-
-        # Ensure the starting player is not None
-        while all_players[starting_player_index] is None:
-            starting_player_index = (starting_player_index + 1) % len(all_players)
-    
-        return all_players, starting_player_index, bet_to_match
+            return all_players, self.next_seat[self.big_blind_position], big_blind
 
+        # The player to the left of the dealer starts on all other streets
+        return all_players, self.next_seat[self.dealer_position], 0
 
 
     def advance_button(self, table_manager, table_name):
-        table = table_manager.tables[table_name]
-        seats = table['seats']
+        seats = table_manager.tables[table_name]['seats']
 
-        # Reset dealer, small blind and big blind status for all players
-        for player in seats:
+        # Only last hand's button and blinds still carry the flags, players who left had theirs cleared
+        for position in (self.dealer_position, self.small_blind_position, self.big_blind_position):
+            player = seats[position]
             if player is not None:
-                player.is_dealer = False
-                player.is_small_blind = False
-                player.is_big_blind = False
-
-        # Find the next non-empty seat for dealer
-        self.dealer_position = (self.dealer_position + 1) % len(seats)
-        while seats[self.dealer_position] is None:
-            self.dealer_position = (self.dealer_position + 1) % len(seats)
-        seats[self.dealer_position].is_dealer = True
-
-        # Find the next non-empty seat for small blind
-        self.small_blind_position = (self.dealer_position + 1) % len(seats)
-        while seats[self.small_blind_position] is None:
-            self.small_blind_position = (self.small_blind_position + 1) % len(seats)
-
-        # Find the next non-empty seat for big blind
-        self.big_blind_position = (self.small_blind_position + 1) % len(seats)
-        while seats[self.big_blind_position] is None:
-            self.big_blind_position = (self.big_blind_position + 1) % len(seats)
+                player.is_dealer = player.is_small_blind = player.is_big_blind = False
 
+        self.dealer_position = self.next_seat[self.dealer_position]
         # In heads-up situations, the dealer also posts the small blind
-        if len([seat for seat in seats if seat is not None]) == 2:
-            seats[self.dealer_position].is_small_blind = True
-            seats[self.small_blind_position].is_big_blind = True
+        if len(self.seats_of(self.seated_mask)) == 2:
+            self.small_blind_position = self.dealer_position
         else:
-            seats[self.small_blind_position].is_small_blind = True
-            seats[self.big_blind_position].is_big_blind = True
+            self.small_blind_position = self.next_seat[self.dealer_position]
+        self.big_blind_position = self.next_seat[self.small_blind_position]
+
+        seats[self.dealer_position].is_dealer = True
+        seats[self.small_blind_position].is_small_blind = True
+        seats[self.big_blind_position].is_big_blind = True
+
+
+    def rebuild_seat_order(self):
+        # next_seat[i] is the first occupied seat after seat i going round the table (None at an empty table),
+        # rebuilt only when someone sits down or leaves
+        seats = self.seats
+        occupied = [seat for seat in range(len(seats)) if seats[seat] is not None]
+        self.next_seat = [next((other for other in occupied if other > seat), occupied[0] if occupied else None) for seat in range(len(seats))]
+        self.seat_orders = {}
+        self.seat_positions = {}
+
+
+    def seat_order(self, start):
+        # The occupied seats round the table from seat start on (start itself first when occupied)
+        order = self.seat_orders.get(start)
+        if order is None:
+            first = start if self.seats[start] is not None else self.next_seat[start]
+            order = [first]
+            while self.next_seat[order[-1]] != first:
+                order.append(self.next_seat[order[-1]])
+            order = self.seat_orders[start] = tuple(order)
+        return order
+
+
+    def position_names(self):
+        # {seat: position name} for the current button, named as HandRangeMatrix names its ranges
+        names = self.seat_positions.get(self.dealer_position)
+        if names is None:
+            order = self.seat_order(self.dealer_position)
+            if len(order) == 2:
+                labels = ('SB', 'BB')
+            else:
+                labels = ('BTN', 'SB', 'BB') + TableManagement.EARLY_POSITIONS[len(order)]
+            names = self.seat_positions[self.dealer_position] = dict(zip(order, labels))
+        return names
+
+
+    def position_name(self, seat):
+        return self.position_names()[seat]
@@ -0,0 +1,187 @@
+import os
+import queue
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+import numpy as np
+
+from deck_management import SeededShuffle
+from individual_player import Player
+
+
+def table_seed(seed, table_index):
+    # Independent 64-bit shuffle seed for every table of a run
+    return int(np.random.SeedSequence([seed, table_index]).generate_state(1, np.uint64)[0])
+
+
+def run_table(table_index, table_name, num_players, buy_in, num_hands, seed, agents, result_queue, chunk_hands):
+    # Plays one headless table inside a worker process and streams its hands back in chunks, so whatever was
+    # sent before a failure is kept by the parent. Messages are (kind, table_index, payload) tuples.
+    from game_management import StateMachine
+
+    try:
+        table = StateMachine(table_name, num_players, buy_in, SeededShuffle(seed), agents=agents, headless=True)
+        players = [player for player in table.all_players if player is not None]
+        result_queue.put(('start', table_index, {'players': [player.name for player in players], 'big_blind': table.big_blind}))
+
+        hands_played = 0
+        start = time.perf_counter()
+        while hands_played < num_hands:
+            result = table.run_hands(min(chunk_hands, num_hands - hands_played))
+            # Compact rows: hand number, went to showdown, chip change per seat in the order sent at start (None
+            # for a seat not dealt in, a player who busted earlier)
+            rows = [(hand['hand_number'], hand['showdown'], tuple(hand['chip_changes'].get(player.name) for player in players)) for hand in result['results']]
+            result_queue.put(('hands', table_index, rows))
+            hands_played += result['hands']
+            if result['hands'] == 0:
+                break  # Fewer than two players left
+        result_queue.put(('done', table_index, {'hands': hands_played, 'elapsed': time.perf_counter() - start}))
+
+    except Exception:
+        result_queue.put(('error', table_index, traceback.format_exc()))
+        raise
+
+
+class TableRunner:
+    def __init__(self, processes=None, chunk_hands=500):
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_hands = chunk_hands
+
+
+    @staticmethod
+    def new_table_result(table_index, seed):
+        return {
+            'table': table_index,
+            'seed': seed,
+            'status': 'pending',
+            'players': [],
+            'big_blind': None,
+            'hands': 0,
+            'showdowns': 0,
+            'chips': [],
+            'hands_won': [],
+            'seat_hands': [],  # Hands each seat was dealt in
+            'elapsed': None,
+            'error': None,
+        }
+
+
+    @staticmethod
+    def add_hands(table_result, rows):
+        for _, showdown, chip_changes in rows:
+            table_result['hands'] += 1
+            table_result['showdowns'] += showdown
+            for seat, change in enumerate(chip_changes):
+                if change is None:
+                    continue
+                table_result['seat_hands'][seat] += 1
+                table_result['chips'][seat] += change
+                table_result['hands_won'][seat] += change > 0
+
+
+    def run(self, num_tables, num_hands, table_name='low', num_players=9, buy_in='max_buy_in', agents=None, seed=0, on_hands=None):
+        # Runs num_tables independent tables of num_hands hands each over the process pool. on_hands, when given,
+        # is called in the parent as on_hands(table_index, rows) as the chunks stream in.
+        agents = agents or Player.make_decision_test
+        tables = {index: TableRunner.new_table_result(index, table_seed(seed, index)) for index in range(num_tables)}
+        start = time.perf_counter()
+
+        # A crashed worker breaks the whole pool; tables that had not started yet get a fresh pool
+        remaining = list(tables)
+        while remaining:
+            self.run_pool(tables, remaining, table_name, num_players, buy_in, num_hands, agents, on_hands)
+            not_started = [index for index in remaining if tables[index]['status'] == 'pending']
+            if len(not_started) == len(remaining):
+                for index in not_started:
+                    tables[index]['status'] = 'failed'
+                break
+            remaining = not_started
+
+        elapsed = time.perf_counter() - start
+        return TableRunner.merge(list(tables.values()), elapsed)
+
+
+    def run_pool(self, tables, indices, table_name, num_players, buy_in, num_hands, agents, on_hands):
+        with Manager() as manager, ProcessPoolExecutor(max_workers=self.processes) as executor:
+            result_queue = manager.Queue()
+            futures = {
+                executor.submit(run_table, index, table_name, num_players, buy_in, num_hands, tables[index]['seed'], agents, result_queue, self.chunk_hands): index
+                for index in indices
+            }
+            pending = set(futures)
+
+            while pending or not result_queue.empty():
+                try:
+                    kind, index, payload = result_queue.get(timeout=0.05)
+                except queue.Empty:
+                    finished = {future for future in pending if future.done()}
+                    pending -= finished
+                    for future in finished:
+                        # A worker that died without reporting (e.g. killed) fails its table, the hands it sent stay
+                        table_result = tables[futures[future]]
+                        if future.exception() is not None:
+                            table_result['error'] = table_result['error'] or repr(future.exception())
+                            if table_result['status'] == 'running':
+                                table_result['status'] = 'failed'
+                    continue
+
+                table_result = tables[index]
+                if kind == 'start':
+                    table_result['status'] = 'running'
+                    table_result['players'] = payload['players']
+                    table_result['big_blind'] = payload['big_blind']
+                    table_result['chips'] = [0] * len(payload['players'])
+                    table_result['hands_won'] = [0] * len(payload['players'])
+                    table_result['seat_hands'] = [0] * len(payload['players'])
+                elif kind == 'hands':
+                    TableRunner.add_hands(table_result, payload)
+                    if on_hands is not None:
+                        on_hands(index, payload)
+                elif kind == 'done':
+                    table_result['status'] = 'done'
+                    table_result['elapsed'] = payload['elapsed']
+                elif kind == 'error':
+                    table_result['status'] = 'failed'
+                    table_result['error'] = payload
+
+
+    @staticmethod
+    def merge(table_results, elapsed):
+        # Chip results and stats per player name summed over every table, failed tables included up to where they stopped
+        players = {}
+        for table_result in table_results:
+            for seat, name in enumerate(table_result['players']):
+                stats = players.setdefault(name, {'hands': 0, 'chips': 0, 'hands_won': 0, 'big_blinds': 0.0})
+                stats['hands'] += table_result['seat_hands'][seat]
+                stats['chips'] += table_result['chips'][seat]
+                stats['hands_won'] += table_result['hands_won'][seat]
+                stats['big_blinds'] += table_result['chips'][seat] / table_result['big_blind']
+
+        for stats in players.values():
+            stats['bb_per_100'] = 100 * stats.pop('big_blinds') / stats['hands'] if stats['hands'] else 0.0
+
+        hands = sum(table_result['hands'] for table_result in table_results)
+        return {
+            'hands': hands,
+            'showdowns': sum(table_result['showdowns'] for table_result in table_results),
+            'elapsed': elapsed,
+            'hands_per_second': hands / elapsed if elapsed > 0 else 0.0,
+            'failed_tables': [table_result['table'] for table_result in table_results if table_result['status'] != 'done'],
+            'players': players,
+            'tables': table_results,
+        }
+
+
+if __name__ == "__main__":
+    # Usage: python table_runner.py [number of tables] [hands per table] [processes]
+    num_tables = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    num_hands = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    summary = TableRunner(processes).run(num_tables, num_hands)
+    print(f"{summary['hands']} hands on {num_tables} tables in {summary['elapsed']:.1f}s ({summary['hands_per_second']:,.0f} hands/s)")
+    print(f"Failed tables: {summary['failed_tables']}")
+    for name, stats in sorted(summary['players'].items()):
+        print(f"{name:<12} {stats['hands']:>8} hands {stats['chips']:>10} chips {stats['bb_per_100']:>8.2f} bb/100 {stats['hands_won']:>8} won")
@@ -0,0 +1,273 @@
+import asyncio
+import inspect
+import json
+import sys
+import time
+
+from individual_player import Action
+
+
+# Street state that follows each betting street when the hand carries on
+NEXT_STATES = {'preflop': 'flop', 'flop': 'turn', 'turn': 'river', 'river': 'showdown'}
+
+
+def action_request(table, player):
+    # Public view of the decision sent to a client, plain values only so it can go over a socket
+    return {
+        'table': table.table_name,
+        'hand_number': table.hand_number,
+        'player': player.name,
+        'hole_cards': list(player.hole_cards),
+        'community_cards': list(table.community_cards),
+        'stack_size': player.stack_size,
+        'round_bet': player.round_bet,
+        'bet_to_match': table.game.bet_to_match,
+        'last_raise': table.game.last_raise,
+        'big_blind': table.big_blind,
+        'pot_value': table.community_pot['pot_value'],
+        'time_bank': player.time_bank,
+    }
+
+
+class InProcessClient:
+    # Answers with an agent in the host process. The agent is called like Player.agent and may be a coroutine
+    # function, which lets it wait on anything (a queue fed by a UI, a model server) without blocking other tables.
+    def __init__(self, agent):
+        self.agent = agent
+
+    async def get_action(self, table, player, request):
+        action = self.agent(player, table.big_blind, table.game.bet_to_match, table.game.last_raise)
+        if inspect.isawaitable(action):
+            action = await action
+        return action
+
+
+class SocketClient:
+    # Stand-in for a remote player: one JSON line out per decision, one JSON line back with 'type' and 'amount'.
+    # Every request carries an 'id' the reply echoes, so a late reply to a request that timed out is told apart
+    # from the answer to the next one and dropped.
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.lock = asyncio.Lock()  # One outstanding request per connection
+        self.next_request_id = 0
+        self.late_replies = 0
+
+    @staticmethod
+    async def connect(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return SocketClient(reader, writer)
+
+    async def get_action(self, table, player, request):
+        async with self.lock:
+            self.next_request_id += 1
+            request_id = self.next_request_id
+            self.writer.write(json.dumps(dict(request, id=request_id)).encode() + b'\n')
+            await self.writer.drain()
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    raise ConnectionError("Player connection closed")
+                reply = json.loads(line)
+                if reply.get('id') == request_id:
+                    break
+                self.late_replies += 1
+        return Action(reply['type'], reply.get('amount', 0))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve_agent(agent, host='127.0.0.1', port=0):
+    # Player side of SocketClient: answers every request line with agent(request) -> Action, echoing its id
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                action = agent(json.loads(line))
+                if inspect.isawaitable(action):
+                    action = await action
+                reply = {'id': json.loads(line).get('id'), 'type': action.type, 'amount': action.amount}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass  # The host went away mid-request
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+class AsyncTableHost:
+    # Drives many StateMachine tables on one event loop. Betting goes through PokerGame.betting_steps, every
+    # decision is awaited from the seat's client under the table's action clock, and everything else in a hand
+    # runs through the table's ordinary state actions. A level_scheduler shared by the tables sets their blinds
+    # and tops up the time banks at each level change; without a clock its levels go by the hand number of the
+    # table furthest ahead. Players seated after add_table (rebuys, lobby seating)
+    # are given their client with set_client, or play through their table's client when it was given one client
+    # for every seat, or through default_client.
+    def __init__(self, level_scheduler=None, default_client=None):
+        self.tables = []
+        self.clients = {}
+        self.table_clients = {}
+        self.default_client = default_client
+        self.timeouts = 0
+        self.level_scheduler = level_scheduler
+
+
+    def add_table(self, table, clients):
+        # clients is one client for every seat or a list with one per seat
+        one_client = not isinstance(clients, (list, tuple))
+        if one_client:
+            self.table_clients[id(table)] = clients
+        for seat, player in enumerate(table.all_players):
+            if player is not None:
+                self.set_client(table, player, clients if one_client else clients[seat])
+        if self.level_scheduler is not None:
+            table.level_scheduler = self.level_scheduler
+        self.tables.append(table)
+
+
+    def set_client(self, table, player, client):
+        # Registers the client of a player sitting down at table, with a full time bank
+        player.time_bank = table.table_config.get('max_time_bank') or 0
+        self.clients[id(player)] = client
+
+
+    def get_client(self, table, player):
+        client = self.clients.get(id(player))
+        if client is None:
+            client = self.table_clients.get(id(table), self.default_client)
+            if client is None:
+                raise KeyError(f"No client for {player.name}, seat them with set_client")
+        return client
+
+
+    def add_time_bank(self, table):
+        # Called at each level change: tops up every player's time bank, capped at max_time_bank
+        added = table.table_config.get('time_bank_added_per_level') or 0
+        max_time_bank = table.table_config.get('max_time_bank') or 0
+        for player in table.all_players:
+            if player is not None:
+                player.time_bank = min(max_time_bank, player.time_bank + added)
+
+
+    async def request_action(self, table, player):
+        client = self.get_client(table, player)
+        time_to_act = table.table_config.get('time_to_act')
+        request = action_request(table, player)
+        if time_to_act is None:
+            return await client.get_action(table, player, request)
+
+        # The player gets time_to_act, then whatever is left in their time bank
+        start = time.monotonic()
+        try:
+            action = await asyncio.wait_for(client.get_action(table, player, request), time_to_act + player.time_bank)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            player.time_bank = 0
+            # Timing out checks when there is nothing to call and folds otherwise
+            if player.round_bet == table.game.bet_to_match:
+                return Action("CHECK", table.game.bet_to_match)
+            return Action("FOLD")
+
+        overtime = time.monotonic() - start - time_to_act
+        if overtime > 0:
+            player.time_bank = max(0, player.time_bank - overtime)
+        return action
+
+
+    async def play_street(self, table, street_name):
+        table.deal_street(street_name)
+        steps = table.game.betting_steps(table.streets[street_name], table.community_cards, table.active_players, table.eligible_players)
+        try:
+            player = next(steps)
+            while True:
+                player = steps.send(await self.request_action(table, player))
+        except StopIteration as finished:
+            table.active_players, table.eligible_players = finished.value
+
+        table.finish_street()
+        if table.state not in ('hidden_end', 'early_finish'):
+            table.state = NEXT_STATES[street_name]
+
+
+    async def play_hand(self, table):
+        # One hand from setup through reset; returns False when the table is short of players
+        if table.table_manager.count_active() < 2:
+            return False
+        if table.apply_level():
+            self.add_time_bank(table)
+        while True:
+            state = table.state
+            if state in NEXT_STATES:
+                await self.play_street(table, state)
+            else:
+                table.state_actions[state]()
+            if state == 'reset':
+                if self.level_scheduler is not None:
+                    self.level_scheduler.hands_played(table.hand_number)
+                return True
+
+
+    async def run_table(self, table, num_hands):
+        hands = 0
+        while hands < num_hands and await self.play_hand(table):
+            hands += 1
+            await asyncio.sleep(0)  # Let the other tables in between hands even when every client answers at once
+        return hands
+
+
+    async def run(self, num_hands):
+        # Plays num_hands hands on every table concurrently and returns the number of hands played
+        start = time.perf_counter()
+        # A clock-driven scheduler gets one task sleeping until each level ends, not a clock read per table
+        level_clock = None
+        if self.level_scheduler is not None and self.level_scheduler.clock is not None:
+            level_clock = asyncio.ensure_future(self.level_scheduler.run_clock())
+        hands = await asyncio.gather(*(self.run_table(table, num_hands) for table in self.tables))
+        if level_clock is not None:
+            level_clock.cancel()
+        elapsed = time.perf_counter() - start
+        return {
+            'tables': len(self.tables),
+            'hands': sum(hands),
+            'elapsed': elapsed,
+            'hands_per_second': sum(hands) / elapsed if elapsed > 0 else 0.0,
+            'timeouts': self.timeouts,
+        }
+
+
+    async def close(self):
+        # Closes every client that holds a connection, each one once
+        clients = {id(client): client for client in self.clients.values()}
+        for client in clients.values():
+            if hasattr(client, 'close'):
+                await client.close()
+
+
+async def demo(num_tables, num_hands, think_time):
+    # Every table plays against in-process clients that take think_time seconds per decision
+    from game_management import StateMachine
+    from deck_management import SeededShuffle
+
+    async def agent(player, big_blind, bet_to_match, last_raise):
+        await asyncio.sleep(think_time)
+        return Action("CALL", bet_to_match)
+
+    host = AsyncTableHost()
+    for index in range(num_tables):
+        host.add_table(StateMachine('low', 9, 'max_buy_in', SeededShuffle(index), headless=True), InProcessClient(agent))
+    return await host.run(num_hands)
+
+
+if __name__ == "__main__":
+    # Usage: python table_server.py [number of tables] [hands per table] [think time in seconds]
+    num_tables = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    num_hands = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    think_time = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    summary = asyncio.run(demo(num_tables, num_hands, think_time))
+    print(f"{summary['hands']} hands on {summary['tables']} tables in {summary['elapsed']:.1f}s ({summary['hands_per_second']:,.0f} hands/s), {summary['timeouts']} timeouts")
@@ -0,0 +1,411 @@
+import sys
+import time
+
+import numpy as np
+
+from deck_management import SeededShuffle
+from hand_evaluator import HandEvaluator
+from individual_player import Action
+from table_config import TableConfig
+
+
+# Action codes taken by VectorHeadsUpGame.step, the same actions as individual_player.Action
+ACTION_TYPES = ['FOLD', 'CHECK', 'CALL', 'BET', 'RAISE', 'ALL_IN']
+FOLD, CHECK, CALL, BET, RAISE, ALL_IN = range(len(ACTION_TYPES))
+
+NUM_STREETS = 4  # preflop, flop, turn, river
+# Columns of the betting history: bets, raises and all-ins that raise the price, calls (all-ins that do not), checks, folds
+HISTORY_COLUMNS = ['AGGRESSIVE', 'CALL', 'CHECK', 'FOLD']
+PASS_START = 2  # Cursor of a table about to start a pass over the seats: first check whether the round goes on
+
+
+class VectorHeadsUpGame:
+    # num_games heads-up tables in struct-of-arrays form: every stack, bet and flag is an array with a row per table
+    # (and a column per seat), and step() takes one decision at every table in a single call. The rules are those of
+    # StateMachine and PokerGame.betting_steps, quirks included, and cross_check() plays both engines from the same
+    # decks and policy to keep it that way. Table i deals the hands StateMachine deals with SeededShuffle(seeds[i]).
+    def __init__(self, num_games, table_name='heads_up', buy_in='max_buy_in', seeds=None, seed=0, rebuy=True):
+        table_config = TableConfig().cash_configs[table_name]
+        self.small_blind, self.big_blind, self.ante = table_config['blinds']
+        self.starting_stack = table_config[buy_in] * self.big_blind
+        self.num_games = num_games
+        # With rebuy both stacks go back to the buy-in when a player busts, otherwise the table stops like a
+        # StateMachine table that is down to one player
+        self.rebuy = rebuy
+
+        if seeds is None:
+            seeds = SeededShuffle.mix(SeededShuffle.seed_keys([seed])[0] + (np.arange(num_games, dtype=np.uint64) + np.uint64(1)) * SeededShuffle.GOLDEN_GAMMA)
+        self.seeds = np.asarray(seeds, dtype=np.uint64)
+        self.shuffle_keys = SeededShuffle.seed_keys(self.seeds)
+
+        # Per seat, the fields of Player that the betting reads
+        self.stacks = np.full((num_games, 2), self.starting_stack, dtype=np.int64)
+        self.starting_stacks = self.stacks.copy()
+        self.last_bets = np.zeros((num_games, 2), dtype=np.int64)
+        self.round_bets = np.zeros((num_games, 2), dtype=np.int64)
+        self.total_bets = np.zeros((num_games, 2), dtype=np.int64)
+        self.folded = np.zeros((num_games, 2), dtype=bool)
+        self.all_in = np.zeros((num_games, 2), dtype=bool)
+        self.has_acted = np.zeros((num_games, 2), dtype=bool)
+        self.hole_cards = np.zeros((num_games, 2, 2), dtype=np.uint8)
+        self.board = np.zeros((num_games, 5), dtype=np.uint8)  # Dealt up front, street s shows the first 0/3/4/5
+
+        # Per table, the fields of StateMachine and PokerGame
+        self.pot = np.zeros(num_games, dtype=np.int64)
+        self.bet_to_match = np.zeros(num_games, dtype=np.int64)
+        self.last_raise = np.zeros(num_games, dtype=np.int64)
+        self.hand_number = np.zeros(num_games, dtype=np.int64)
+        self.hands_played = np.zeros(num_games, dtype=np.int64)
+        self.dealer = np.zeros(num_games, dtype=np.int64)
+        self.street = np.zeros(num_games, dtype=np.int64)
+        self.start = np.zeros(num_games, dtype=np.int64)  # Seat the betting passes of this street start from
+        self.cursor = np.zeros(num_games, dtype=np.int64)  # Position in the current pass, PASS_START between passes
+        self.to_act = np.full(num_games, -1, dtype=np.int64)  # Seat whose decision step() takes, -1 once stopped
+        self.finished = np.zeros(num_games, dtype=bool)
+
+        # Betting history of the hand in progress: actions per street and column, aggressive actions per seat and
+        # the seat that made the last one (-1 for none yet)
+        self.street_actions = np.zeros((num_games, NUM_STREETS, len(HISTORY_COLUMNS)), dtype=np.int64)
+        self.aggressive_actions = np.zeros((num_games, 2), dtype=np.int64)
+        self.last_aggressor = np.full(num_games, -1, dtype=np.int64)
+
+        # Set to a list to collect one record of arrays per batch of finished hands, like StateMachine.hand_results
+        self.hand_log = None
+        self.finished_hands = np.zeros(num_games, dtype=np.int64)
+        self.chip_changes = np.zeros((num_games, 2), dtype=np.int64)
+
+        self.rows = np.arange(num_games)
+        self.start_hands(self.rows)
+        self.advance(self.rows)
+
+
+    def start_hands(self, games):
+        # StateMachine.setup and deal_hole_cards for every table in games
+        rows = np.arange(len(games))
+        self.dealer[games] ^= 1  # advance_button: with two seats the button alternates, seat 1 has it first
+        dealer = self.dealer[games]
+        stacks = self.stacks[games]
+        self.starting_stacks[games] = stacks
+        self.has_acted[games] = False
+        self.folded[games] = False
+        self.street_actions[games] = 0
+        self.aggressive_actions[games] = 0
+        self.last_aggressor[games] = -1
+
+        # PotManagement.collect_antes, an ante as big as the stack puts the player all in
+        paying = stacks > 0
+        antes = np.where(paying, np.minimum(stacks, self.ante), 0)
+        all_in = paying & (self.ante >= stacks)
+        stacks -= antes
+
+        # collect_blinds: the dealer posts the small blind heads-up, a blind as big as the stack puts the player all in
+        blinds = np.full((len(games), 2), self.big_blind, dtype=np.int64)
+        blinds[rows, dealer] = self.small_blind
+        posted = np.minimum(stacks, blinds)
+        all_in |= posted >= stacks
+        stacks -= posted
+
+        self.stacks[games] = stacks
+        self.all_in[games] = all_in
+        self.last_bets[games] = posted
+        self.round_bets[games] = posted
+        self.total_bets[games] = antes + posted
+        self.pot[games] = antes.sum(axis=1) + posted.sum(axis=1)
+
+        # Seat 0 takes the first two cards, seat 1 the next two, the board follows in dealing order
+        decks = SeededShuffle.shuffle_hands(self.shuffle_keys[games], self.hand_number[games], num_cards=9)
+        self.hole_cards[games] = decks[:, :4].reshape(-1, 2, 2)
+        self.board[games] = decks[:, 4:9]
+
+        # set_start_index on preflop: the player after the big blind, which is the dealer, opens against the big blind
+        self.street[games] = 0
+        self.start[games] = dealer
+        self.cursor[games] = PASS_START
+        self.bet_to_match[games] = self.big_blind
+        self.last_raise[games] = 0
+
+
+    def advance(self, games):
+        # Moves every table in games on to its next decision, playing out street ends, showdowns and new hands
+        self.to_act[games] = -1
+        while len(games):
+            between_passes = self.cursor[games] == PASS_START
+
+            # The while condition of betting_steps: someone can still act and more than one player is in
+            checking = games[between_passes]
+            active = ~self.folded[checking]
+            going_on = (active & ~self.all_in[checking] & ~self.has_acted[checking]).any(axis=1) & (active.sum(axis=1) > 1)
+            self.cursor[checking[going_on]] = 0
+
+            # One seat of the pass: skipped, asked to act, or the round stops because everyone else folded
+            seating = games[~between_passes]
+            seats = (self.start[seating] + self.cursor[seating]) % 2
+            round_bets = self.round_bets[seating, seats]
+            skip = self.folded[seating, seats] | self.all_in[seating, seats] | (self.has_acted[seating, seats] & (round_bets == self.bet_to_match[seating]))
+            alone = ~skip & self.folded[seating].any(axis=1)
+            acting = ~skip & ~alone
+            self.to_act[seating[acting]] = seats[acting]
+            self.cursor[seating[skip]] += 1
+
+            street_over = np.concatenate([checking[~going_on], seating[alone]])
+            next_games = self.end_streets(street_over) if len(street_over) else street_over
+            games = np.concatenate([checking[going_on], seating[skip], next_games])
+
+
+    def end_streets(self, games):
+        # The end of betting_steps and StateMachine.finish_street, returns the tables that play on in a new street or hand
+        self.bet_to_match[games] = 0
+        self.last_raise[games] = 0
+
+        active = ~self.folded[games]
+        hidden_end = active.sum(axis=1) == 1
+        early_finish = ~hidden_end & ((active & ~self.all_in[games]).sum(axis=1) <= 1)
+
+        next_street = games[~hidden_end & ~early_finish]
+        self.last_bets[next_street] = 0
+        self.round_bets[next_street] = 0
+        self.has_acted[next_street] = False
+        self.street[next_street] += 1
+        river_done = self.street[next_street] == NUM_STREETS
+        showdown = np.concatenate([games[early_finish], next_street[river_done]])
+
+        # After the flop the player to the left of the dealer opens
+        next_street = next_street[~river_done]
+        self.start[next_street] = 1 - self.dealer[next_street]
+        self.cursor[next_street] = PASS_START
+
+        next_hands = self.payout(games[hidden_end], showdown)
+        return np.concatenate([next_street, next_hands])
+
+
+    def payout(self, hidden_end, showdown):
+        # hidden_end, showdown and payout for both kinds of finished hands, then reset and the next hand's setup
+        winners = np.argmin(self.folded[hidden_end], axis=1)
+        self.stacks[hidden_end, winners] += self.pot[hidden_end]
+
+        # Both hands of every showdown table scored in one batch
+        cards = np.concatenate([self.hole_cards[showdown], np.repeat(self.board[showdown][:, None, :], 2, axis=1)], axis=2)
+        strengths = HandEvaluator.evaluate_batch(cards.reshape(-1, 7)).reshape(-1, 2)
+        # The chips a short all-in could not match go back to the bigger stack before the pot is contested
+        total_bets = self.total_bets[showdown]
+        uncalled = total_bets[:, 0] - total_bets[:, 1]
+        short_all_in = self.all_in[showdown, (uncalled > 0).astype(np.int64)]
+        uncalled = np.where(short_all_in, uncalled, 0)
+        self.stacks[showdown, 0] += np.maximum(uncalled, 0)
+        self.stacks[showdown, 1] += np.maximum(-uncalled, 0)
+        pot = self.pot[showdown] - np.abs(uncalled)
+        tie = strengths[:, 0] == strengths[:, 1]
+        seat_one_wins = strengths[:, 1] > strengths[:, 0]
+        # A split pot gives the odd chip to the first player in seat order, as distribute_pot does
+        self.stacks[showdown, 0] += np.where(tie, pot - pot // 2, np.where(seat_one_wins, 0, pot))
+        self.stacks[showdown, 1] += np.where(tie, pot // 2, np.where(seat_one_wins, pot, 0))
+
+        games = np.concatenate([hidden_end, showdown])
+        self.pot[games] = 0
+        chip_changes = self.stacks[games] - self.starting_stacks[games]
+        self.finished_hands[games] += 1
+        self.chip_changes[games] += chip_changes
+        self.hands_played[games] += 1
+        if self.hand_log is not None:
+            self.hand_log.append({
+                'games': games,
+                'hand_number': self.hand_number[games],
+                'showdown': np.arange(len(games)) >= len(hidden_end),
+                'chip_changes': chip_changes,
+            })
+        self.hand_number[games] += 1
+
+        # reset: a player with no chips leaves, which stops the table unless it rebuys
+        busted = (self.stacks[games] == 0).any(axis=1)
+        if self.rebuy:
+            self.stacks[games[busted]] = self.starting_stack
+        else:
+            self.finished[games[busted]] = True
+            games = games[~busted]
+
+        self.start_hands(games)
+        return games
+
+
+    def step(self, action_types, amounts=None):
+        # Takes the decision of the player to act at every table that is still playing: action_types[i] is an
+        # ACTION_TYPES code and amounts[i] its chips, rows of stopped tables are ignored. CHECK and CALL always match
+        # bet_to_match, as every agent sends them, and BET and RAISE amounts are chips put in on top of the player's
+        # round bet, as Player.bet and Player.raise_bet take them. Returns the hands finished at every table during
+        # the step and the chips each seat won or lost in them.
+        self.finished_hands[:] = 0
+        self.chip_changes[:] = 0
+        games = self.rows[self.to_act >= 0]
+        seats = self.to_act[games]
+        types = np.asarray(action_types)[games]
+        amounts = np.zeros(len(games), dtype=np.int64) if amounts is None else np.asarray(amounts, dtype=np.int64)[games]
+
+        stacks = self.stacks[games, seats]
+        round_bets = self.round_bets[games, seats]
+        bet_to_match = self.bet_to_match[games]
+        fold = types == FOLD
+        check = types == CHECK
+        call = types == CALL
+        bet = types == BET
+        raise_bet = types == RAISE
+        # Player.call with bet_to_match at or over the stack and Player.bet of the whole stack go all in instead
+        all_in = (types == ALL_IN) | (call & (bet_to_match >= stacks)) | (bet & (amounts >= stacks))
+
+        # PokerGame.betting_action through the Player methods, a check pays nothing even when it adds to the round bet
+        last_bets = np.zeros(len(games), dtype=np.int64)
+        last_bets[check | call] = (bet_to_match - round_bets)[check | call]
+        last_bets[bet | raise_bet] = amounts[bet | raise_bet]
+        last_bets[all_in] = stacks[all_in]
+        self.stacks[games, seats] = stacks - np.where(check, 0, last_bets)
+        self.last_bets[games, seats] = last_bets
+        self.round_bets[games, seats] = round_bets + last_bets
+        self.total_bets[games, seats] += last_bets
+        self.folded[games[fold], seats[fold]] = True
+        self.all_in[games[all_in], seats[all_in]] = True
+        self.has_acted[games, seats] = True
+        self.last_raise[games[raise_bet]] = (last_bets - bet_to_match)[raise_bet]
+        raised = last_bets > bet_to_match
+        self.bet_to_match[games] = bet_to_match = np.maximum(bet_to_match, last_bets)
+        self.pot[games] += last_bets
+
+        # One decision per table, so every (table, street, column) index below is distinct
+        columns = np.select([fold, check, call | ((types == ALL_IN) & ~raised)], [3, 2, 1], 0)
+        self.street_actions[games, self.street[games], columns] += 1
+        aggressive = columns == 0
+        self.aggressive_actions[games[aggressive], seats[aggressive]] += 1
+        self.last_aggressor[games[aggressive]] = seats[aggressive]
+
+        # Whoever can still act and is now short of bet_to_match has to act again
+        reopened = ~self.all_in[games] & self.has_acted[games] & (self.round_bets[games] < bet_to_match[:, None])
+        self.has_acted[games] &= ~reopened
+
+        self.cursor[games] += 1
+        self.advance(games)
+        return {'finished_hands': self.finished_hands.copy(), 'chip_changes': self.chip_changes.copy()}
+
+
+    def legal_actions(self):
+        # (num_games, 6) mask of the actions Player.make_decision accepts from the player to act, all False once stopped
+        games = self.rows[self.to_act >= 0]
+        seats = self.to_act[games]
+        stacks = self.stacks[games, seats]
+        bet_to_match = self.bet_to_match[games]
+        matched = self.round_bets[games, seats] == bet_to_match
+
+        legal = np.zeros((self.num_games, len(ACTION_TYPES)), dtype=bool)
+        legal[games, CHECK] = matched
+        legal[games, BET] = matched & (stacks >= self.big_blind)
+        legal[games, FOLD] = ~matched
+        legal[games, CALL] = ~matched & (stacks >= bet_to_match)
+        legal[games, RAISE] = ~matched & (stacks >= bet_to_match + np.maximum(self.big_blind, self.last_raise[games]))
+        legal[games, ALL_IN] = ~matched | (stacks >= bet_to_match)
+        return legal
+
+
+    def run_hands(self, num_hands, policy):
+        # Steps every table until each has played num_hands more hands or stopped, policy(game) -> (action types, amounts)
+        first_hands = self.hands_played.copy()
+        target = first_hands + num_hands
+        start = time.perf_counter()
+        while ((self.to_act >= 0) & (self.hands_played < target)).any():
+            self.step(*policy(self))
+        elapsed = time.perf_counter() - start
+
+        hands = int((self.hands_played - first_hands).sum())
+        return {
+            'hands': hands,
+            'elapsed': elapsed,
+            'hands_per_second': hands / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def decision_keys(seeds, hand_numbers, seats, pots, round_bets):
+    # Hash of what both engines can see at a decision, so a seeded policy picks the same action in either one
+    keys = np.asarray(seeds, dtype=np.uint64)
+    for values in (hand_numbers, seats, pots, round_bets):
+        keys = SeededShuffle.mix(keys + np.asarray(values, dtype=np.int64).astype(np.uint64) * SeededShuffle.GOLDEN_GAMMA)
+    return keys
+
+
+def cross_check_policy(keys, stacks, round_bets, bet_to_match, last_raise, big_blind):
+    # Seeded random play over the actions make_decision accepts, bets and raises the stack cannot cover go all in
+    uniform = (keys >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+    pick = (uniform * 100).astype(np.int64)
+    size = 1 + (uniform * 10000).astype(np.int64) % 3
+    matched = round_bets == bet_to_match
+
+    types = np.where(matched,
+                     np.where(pick < 55, CHECK, np.where(pick < 95, BET, ALL_IN)),
+                     np.where(pick < 25, FOLD, np.where(pick < 70, CALL, np.where(pick < 97, RAISE, ALL_IN))))
+    amounts = np.where(types == BET, big_blind * size,
+                       np.where(types == RAISE, bet_to_match - round_bets + np.maximum(big_blind, last_raise) * size, bet_to_match))
+    types[((types == BET) | (types == RAISE)) & (amounts >= stacks)] = ALL_IN
+    return types, amounts
+
+
+def cross_check_actions(game):
+    # cross_check_policy for the player to act at every table of a VectorHeadsUpGame
+    seats = np.maximum(game.to_act, 0)
+    stacks = game.stacks[game.rows, seats]
+    round_bets = game.round_bets[game.rows, seats]
+    keys = decision_keys(game.seeds, game.hand_number, seats, game.pot, round_bets)
+    return cross_check_policy(keys, stacks, round_bets, game.bet_to_match, game.last_raise, game.big_blind)
+
+
+def cross_check_agent(table, seed_value):
+    # cross_check_policy as the agent of every player at a StateMachine table dealt with SeededShuffle(seed_value)
+    def agent(player, big_blind, bet_to_match, last_raise):
+        seat = table.all_players.index(player)
+        keys = decision_keys([seed_value], [table.hand_number], [seat], [table.community_pot['pot_value']], [player.round_bet])
+        types, amounts = cross_check_policy(keys, np.array([player.stack_size]), np.array([player.round_bet]), np.array([bet_to_match]), np.array([last_raise]), big_blind)
+        return Action(ACTION_TYPES[types[0]], int(amounts[0]))
+    return agent
+
+
+def cross_check(num_games=20, num_hands=200, seed=0):
+    # Plays the same tables through VectorHeadsUpGame and StateMachine with the same decks and the same seeded
+    # policy, and returns every hand where the chip results differ
+    from game_management import StateMachine  # Needs player_model, which needs torch
+
+    game = VectorHeadsUpGame(num_games, seed=seed, rebuy=False)
+    game.hand_log = []
+    game.run_hands(num_hands, cross_check_actions)
+    vector_hands = {}
+    for record in game.hand_log:
+        for game_index, hand_number, showdown, chip_changes in zip(record['games'], record['hand_number'], record['showdown'], record['chip_changes']):
+            vector_hands.setdefault(int(game_index), []).append((int(hand_number), bool(showdown), tuple(int(change) for change in chip_changes)))
+
+    mismatches = []
+    hands = 0
+    for game_index in range(num_games):
+        seed_value = int(game.seeds[game_index])
+        table = StateMachine('heads_up', 2, 'max_buy_in', SeededShuffle(seed_value), headless=True)
+        table.set_agents(cross_check_agent(table, seed_value))
+        names = [player.name for player in table.all_players]
+        object_hands = [
+            (hand['hand_number'], hand['showdown'], tuple(hand['chip_changes'][name] for name in names))
+            for hand in table.run_hands(num_hands)['results']
+        ]
+        hands += len(object_hands)
+        vector_rows = vector_hands.get(game_index, [])[:num_hands]
+        for index in range(max(len(object_hands), len(vector_rows))):
+            object_hand = object_hands[index] if index < len(object_hands) else None
+            vector_hand = vector_rows[index] if index < len(vector_rows) else None
+            if object_hand != vector_hand:
+                mismatches.append({'game': game_index, 'object': object_hand, 'vector': vector_hand})
+
+    return {'games': num_games, 'hands': hands, 'mismatches': mismatches}
+
+
+if __name__ == "__main__":
+    # Usage: python vector_game.py [tables] [hands per table], cross-checks against StateMachine then times a batch
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    num_hands = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    result = cross_check(num_games, num_hands)
+    print(f"Cross-check: {result['hands']} hands on {result['games']} tables, {len(result['mismatches'])} mismatches")
+    for mismatch in result['mismatches'][:10]:
+        print(mismatch)
+
+    game = VectorHeadsUpGame(10000)
+    summary = game.run_hands(100, cross_check_actions)
+    print(f"{summary['hands']} hands on 10000 tables in {summary['elapsed']:.1f}s ({summary['hands_per_second']:,.0f} hands/s)")